@@ -0,0 +1,129 @@
+"""
+AetherAI - Inference Sidecar
+File: backend/inference_server.py
+Purpose: One local process that holds the text-generation model for every API worker
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Many API workers, one model in memory.
+
+Run next to the API (single worker, by design):
+    python -m backend.inference_server --uds /tmp/aetherai-inference.sock
+    INFERENCE_URL=unix:///tmp/aetherai-inference.sock uvicorn backend.main:app --workers 4
+
+API workers then stay small (no torch/transformers import) and start fast;
+generation for insights (and future mentor/paper text) goes through here.
+"""
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Dict, Any, Iterator, Optional
+import threading
+import argparse
+import json
+import os
+
+from .utils.report_generator import InsightModel
+from .utils.inference_client import DEFAULT_SOCKET_PATH
+from .utils.deadlines import Deadline, DeadlineExceeded
+
+# Configuration
+MAX_QUEUE = int(os.environ.get("INFERENCE_MAX_QUEUE", "32"))  # Waiting requests beyond this get 503
+MAX_NEW_TOKENS = 256
+
+app = FastAPI(title="AetherAI Inference Sidecar", docs_url=None, redoc_url=None)
+
+# The single model copy (weights are mmapped from the safetensors cache). Its
+# batcher runs one generation batch at a time, which is the concurrency cap.
+model = InsightModel()
+
+_counters_lock = threading.Lock()
+_counters = {"in_flight": 0, "served": 0, "rejected": 0}
+
+# Request model
+class GenerateRequest(BaseModel):
+    prompt: str
+    max_new_tokens: int = 120
+    deadline_ms: Optional[float] = None  # Remaining budget of the API request; 504 if it cannot be met
+
+@app.on_event("startup")
+def warm_model():
+    model.warm()
+
+@app.get("/health")
+def health() -> Dict[str, Any]:
+    with _counters_lock:
+        counters = dict(_counters)
+    return {**model.status(), "max_queue": MAX_QUEUE, **counters}
+
+def _admit():
+    """Count a request in, or refuse it if the model is not ready or the queue is full"""
+    if not model.ready:
+        model.warm()
+        raise HTTPException(status_code=503, detail=f"Model is {model.state}")
+    with _counters_lock:
+        if _counters["in_flight"] >= MAX_QUEUE:
+            _counters["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Inference queue is full")
+        _counters["in_flight"] += 1
+
+def _release():
+    with _counters_lock:
+        _counters["in_flight"] -= 1
+        _counters["served"] += 1
+
+@app.post("/generate")
+def generate(request: GenerateRequest):
+    """
+    Generate text after the prompt. Runs in the threadpool, so concurrent
+    requests reach the model's batcher together and share one forward pass.
+    """
+    deadline = Deadline.from_request(request.deadline_ms, 0) if request.deadline_ms is not None else None
+    _admit()
+    try:
+        text = model.generate(request.prompt, max_new_tokens=max(1, min(request.max_new_tokens, MAX_NEW_TOKENS)),
+                              deadline=deadline)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail={"reason": e.reason, "message": str(e)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+    finally:
+        _release()
+
+    return {"text": text, "model": model.model_name, "status": "success"}
+
+@app.post("/generate/stream")
+def generate_stream(request: GenerateRequest):
+    """
+    Same as /generate, streamed as newline-delimited JSON {"text": piece}
+    while the tokens are generated
+    """
+    _admit()
+    pieces = model.stream(request.prompt, max_new_tokens=max(1, min(request.max_new_tokens, MAX_NEW_TOKENS)))
+
+    def lines() -> Iterator[str]:
+        try:
+            for piece in pieces:
+                yield json.dumps({"text": piece}) + "\n"
+        finally:
+            _release()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="AetherAI inference sidecar")
+    parser.add_argument("--uds", default=None, help=f"Unix socket path (e.g. {DEFAULT_SOCKET_PATH})")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    if args.uds and os.path.exists(args.uds):
+        os.unlink(args.uds)  # Stale socket from a previous run
+    # Exactly one process: the point is a single model copy
+    uvicorn.run(app, uds=args.uds, host=args.host, port=args.port, workers=1)
+
+if __name__ == "__main__":
+    main()
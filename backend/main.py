@@ -56,7 +56,7 @@ from routes.datasets import router as datasets_router
 from routes.training import router as training_router
 from routes.results import router as results_router
 from routes.reports import router as reports_router
-from routes.ai_insights import router as ai_insights_router
+from routes.ai_insights import router as ai_insights_router, insight_model, insight_cache
 from routes.custom_model import router as custom_model_router
 from routes.dataset_analysis import router as dataset_analysis_router
 from routes.hyperparameter_suggestion import router as hyperparameter_suggestion_router
@@ -108,7 +108,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"]  # Important for PDF download
+    # Content-Disposition for PDF downloads; the X- headers say how a budgeted request was served
+    expose_headers=["Content-Disposition", "X-Response-Path", "X-Fallback-Reason"]
 )
 
 # Include all API routers
@@ -210,6 +211,10 @@ def health_check():
         "version": "4.4.0",
         "timestamp": __import__('datetime').datetime.utcnow().isoformat(),
         "environment": "development",
+        "models": {
+            "insights": insight_model.status(),  # state "loading" until GPT-2 is warm
+            "insight_cache": insight_cache.stats()
+        },
         "developer": "Kareem Mostafa (Egypt)",
         "goal": "Enable AI research for students without GPUs",
         "new_feature": "Teacher intervention alerts via /api/v1/teacher-alerts/generate"
@@ -8,13 +8,16 @@ Year: 2025
 Vision: Let AI explain AI to students.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 import logging
 
 # Import AI generator
-from ..utils.report_generator import generate_ai_insights
+from ..utils.report_generator import generate_ai_insights_detailed, stream_ai_insights, insight_model, insight_cache
+from ..utils.deadlines import Deadline, INSIGHT_BUDGET_MS, BUDGET_HEADER, PATH_HEADER, REASON_HEADER
+from ..utils.sse import sse_event, SSE_HEADERS
 
 # Initialize router
 router = APIRouter(prefix="/api/v1/ai-insights", tags=["ai-insights"])
@@ -23,29 +26,47 @@ router = APIRouter(prefix="/api/v1/ai-insights", tags=["ai-insights"])
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Load the model in the background once the app is up; requests before that get fallback insights
+@router.on_event("startup")
+def warm_insight_model():
+    insight_model.warm()
+
 # Request model
 class MetricsRequest(BaseModel):
     model: str
     dataset: str
     accuracy: float
     metrics: Dict[str, List[float]]
+    language: str = "en"
 
 @router.post("/", response_model=List[str])
-async def get_ai_insights(request: MetricsRequest):
+def get_ai_insights(request: MetricsRequest, response: Response,
+                    latency_budget_ms: Optional[float] = Header(None, alias=BUDGET_HEADER)):
     """
     Get AI-generated natural language insights about training performance
+    (sync: runs in the threadpool so concurrent requests can be batched).
+    
+    Answers within the latency budget (X-Latency-Budget-Ms, default
+    INSIGHT_BUDGET_MS): when the model cannot, the rule-based insights are
+    returned instead. X-Response-Path says which: cache, model or fallback.
     """
     try:
         logger.info(f"Generating AI insights for model: {request.model}, accuracy: {request.accuracy:.3f}")
         
-        insights = generate_ai_insights(
+        deadline = Deadline.from_request(latency_budget_ms, INSIGHT_BUDGET_MS)
+        result = generate_ai_insights_detailed(
             metrics=request.metrics,
             model=request.model,
             dataset=request.dataset,
-            accuracy=request.accuracy
+            accuracy=request.accuracy,
+            language=request.language,
+            deadline=deadline
         )
         
-        return insights
+        response.headers[PATH_HEADER] = result["path"]
+        if result["reason"]:
+            response.headers[REASON_HEADER] = result["reason"]
+        return result["insights"]
         
     except Exception as e:
         logger.error(f"Error generating AI insights: {str(e)}")
@@ -54,8 +75,35 @@ async def get_ai_insights(request: MetricsRequest):
             detail=f"Failed to generate AI insights: {str(e)}"
         )
 
+@router.post("/stream")
+def stream_insights(request: MetricsRequest):
+    """
+    Stream AI insights as Server-Sent Events: one `insight` event per sentence
+    as soon as the model has written it, then `done` with the full list
+    """
+    logger.info(f"Streaming AI insights for model: {request.model}, accuracy: {request.accuracy:.3f}")
+    
+    def events() -> Iterator[str]:
+        insights = []
+        try:
+            for insight in stream_ai_insights(
+                metrics=request.metrics,
+                model=request.model,
+                dataset=request.dataset,
+                accuracy=request.accuracy,
+                language=request.language
+            ):
+                insights.append(insight)
+                yield sse_event("insight", {"index": len(insights) - 1, "text": insight})
+        except Exception as e:
+            logger.error(f"Error streaming AI insights: {str(e)}")
+            yield sse_event("error", {"detail": f"Failed to generate AI insights: {str(e)}"})
+        yield sse_event("done", {"insights": insights})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.get("/sample")
-async def get_sample_ai_insights():
+def get_sample_ai_insights():
     """
     Get a sample of AI-generated insights for demonstration
     """
@@ -69,4 +117,4 @@ async def get_sample_ai_insights():
         }
     )
     
-    return get_ai_insights(sample_request)
+    return get_ai_insights(sample_request, Response(), None)
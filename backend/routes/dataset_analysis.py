@@ -8,26 +8,102 @@ Year: 2025
 Vision: Help students understand their data before training.
 """
 
-from fastapi import APIRouter, HTTPException, File, UploadFile
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, File, UploadFile, Query, Header, Response
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
 import os
+import json
+import uuid
+import hashlib
 from pathlib import Path
 
 # Import analyzer
-from ..utils.dataset_analyzer import DatasetAnalyzer
+from ..utils.dataset_analyzer import DatasetAnalyzer, ANALYZER_VERSION
+from ..utils.analysis_cache import AnalysisCache
+from ..utils.dataset_jobs import DatasetJobManager, JobContext, JOB_COMPLETED, FINISHED_STATES
+from ..utils.dataset_shards import ShardConverter, SHARD_DIR, MAX_IMAGE_SIZE
+from ..utils.tabular_ingest import TabularIngestor, list_csv_members, TABLE_DIR
+from ..utils.image_hashing import PerceptualHashIndex, PHASH_DIR, DEFAULT_THRESHOLD, HASH_KINDS
+from ..utils.dataset_quality import DatasetQualityScorer
+from ..utils.leakage_index import MemberIndex, find_split_leaks
+from ..utils.zip_index import read_central_directory
+from ..utils.text_tokens import TokenCache, TOKEN_DIR
+from ..utils.dataset_preview import (DatasetPreviewer, PreviewStore, THUMBNAIL_DIR, DEFAULT_THUMB_SIZE,
+                                     MAX_THUMB_SIZE, PREVIEW_MODES)
+from ..utils.deadlines import Deadline, ANALYSIS_BUDGET_MS, BUDGET_HEADER, PATH_HEADER, REASON_HEADER
 
 # Initialize router
 router = APIRouter(prefix="/api/v1/datasets", tags=["datasets"])
 
 # Configuration
 UPLOAD_DIR = Path("uploads/datasets")
-ANALYSIS_CACHE: Dict[str, Dict] = {}  # In production: use Redis
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Stream uploads to disk 1MB at a time
+CACHE_DIR = Path("uploads/cache")
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_MB", "256")) * 1024 * 1024
 
-@router.post("/analyze")
-async def analyze_uploaded_dataset(file: UploadFile = File(...)):
+# Content-keyed analysis cache, persisted on disk and shared by all workers
+analysis_cache = AnalysisCache(CACHE_DIR / "analysis_cache.sqlite3", max_bytes=ANALYSIS_CACHE_MAX_BYTES)
+
+# Background analysis jobs (analysis never runs on the event loop)
+analysis_jobs = DatasetJobManager(max_workers=2)
+
+# Member content keys of every analyzed upload, for cross-dataset leakage checks
+member_index = MemberIndex(CACHE_DIR / "member_index.sqlite3")
+
+# Tokenized text corpora shared by every LSTM/Transformer job
+token_cache = TokenCache(TOKEN_DIR)
+
+# Image index and thumbnail cache for dataset previews
+dataset_previewer = DatasetPreviewer(THUMBNAIL_DIR)
+
+# Analyzed uploads, kept by content so their images can be previewed afterwards
+preview_store = PreviewStore()
+
+def _run_analysis_job(context: JobContext, file_path: Path, filename: str, cache_key: str) -> Dict[str, Any]:
+    """Job body: analyze the saved upload and cache the result under its content key"""
+    # A previous upload under the same name lets the analyzer re-scan only what changed
+    previous_key = analysis_cache.resolve_alias(filename)
+    previous_manifest = analysis_cache.get(_manifest_key(previous_key)) if previous_key else None
+    
+    analyzer = DatasetAnalyzer(file_path)
+    analysis = analyzer.analyze(
+        progress_callback=context.report,
+        should_cancel=context.is_cancelled,
+        previous_manifest=previous_manifest
+    )
+    if "error" in analysis:
+        raise RuntimeError(analysis["error"])
+    
+    analysis_cache.put(cache_key, analysis)
+    analysis_cache.put(_manifest_key(cache_key), analyzer.manifest)
+    analysis_cache.set_alias(filename, cache_key)
+    member_index.register_zip(filename, file_path)
+    return analysis
+
+def _manifest_key(cache_key: str) -> str:
+    """Cache key of the member manifest stored next to an analysis"""
+    return f"{cache_key}:manifest"
+
+def _remove_temp_file(file_path: Path):
+    """Delete a temporary upload that never made it into the preview store"""
+    if file_path.exists():
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+@router.post("/analyze", status_code=202)
+async def analyze_uploaded_dataset(response: Response, file: UploadFile = File(...),
+                                   latency_budget_ms: Optional[float] = Header(None, alias=BUDGET_HEADER)):
     """
-    Analyze an uploaded dataset and return insights
+    Submit an uploaded dataset for background analysis and return a job id.
+    
+    Small datasets that finish within the latency budget (X-Latency-Budget-Ms,
+    default ANALYSIS_BUDGET_MS) are answered inline with the analysis; larger
+    ones (or a busy job pool) get the job id to poll. X-Response-Path says
+    which: cache, inline or queued.
     """
+    deadline = Deadline.from_request(latency_budget_ms, ANALYSIS_BUDGET_MS)
     # Validate file type
     file_extension = Path(file.filename).suffix.lower()
     if file_extension not in [".zip"]:
@@ -36,46 +112,150 @@ async def analyze_uploaded_dataset(file: UploadFile = File(...)):
             detail=f"Only .zip files can be analyzed. You uploaded: {file_extension}"
         )
 
-    # Save file temporarily
-    file_path = UPLOAD_DIR / f"temp_{file.filename}"
+    # Save file temporarily (unique name so concurrent uploads never collide)
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    file_path = UPLOAD_DIR / f"temp_{uuid.uuid4().hex[:8]}_{Path(file.filename).name}"
     try:
-        contents = await file.read()
+        digest = hashlib.sha256()
         with open(file_path, "wb") as f:
-            f.write(contents)
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+        
+        # Keep the upload under its content id: the job analyzes it there, and
+        # /preview/{preview_id} can still read its images once the job is done
+        preview_id = preview_store.keep(file_path, digest.hexdigest())
+        stored_path = preview_store.path(preview_id)
         
-        # Analyze
-        analyzer = DatasetAnalyzer(file_path)
-        analysis = analyzer.analyze()
+        # Same bytes analyzed before (under any name)? Serve from cache.
+        cache_key = AnalysisCache.make_key(digest.hexdigest(), ANALYZER_VERSION)
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            analysis_cache.set_alias(file.filename, cache_key)
+            response.headers[PATH_HEADER] = "cache"
+            return {
+                "filename": file.filename,
+                "preview_id": preview_id,
+                "job_id": None,
+                "status": "completed",
+                "cached": True,
+                "analysis": cached,
+                **deadline.report("cache"),
+                "message": "Dataset analysis loaded from cache"
+            }
+        
+        job_id = analysis_jobs.submit(
+            "analysis",
+            _run_analysis_job,
+            stored_path,
+            file.filename,
+            cache_key,
+            metadata={"filename": file.filename, "preview_id": preview_id}
+        )
         
-        # Cache result (remove temp file after analysis)
-        ANALYSIS_CACHE[file.filename] = analysis
+        # Wait for the result only if the job got a worker right away
+        if analysis_jobs.active_count() > analysis_jobs.max_workers:
+            reason = "queue"
+        else:
+            job = await analysis_jobs.wait(job_id, deadline.remaining())
+            if job is not None and job["status"] == JOB_COMPLETED:
+                response.headers[PATH_HEADER] = "inline"
+                return {
+                    "filename": file.filename,
+                    "preview_id": preview_id,
+                    "job_id": job_id,
+                    "status": "completed",
+                    "cached": False,
+                    "analysis": job["result"],
+                    **deadline.report("inline"),
+                    "message": "Dataset analyzed successfully"
+                }
+            # Failed or cancelled within the budget: polling the job reports why
+            reason = job["status"] if job is not None and job["status"] in FINISHED_STATES else "timeout"
         
+        response.headers[PATH_HEADER] = "queued"
+        response.headers[REASON_HEADER] = reason
         return {
             "filename": file.filename,
-            "analysis": analysis,
-            "status": "success",
-            "message": "Dataset analyzed successfully"
+            "preview_id": preview_id,
+            "job_id": job_id,
+            "status": "queued",
+            **deadline.report("queued", reason),
+            "message": "Dataset analysis started. Poll the job for progress."
         }
         
     except Exception as e:
+        _remove_temp_file(file_path)
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to analyze dataset: {str(e)}"
+            detail=f"Failed to start dataset analysis: {str(e)}"
         )
-    finally:
-        # Clean up temp file
-        if file_path.exists():
-            try:
-                os.remove(file_path)
-            except:
-                pass
+
+@router.get("/analyze/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """
+    Get status and progress of a background analysis job
+    """
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    
+    return job
+
+@router.get("/analyze/jobs/{job_id}/result")
+async def get_analysis_job_result(job_id: str):
+    """
+    Get the analysis produced by a finished job
+    """
+    job = analysis_jobs.get(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    
+    if job["status"] not in FINISHED_STATES:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Analysis is still {job['status']} ({job['progress']}%)"
+        )
+    
+    if job["status"] != JOB_COMPLETED:
+        raise HTTPException(
+            status_code=422,
+            detail=job["error"] or f"Analysis job was {job['status']}"
+        )
+    
+    return {
+        "filename": job["metadata"].get("filename"),
+        "preview_id": job["metadata"].get("preview_id"),
+        "job_id": job_id,
+        "analysis": job["result"],
+        "status": "success",
+        "message": "Dataset analyzed successfully"
+    }
+
+@router.post("/analyze/jobs/{job_id}/cancel")
+async def cancel_analysis_job(job_id: str):
+    """
+    Cancel a queued or running analysis job
+    """
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    
+    if not analysis_jobs.cancel(job_id):
+        raise HTTPException(status_code=400, detail=f"Job already {job['status']}")
+    
+    return {"message": f"Analysis job {job_id} cancellation requested", "job_id": job_id}
 
 @router.get("/analyze/{filename}")
 async def get_cached_analysis(filename: str):
     """
     Get previously cached analysis for a dataset
     """
-    if filename not in ANALYSIS_CACHE:
+    analysis = analysis_cache.get_by_alias(filename)
+    if analysis is None:
         raise HTTPException(
             status_code=404,
             detail="No analysis found for this dataset"
@@ -83,7 +263,7 @@ async def get_cached_analysis(filename: str):
     
     return {
         "filename": filename,
-        "analysis": ANALYSIS_CACHE[filename],
+        "analysis": analysis,
         "status": "success"
     }
 
@@ -92,15 +272,408 @@ async def get_analysis_suggestions(filename: str):
     """
     Get only the educational suggestions from dataset analysis
     """
-    if filename not in ANALYSIS_CACHE:
+    analysis = analysis_cache.get_by_alias(filename)
+    if analysis is None:
         raise HTTPException(
             status_code=404,
             detail="No analysis found for this dataset"
         )
     
-    suggestions = ANALYSIS_CACHE[filename].get("suggestions", [])
+    suggestions = analysis.get("suggestions", [])
     return {
         "filename": filename,
         "suggestions": suggestions,
         "count": len(suggestions)
 }
+
+# Request model
+class ShardConversionRequest(BaseModel):
+    image_size: int = 32
+    channels: int = 3
+    split: Optional[str] = None
+
+def _run_shard_job(context: JobContext, file_path: Path, output_dir: Path,
+                   request: ShardConversionRequest) -> Dict[str, Any]:
+    """Job body: decode an uploaded image-folder zip into training shards"""
+    converter = ShardConverter(
+        file_path,
+        output_dir,
+        image_size=(request.image_size, request.image_size),
+        channels=request.channels,
+        split=request.split
+    )
+    index = converter.convert(progress_callback=context.report, should_cancel=context.is_cancelled)
+    return {
+        "shard_dir": str(output_dir),
+        "num_samples": index["num_samples"],
+        "classes": index["classes"],
+        "image_shape": index["image_shape"],
+        "failed": index["failed"]
+    }
+
+def submit_shard_conversion(filename: str, request: Optional[ShardConversionRequest] = None) -> str:
+    """Queue conversion of an uploaded dataset into packed shards; returns the job id"""
+    file_path = UPLOAD_DIR / Path(filename).name
+    if not file_path.exists():
+        raise FileNotFoundError(f"Uploaded dataset not found: {filename}")
+    
+    output_dir = SHARD_DIR / Path(filename).stem.lower()
+    return analysis_jobs.submit(
+        "shards",
+        _run_shard_job,
+        file_path,
+        output_dir,
+        request or ShardConversionRequest(),
+        metadata={"filename": filename}
+    )
+
+@router.post("/shards/{filename}", status_code=202)
+async def convert_dataset_to_shards(filename: str, request: Optional[ShardConversionRequest] = None):
+    """
+    Convert an uploaded image-folder zip into memory-mappable training shards
+    """
+    if request is not None and request.channels not in (1, 3):
+        raise HTTPException(status_code=400, detail="channels must be 1 (grayscale) or 3 (RGB)")
+    if request is not None and not 1 <= request.image_size <= MAX_IMAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"image_size must be between 1 and {MAX_IMAGE_SIZE}")
+    
+    try:
+        job_id = submit_shard_conversion(filename, request)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return {
+        "filename": filename,
+        "job_id": job_id,
+        "status": "queued",
+        "message": "Shard conversion started. Poll /api/v1/datasets/analyze/jobs/{job_id} for progress."
+    }
+
+@router.get("/shards/{filename}")
+async def get_dataset_shards(filename: str):
+    """
+    Get the shard index of a converted dataset
+    """
+    index_path = SHARD_DIR / Path(filename).stem.lower() / "index.json"
+    if not index_path.exists():
+        raise HTTPException(status_code=404, detail="Dataset has not been converted to shards yet")
+    
+    with open(index_path) as f:
+        index = json.load(f)
+    
+    return {
+        "filename": filename,
+        "shard_dir": str(index_path.parent),
+        "index": index,
+        "status": "success"
+    }
+
+# Request model
+class TableIngestRequest(BaseModel):
+    member: Optional[str] = None
+    chunk_rows: int = 50000
+
+def table_id_for(filename: str, member: str) -> str:
+    """Stable id of the columnar table built from one CSV inside an upload"""
+    return f"{Path(filename).stem.lower()}__{Path(member).stem.lower()}"
+
+def _run_table_job(context: JobContext, file_path: Path, member: str, output_dir: Path,
+                   chunk_rows: int) -> Dict[str, Any]:
+    """Job body: stream one CSV member into typed columnar storage"""
+    ingestor = TabularIngestor(file_path, output_dir, member=member, chunk_rows=chunk_rows)
+    schema = ingestor.ingest(progress_callback=context.report, should_cancel=context.is_cancelled)
+    return {
+        "table_id": output_dir.name,
+        "table_dir": str(output_dir),
+        "rows": schema["rows"],
+        "columns": [{"name": c["name"], "kind": c["kind"]} for c in schema["columns"]]
+    }
+
+@router.post("/tables/{filename}", status_code=202)
+async def ingest_tabular_dataset(filename: str, request: Optional[TableIngestRequest] = None):
+    """
+    Ingest a CSV from an uploaded zip into memory-mapped columnar storage
+    """
+    request = request or TableIngestRequest()
+    file_path = UPLOAD_DIR / Path(filename).name
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail=f"Uploaded dataset not found: {filename}")
+    
+    members = list_csv_members(file_path)
+    if request.member is not None:
+        if request.member not in members:
+            raise HTTPException(status_code=404, detail=f"CSV '{request.member}' not found. Available: {members}")
+        member = request.member
+    elif len(members) == 1:
+        member = members[0]
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Choose one CSV via 'member'. Found: {members}" if members else "No CSV files found in dataset"
+        )
+    
+    output_dir = TABLE_DIR / table_id_for(filename, member)
+    job_id = analysis_jobs.submit(
+        "table",
+        _run_table_job,
+        file_path,
+        member,
+        output_dir,
+        request.chunk_rows,
+        metadata={"filename": filename, "member": member}
+    )
+    
+    return {
+        "filename": filename,
+        "member": member,
+        "table_id": output_dir.name,
+        "job_id": job_id,
+        "status": "queued",
+        "message": "Tabular ingestion started. Poll /api/v1/datasets/analyze/jobs/{job_id} for progress."
+    }
+
+@router.get("/tables/{table_id}")
+async def get_table_schema(table_id: str):
+    """
+    Get schema and column statistics of an ingested table
+    """
+    schema_path = TABLE_DIR / Path(table_id).name / "schema.json"
+    if not schema_path.exists():
+        raise HTTPException(status_code=404, detail="Table not found")
+    
+    with open(schema_path) as f:
+        schema = json.load(f)
+    
+    return {
+        "table_id": table_id,
+        "schema": schema,
+        "status": "success"
+    }
+
+# Request model
+class DuplicateScanRequest(BaseModel):
+    threshold: int = DEFAULT_THRESHOLD
+    model_type: str = "classification"
+
+def _phash_path(filename: str) -> Path:
+    return PHASH_DIR / f"{Path(filename).stem.lower()}.npz"
+
+def _duplicate_summary(hash_index: PerceptualHashIndex, filename: str, threshold: int,
+                       model_type: str, hash_kind: str = "dhash") -> Dict[str, Any]:
+    """Duplicate clusters plus the quality score they feed"""
+    report = hash_index.duplicate_report(threshold, hash_kind)
+    quality = DatasetQualityScorer.score_images(hash_index, filename, model_type, threshold, hash_kind,
+                                                duplicates=report)
+    if "error" in quality:
+        raise RuntimeError(quality["error"])
+    return {
+        "duplicates": report,
+        "quality_score": quality["quality_report"]["total_score"],
+        "cleanliness": quality["quality_report"]["metrics"]["cleanliness"]
+    }
+
+def _run_duplicate_job(context: JobContext, file_path: Path, filename: str,
+                       request: DuplicateScanRequest) -> Dict[str, Any]:
+    """Job body: hash every image of an upload and cluster near-duplicates"""
+    hash_index = PerceptualHashIndex.build(file_path, progress_callback=context.report,
+                                           should_cancel=context.is_cancelled)
+    hash_index.save(_phash_path(filename))
+    return _duplicate_summary(hash_index, filename, request.threshold, request.model_type)
+
+@router.post("/duplicates/{filename}", status_code=202)
+async def scan_dataset_duplicates(filename: str, request: Optional[DuplicateScanRequest] = None):
+    """
+    Build the perceptual-hash index of an uploaded image dataset and find near-duplicates
+    """
+    request = request or DuplicateScanRequest()
+    if not 0 <= request.threshold < 32:
+        raise HTTPException(status_code=400, detail="threshold must be between 0 and 31 bits")
+    file_path = UPLOAD_DIR / Path(filename).name
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail=f"Uploaded dataset not found: {filename}")
+    
+    job_id = analysis_jobs.submit(
+        "duplicates",
+        _run_duplicate_job,
+        file_path,
+        filename,
+        request,
+        metadata={"filename": filename}
+    )
+    
+    return {
+        "filename": filename,
+        "job_id": job_id,
+        "status": "queued",
+        "message": "Duplicate scan started. Poll /api/v1/datasets/analyze/jobs/{job_id} for progress."
+    }
+
+@router.get("/duplicates/{filename}")
+def get_dataset_duplicates(filename: str, threshold: int = Query(DEFAULT_THRESHOLD, ge=0, le=31),
+                           hash_kind: str = "dhash", model_type: str = "classification"):
+    """
+    Re-cluster a scanned dataset with another threshold or hash (no re-hashing needed)
+    """
+    if hash_kind not in HASH_KINDS:
+        raise HTTPException(status_code=400, detail=f"hash_kind must be one of {list(HASH_KINDS)}")
+    index_path = _phash_path(filename)
+    if not index_path.exists():
+        raise HTTPException(status_code=404, detail="Dataset has not been scanned for duplicates yet")
+    
+    hash_index = PerceptualHashIndex.load(index_path)
+    return {
+        "filename": filename,
+        **_duplicate_summary(hash_index, filename, threshold, model_type, hash_kind),
+        "status": "success"
+    }
+
+# Request model
+class LeakageCheckRequest(BaseModel):
+    splits: Optional[List[str]] = None  # e.g. ["test"]; default checks every file
+    add_to_index: bool = True
+    reference: bool = False
+
+@router.post("/leakage/{filename}")
+def check_dataset_leakage(filename: str, request: Optional[LeakageCheckRequest] = None):
+    """
+    Find files shared between this dataset's splits and with other registered datasets
+    """
+    request = request or LeakageCheckRequest()
+    file_path = UPLOAD_DIR / Path(filename).name
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail=f"Uploaded dataset not found: {filename}")
+    
+    try:
+        entries = read_central_directory(file_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    within = find_split_leaks({entry.name: (entry.file_size, entry.crc) for entry in entries}, file_path)
+    across = member_index.probe(entries, exclude=filename, splits=request.splits)
+    if request.add_to_index:
+        member_index.register(filename, entries, reference=request.reference)
+    
+    leaked = within["leaked_files"] + across["leaked_files"]
+    return {
+        "filename": filename,
+        "within_dataset": within,
+        "across_datasets": across,
+        "status": "success",
+        "message": f"🚨 {leaked} leaked files found" if leaked else "✅ No train/test leakage found"
+    }
+
+@router.get("/leakage")
+async def list_leakage_index():
+    """
+    List datasets registered in the global member index
+    """
+    datasets = member_index.datasets()
+    return {
+        "datasets": datasets,
+        "count": len(datasets),
+        "status": "success"
+    }
+
+@router.delete("/leakage/{filename}")
+async def remove_from_leakage_index(filename: str):
+    """
+    Remove a dataset from the global member index
+    """
+    if not member_index.remove(filename):
+        raise HTTPException(status_code=404, detail="Dataset is not registered")
+    return {"filename": filename, "status": "removed"}
+
+# Request model
+class TokenizeRequest(BaseModel):
+    vocab_size: int = 10000
+    min_freq: int = 1
+    lowercase: bool = True
+    max_length: Optional[int] = None
+    split: Optional[str] = None
+    member: Optional[str] = None  # CSV/TSV inside the zip (e.g. SST-2/train.tsv)
+    text_column: Optional[str] = None
+    label_column: Optional[str] = None
+
+def _run_token_job(context: JobContext, file_path: Path, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Job body: tokenize a text dataset once (or reuse the cached corpus)"""
+    corpus = token_cache.get_or_build(file_path, config, progress_callback=context.report,
+                                      should_cancel=context.is_cancelled)
+    return {
+        "token_id": corpus.meta["key"],
+        "token_dir": str(corpus.corpus_dir),
+        "vocab_size": corpus.vocab_size,
+        "num_documents": len(corpus),
+        "num_tokens": corpus.meta["num_tokens"],
+        "classes": corpus.meta["classes"],
+        "length": corpus.meta["length"]
+    }
+
+@router.post("/tokens/{filename}", status_code=202)
+async def tokenize_text_dataset(filename: str, request: Optional[TokenizeRequest] = None):
+    """
+    Tokenize an uploaded text dataset into packed int32 sequences for LSTM/Transformer training
+    """
+    request = request or TokenizeRequest()
+    file_path = UPLOAD_DIR / Path(filename).name
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail=f"Uploaded dataset not found: {filename}")
+    if request.vocab_size <= 2:
+        raise HTTPException(status_code=400, detail="vocab_size must be greater than 2")
+    
+    job_id = analysis_jobs.submit(
+        "tokens",
+        _run_token_job,
+        file_path,
+        request.model_dump(),
+        metadata={"filename": filename}
+    )
+    
+    return {
+        "filename": filename,
+        "job_id": job_id,
+        "status": "queued",
+        "message": "Tokenization started. Poll /api/v1/datasets/analyze/jobs/{job_id} for progress."
+    }
+
+@router.get("/tokens/{token_id}")
+async def get_tokenized_corpus(token_id: str):
+    """
+    Get metadata of a tokenized corpus
+    """
+    meta_path = TOKEN_DIR / Path(token_id).name / "meta.json"
+    if not meta_path.exists():
+        raise HTTPException(status_code=404, detail="Tokenized corpus not found")
+    
+    with open(meta_path) as f:
+        meta = json.load(f)
+    
+    return {
+        "token_id": token_id,
+        "meta": meta,
+        "status": "success"
+    }
+
+@router.get("/preview/{dataset}")
+def preview_dataset_images(dataset: str, n: int = Query(16, ge=1, le=128), mode: str = "random",
+                           per_class: int = Query(4, ge=1, le=32), split: Optional[str] = None,
+                           label: Optional[str] = None, seed: Optional[int] = None,
+                           size: int = Query(DEFAULT_THUMB_SIZE, ge=16, le=MAX_THUMB_SIZE)):
+    """
+    Random or per-class sample thumbnails of an image dataset: dataset is the
+    preview_id returned by /analyze, or the filename of an uploaded dataset
+    """
+    if mode not in PREVIEW_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {list(PREVIEW_MODES)}")
+    file_path = preview_store.path(dataset) or UPLOAD_DIR / Path(dataset).name
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail=f"Dataset not found (or no longer kept for previews): {dataset}")
+    
+    preview = dataset_previewer.preview(file_path, n=n, mode=mode, per_class=per_class,
+                                        split=split, label=label, seed=seed, size=size)
+    if "error" in preview:
+        raise HTTPException(status_code=400, detail=preview["error"])
+    
+    return {
+        "dataset": dataset,
+        **preview
+    }
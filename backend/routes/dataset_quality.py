@@ -9,11 +9,14 @@ Vision: Help students identify and fix dataset issues before training.
 """
 
 from fastapi import APIRouter, HTTPException, Body
-from typing import Dict, Any
+from pydantic import BaseModel
+from pathlib import Path
+from typing import Dict, Any, Optional
 import logging
 
 # Import quality scorer
 from ..utils.dataset_quality import DatasetQualityScorer
+from ..utils.tabular_ingest import TABLE_DIR
 
 # Initialize router
 router = APIRouter(prefix="/api/v1/dataset-quality", tags=["dataset-quality"])
@@ -50,6 +53,42 @@ async def score_dataset_quality(dataset_info: dict = Body(...)):
         logger.error(f"Dataset Quality Scoring Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+class TableScoreRequest(BaseModel):
+    table_id: str
+    target: Optional[str] = None
+    model_type: str = "classification"
+
+@router.post("/score-table")
+def score_table_quality(request: TableScoreRequest):
+    """
+    Score an ingested table (POST /api/v1/datasets/tables/{filename}) from its
+    actual data in one streaming pass. Runs in the thread pool because it
+    scans every row.
+    """
+    try:
+        table_dir = TABLE_DIR / Path(request.table_id).name
+        if not (table_dir / "schema.json").exists():
+            raise HTTPException(status_code=404, detail="Table not found")
+        
+        logger.info(f"Scoring table quality for: {request.table_id}")
+        result = DatasetQualityScorer.score_table(table_dir, request.target, request.model_type,
+                                                  name=request.table_id)
+        
+        if "error" in result:
+            raise HTTPException(status_code=422, detail=result["error"])
+        
+        return {
+            "status": "success",
+            "quality_report": result["quality_report"],
+            "message": f"{result['message']}"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Table Quality Scoring Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/guidelines")
 async def get_quality_guidelines():
     """
@@ -13,6 +13,9 @@ import os
 import shutil
 from pathlib import Path
 
+from .dataset_analysis import submit_shard_conversion
+from ..utils.dataset_registry import DatasetRegistry, PRELOADED_DIR
+
 # Initialize router
 router = APIRouter(prefix="/api/v1/datasets", tags=["datasets"])
 
@@ -24,20 +27,18 @@ ALLOWED_EXTENSIONS = {".zip"}
 # Create upload directory
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-# Preloaded datasets (simulated)
-PRELOADED_DATASETS = [
-    "mnist",
-    "cifar-10",
-    "fashion-mnist",
-    "imdb",
-    "sst-2",
-    "iris"
-]
+# Versioned local registry of preloaded datasets (works offline)
+dataset_registry = DatasetRegistry(PRELOADED_DIR)
+PRELOADED_DATASETS = dataset_registry.names()
+
 
 @router.post("/upload")
-async def upload_dataset(file: UploadFile = File(...)):
+async def upload_dataset(file: UploadFile = File(...), convert_to_shards: bool = False):
     """
     Upload a custom dataset (must be .zip)
+
+    With convert_to_shards=true an image-folder zip is also queued for
+    conversion into packed training shards.
     """
     # Validate file type
     file_extension = Path(file.filename).suffix.lower()
@@ -60,42 +61,81 @@ async def upload_dataset(file: UploadFile = File(...)):
     with open(file_path, "wb") as buffer:
         buffer.write(contents)
 
-    return {
+    response = {
         "message": "Dataset uploaded successfully",
         "filename": file.filename,
         "size": len(contents),
         "path": str(file_path),
         "dataset_id": file.filename.replace(".zip", "").lower()
     }
+    
+    if convert_to_shards:
+        response["shard_job_id"] = submit_shard_conversion(file.filename)
+    
+    return response
 
 @router.get("/preloaded")
 async def list_preloaded_datasets():
     """
     List all available preloaded datasets
     """
+    datasets = dataset_registry.list_datasets()
     return {
-        "datasets": PRELOADED_DATASETS,
-        "total": len(PRELOADED_DATASETS),
+        "datasets": datasets,
+        "total": len(datasets),
         "message": "These datasets are ready to use without upload"
     }
 
+@router.get("/preloaded/{name}/manifest")
+async def get_preloaded_manifest(name: str):
+    """
+    Version, checksums, shapes and class counts of a preloaded dataset (no data is read)
+    """
+    try:
+        return dataset_registry.describe(name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+@router.get("/preloaded/{name}/analysis")
+async def get_preloaded_analysis(name: str):
+    """
+    Dataset analysis of a preloaded dataset, built from its manifest
+    """
+    try:
+        analysis = dataset_registry.analysis(name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    
+    return {
+        "filename": name.lower(),
+        "analysis": analysis,
+        "status": "success"
+    }
+
 @router.get("/preloaded/{name}")
-async def use_preloaded_dataset(name: str):
+def use_preloaded_dataset(name: str):
     """
     Select a preloaded dataset for training
+
+    The first request converts the local source files into memory-mapped
+    arrays; concurrent requests wait for that same conversion.
     """
-    name_lower = name.lower()
-    if name_lower not in PRELOADED_DATASETS:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Dataset '{name}' not found. Available: {PRELOADED_DATASETS}"
-        )
+    try:
+        dataset = dataset_registry.materialize(name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
     return {
         "message": f"Preloaded dataset '{name}' selected successfully",
-        "dataset": name_lower,
+        "dataset": name.lower(),
+        "version": dataset.manifest["version"],
         "status": "ready",
-        "path": f"internal://preloaded/{name_lower}"
+        "path": str(dataset.dataset_dir),
+        "manifest": dataset.manifest
     }
 
 @router.delete("/upload/{filename}")
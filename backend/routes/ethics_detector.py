@@ -8,13 +8,18 @@ Year: 2025
 Vision: Promote ethical AI by detecting bias in datasets.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, File, UploadFile
 from pydantic import BaseModel
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import hashlib
 import logging
+import json
+import uuid
 
 # Import detector
 from ..utils.ethics_detector import EthicsDetector
+from ..utils.tabular_ingest import TabularIngestor, TABLE_DIR
 
 # Initialize router
 router = APIRouter(prefix="/api/v1/ethics", tags=["ethics"])
@@ -31,6 +36,13 @@ class DatasetInfo(BaseModel):
     target_variable: str
     collection_method: str
 
+class FairnessRequest(BaseModel):
+    table_id: str
+    sensitive_attributes: List[str]
+    label: Optional[str] = None
+    prediction: Optional[str] = None
+    positive_label: Optional[str] = None
+
 @router.post("/detect")
 async def detect_bias(dataset_info: DatasetInfo):
     """
@@ -85,6 +97,73 @@ async def generate_ethics_report(dataset_info: DatasetInfo):
         logger.error(f"Ethics Report Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/fairness")
+def measure_fairness(request: FairnessRequest):
+    """
+    Measure group fairness from an ingested table or prediction file
+    (runs in the thread pool because it reads whole columns)
+    """
+    table_dir = TABLE_DIR / Path(request.table_id).name
+    if not (table_dir / "schema.json").exists():
+        raise HTTPException(status_code=404, detail="Table not found")
+    
+    logger.info(f"Measuring fairness for table: {request.table_id}")
+    result = EthicsDetector.measure_fairness(
+        table_dir,
+        request.sensitive_attributes,
+        label=request.label,
+        prediction=request.prediction,
+        positive_label=request.positive_label
+    )
+    
+    if "error" in result:
+        raise HTTPException(status_code=422, detail=result["error"])
+    
+    return result
+
+@router.post("/fairness/predictions")
+def upload_prediction_file(file: UploadFile = File(...)):
+    """
+    Upload a CSV of predictions (sensitive attributes, label, prediction columns)
+    and ingest it as a table for /fairness
+    """
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only .csv prediction files are supported")
+    
+    # The id ends in a content hash: uploads that share a filename (every class's
+    # predictions.csv) get their own tables, and re-uploading a file reuses its table
+    TABLE_DIR.mkdir(parents=True, exist_ok=True)
+    csv_path = TABLE_DIR / f"upload_{uuid.uuid4().hex[:8]}.csv"
+    try:
+        digest = hashlib.sha256()
+        with open(csv_path, "wb") as f:
+            while True:
+                chunk = file.file.read(1024 * 1024)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+        table_id = f"predictions__{Path(file.filename).stem.lower()}_{digest.hexdigest()[:12]}"
+        output_dir = TABLE_DIR / table_id
+        if (output_dir / "schema.json").exists():
+            with open(output_dir / "schema.json") as f:
+                schema = json.load(f)
+        else:
+            schema = TabularIngestor(csv_path, output_dir).ingest()
+    except Exception as e:
+        logger.error(f"Prediction File Error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Could not read prediction file: {str(e)}")
+    finally:
+        csv_path.unlink(missing_ok=True)
+    
+    return {
+        "status": "success",
+        "table_id": table_id,
+        "rows": schema["rows"],
+        "columns": [{"name": c["name"], "kind": c["kind"]} for c in schema["columns"]],
+        "message": "📥 Prediction file ready for fairness analysis"
+    }
+
 @router.get("/principles")
 async def get_ai_ethics_principles():
     """
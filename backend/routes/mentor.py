@@ -9,11 +9,14 @@ Vision: Every student deserves a personal AI tutor.
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List, Iterator
 import logging
 import random
 
+from ..utils.sse import sse_event, SSE_HEADERS
+
 # Initialize router
 router = APIRouter(prefix="/api/v1/mentor", tags=["mentor"])
 
@@ -74,36 +77,39 @@ RESPONSE_RULES = {
 class MentorMessage(BaseModel):
     message: str
 
+def _mentor_reply(message: str) -> List[str]:
+    """Response paragraphs for a student question"""
+    user_message = message.lower()
+    response_parts = []
+
+    # Check for keywords
+    found = False
+    for keyword, responses in RESPONSE_RULES.items():
+        if keyword in user_message:
+            response_parts.append(random.choice(responses))
+            found = True
+
+    # Add general advice
+    if not found:
+        response_parts = list(RESPONSE_RULES["default"])
+
+    # Add encouragement
+    encouragement = [
+        "Keep experimenting — every great researcher started where you are!",
+        "Don't worry if it doesn't work at first. AI is about iteration.",
+        "You're doing great! Every experiment teaches you something new.",
+        "Remember: even PhD students struggle with these concepts."
+    ]
+    response_parts.append(random.choice(encouragement))
+    return response_parts
+
 @router.post("/chat")
 async def ai_mentor_chat(msg: MentorMessage):
     """
     Get AI-powered educational response to student questions
     """
     try:
-        user_message = msg.message.lower()
-        response_parts = []
-
-        # Check for keywords
-        found = False
-        for keyword, responses in RESPONSE_RULES.items():
-            if keyword in user_message:
-                response_parts.append(random.choice(responses))
-                found = True
-
-        # Add general advice
-        if not found:
-            response_parts = RESPONSE_RULES["default"]
-
-        # Add encouragement
-        encouragement = [
-            "Keep experimenting — every great researcher started where you are!",
-            "Don't worry if it doesn't work at first. AI is about iteration.",
-            "You're doing great! Every experiment teaches you something new.",
-            "Remember: even PhD students struggle with these concepts."
-        ]
-        response_parts.append(random.choice(encouragement))
-
-        full_response = "\n\n".join(response_parts)
+        full_response = "\n\n".join(_mentor_reply(msg.message))
 
         logger.info(f"AI Mentor responded to: {msg.message[:50]}...")
         
@@ -120,3 +126,23 @@ async def ai_mentor_chat(msg: MentorMessage):
             status_code=500,
             detail=f"Failed to generate response: {str(e)}"
   )
+
+@router.post("/chat/stream")
+async def ai_mentor_chat_stream(msg: MentorMessage):
+    """
+    Same response as /chat as Server-Sent Events: one `message` event per
+    paragraph, then `done`, so the chat UI shares the insight streaming path
+    """
+    parts = _mentor_reply(msg.message)
+    logger.info(f"AI Mentor streaming response to: {msg.message[:50]}...")
+
+    def events() -> Iterator[str]:
+        for index, part in enumerate(parts):
+            yield sse_event("message", {"index": index, "text": part})
+        yield sse_event("done", {
+            "success": True,
+            "source": "educational_rules_v1",
+            "timestamp": __import__('datetime').datetime.utcnow().isoformat()
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -8,189 +8,61 @@ Year: 2025
 Vision: Every student should be able to share their AI research professionally.
 """
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import Response
-import json
-from datetime import datetime
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import Response, StreamingResponse, JSONResponse
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
 import asyncio
+import uuid
+import re
 
-# HTML to PDF
-from weasyprint import HTML
-from jinja2 import Template
+# PDF rendering runs in warm worker processes, never on the event loop
+from ..utils.pdf_renderer import PdfRenderer, SAMPLE_RESULT
+from ..utils.report_export import BulkReportExport, EXPORT_FORMATS
+from ..utils.classroom_manager import ClassroomManager
+from ..utils.deadlines import Deadline, REPORT_BUDGET_MS, BUDGET_HEADER, PATH_HEADER, REASON_HEADER
 
 # Initialize router
 router = APIRouter(prefix="/api/v1/reports", tags=["reports"])
 
 # In-memory results store (should match results.py)
-from .results import training_results
+from .results import training_results, build_result
 
-# HTML Template for PDF (inline for simplicity)
-PDF_TEMPLATE = """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <style>
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-            background: #f9f9f9;
-        }
-        .header {
-            text-align: center;
-            padding: 20px 0;
-            background: linear-gradient(135deg, #000000, #0f172a);
-            color: white;
-            border-radius: 10px;
-            margin-bottom: 30px;
-        }
-        .header h1 {
-            margin: 0;
-            font-size: 28px;
-            color: #00FFFF;
-        }
-        .section {
-            background: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            margin-bottom: 20px;
-        }
-        h2 {
-            color: #0f172a;
-            border-bottom: 2px solid #00FFFF;
-            padding-bottom: 8px;
-            margin-top: 0;
-        }
-        .metric-grid {
-            display: grid;
-            grid-template-columns: repeat(2, 1fr);
-            gap: 15px;
-            margin: 20px 0;
-        }
-        .metric {
-            padding: 15px;
-            background: #f0f8ff;
-            border-left: 4px solid #00FFFF;
-            border-radius: 4px;
-        }
-        .metric-label {
-            font-size: 14px;
-            color: #666;
-        }
-        .metric-value {
-            font-size: 20px;
-            font-weight: bold;
-            color: #0f172a;
-        }
-        .insight {
-            background: #e8f5e8;
-            padding: 12px;
-            border-radius: 6px;
-            margin: 8px 0;
-            border-left: 4px solid #4CAF50;
-        }
-        .footer {
-            text-align: center;
-            margin-top: 40px;
-            color: #666;
-            font-size: 12px;
-            border-top: 1px solid #eee;
-            padding-top: 20px;
-        }
-        .logo {
-            width: 50px;
-            height: 50px;
-            background: #00FFFF;
-            border-radius: 50%;
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            color: black;
-            font-weight: bold;
-            margin-right: 10px;
-        }
-    </style>
-</head>
-<body>
-    <div class="header">
-        <div style="display: flex; align-items: center; justify-content: center;">
-            <div class="logo">AI</div>
-            <h1>AetherAI Experiment Report</h1>
-        </div>
-        <p>Generated on {{ report.generation_date }} | AetherAI v0.1.0</p>
-    </div>
+# Shared renderer: worker pool plus content-hash PDF cache
+pdf_renderer = PdfRenderer()
 
-    <div class="section">
-        <h2>🔧 Experiment Configuration</h2>
-        <div class="metric-grid">
-            <div class="metric">
-                <div class="metric-label">Model</div>
-                <div class="metric-value">{{ result.model|upper }}</div>
-            </div>
-            <div class="metric">
-                <div class="metric-label">Dataset</div>
-                <div class="metric-value">{{ result.dataset }}</div>
-            </div>
-            <div class="metric">
-                <div class="metric-label">Epochs</div>
-                <div class="metric-value">{{ result.epochs }}</div>
-            </div>
-            <div class="metric">
-                <div class="metric-label">Training Time</div>
-                <div class="metric-value">{{ '%.1f' % (result.training_time_seconds / 60) }} min</div>
-            </div>
-        </div>
-    </div>
+# Bulk exports by id (only the most recent are kept)
+bulk_exports: Dict[str, BulkReportExport] = {}
+MAX_BULK_EXPORTS = 100
 
-    <div class="section">
-        <h2>📊 Performance Metrics</h2>
-        <div class="metric-grid">
-            <div class="metric">
-                <div class="metric-label">Final Accuracy</div>
-                <div class="metric-value" style="color: #4CAF50;">{{ '%.2f' % (result.final_accuracy * 100) }}%</div>
-            </div>
-            <div class="metric">
-                <div class="metric-label">Final Loss</div>
-                <div class="metric-value" style="color: #F44336;">{{ '%.3f' % result.final_loss }}</div>
-            </div>
-        </div>
-    </div>
+# Queued report tokens are PDF cache keys
+REPORT_TOKEN = re.compile(r"^[0-9a-f]{64}$")
 
-    <div class="section">
-        <h2>🧠 AI-Generated Insights</h2>
-        {% for insight in result.insights %}
-        <div class="insight">{{ insight }}</div>
-        {% endfor %}
-    </div>
+# Request model
+class BulkExportRequest(BaseModel):
+    experiment_ids: Optional[List[str]] = None
+    class_id: Optional[str] = None
+    format: str = "zip"
 
-    <div class="section">
-        <h2>📈 Training Curves (Summary)</h2>
-        <p>Accuracy improved from {{ '%.1f' % (result.metrics.accuracy[0] * 100) }}% to {{ '%.1f' % (result.final_accuracy * 100) }}%.</p>
-        <p>Loss decreased from {{ '%.3f' % result.metrics.loss[0] }} to {{ '%.3f' % result.final_loss }}.</p>
-        <p><strong>Status:</strong> 
-            {% if result.final_accuracy > 0.9 %}✅ Excellent performance{% elif result.final_accuracy > 0.7 %}✅ Good performance{% else %}⚠️ Room for improvement{% endif %}
-        </p>
-    </div>
+@router.on_event("startup")
+def warm_pdf_renderer():
+    pdf_renderer.warm()
 
-    <div class="footer">
-        <p>Generated by AetherAI – Open-source platform for students without GPUs</p>
-        <p>Developed by Kareem Mostafa in Egypt | https://github.com/kareemcompsci07/aetherai</p>
-        <p>This report is auto-generated. No manual editing required.</p>
-    </div>
-</body>
-</html>
-"""
+@router.on_event("shutdown")
+def stop_pdf_renderer():
+    pdf_renderer.shutdown()
 
 @router.post("/generate")
-async def generate_experiment_report(experiment_data: Dict[Any, Any]):
+async def generate_experiment_report(experiment_data: Dict[Any, Any],
+                                     latency_budget_ms: Optional[float] = Header(None, alias=BUDGET_HEADER)):
     """
-    Generate a professional PDF report for an AI experiment
+    Generate a professional PDF report for an AI experiment.
+    
+    The PDF is returned if it is cached or renders within the latency budget
+    (X-Latency-Budget-Ms, default REPORT_BUDGET_MS). Otherwise the render
+    keeps going in the background and a 202 with a report token and the
+    experiment summary is returned at once; the PDF is then fetched from
+    /queued/{token}. X-Response-Path says which: cache, rendered or queued.
     """
     # Extract experiment_id from request
     experiment_id = experiment_data.get("experiment_id")
@@ -209,30 +81,49 @@ async def generate_experiment_report(experiment_data: Dict[Any, Any]):
         )
     
     result = training_results[experiment_id]
+    deadline = Deadline.from_request(latency_budget_ms, REPORT_BUDGET_MS)
     
-    # Add report metadata
-    report_metadata = {
-        "generation_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "version": "AetherAI v0.1.0"
-    }
-    
-    # Render HTML with Jinja2
-    template = Template(PDF_TEMPLATE)
-    html_string = template.render(result=result, report=report_metadata)
-    
-    # Convert HTML to PDF
+    # Convert to PDF (cached by content, rendered in a worker process)
     try:
-        # Simulate processing time
-        await asyncio.sleep(1)
+        # Estimate before submitting, so this render is not counted ahead of itself
+        estimated_wait = pdf_renderer.estimate_wait()
+        future = pdf_renderer.submit(result)
+        if future.done():
+            path, reason = "cache", None
+        elif estimated_wait > deadline.remaining():
+            path, reason = "queued", "queue"
+        else:
+            done, _ = await asyncio.wait({asyncio.wrap_future(future)}, timeout=deadline.remaining())
+            path, reason = ("rendered", None) if done else ("queued", "timeout")
         
-        html = HTML(string=html_string)
-        pdf = html.write_pdf()
+        if path == "queued":
+            token = pdf_renderer.cache_key(result)
+            return JSONResponse(
+                status_code=202,
+                headers={PATH_HEADER: path, REASON_HEADER: reason},
+                content={
+                    "experiment_id": experiment_id,
+                    "report_token": token,
+                    "download_url": f"/api/v1/reports/queued/{token}",
+                    "summary": {
+                        "model": result.get("model"),
+                        "dataset": result.get("dataset"),
+                        "final_accuracy": result.get("final_accuracy"),
+                        "final_loss": result.get("final_loss"),
+                        "insights": result.get("insights", [])
+                    },
+                    **deadline.report(path, reason),
+                    "status": "queued",
+                    "message": "⏳ Report is still rendering; download it from download_url shortly"
+                }
+            )
         
         return Response(
-            content=pdf,
+            content=future.result(),
             media_type='application/pdf',
             headers={
-                "Content-Disposition": f"attachment; filename=aetherai_experiment_{experiment_id}.pdf"
+                "Content-Disposition": f"attachment; filename=aetherai_experiment_{experiment_id}.pdf",
+                PATH_HEADER: path
             }
         )
         
@@ -242,45 +133,41 @@ async def generate_experiment_report(experiment_data: Dict[Any, Any]):
             detail=f"Failed to generate PDF: {str(e)}"
         )
 
+@router.get("/queued/{token}")
+async def download_queued_report(token: str):
+    """
+    PDF of a report that did not render within its latency budget
+    (202 while it is still rendering)
+    """
+    if not REPORT_TOKEN.match(token):
+        raise HTTPException(status_code=400, detail="Invalid report token")
+    
+    # Checked first: a render leaves the in-flight set only once its PDF is cached
+    rendering = pdf_renderer.pending(token)
+    pdf = pdf_renderer.cached(token)
+    if pdf is not None:
+        return Response(
+            content=pdf,
+            media_type='application/pdf',
+            headers={
+                "Content-Disposition": f"attachment; filename=aetherai_report_{token[:12]}.pdf"
+            }
+        )
+    if rendering:
+        return JSONResponse(
+            status_code=202,
+            content={"report_token": token, "status": "rendering", "message": "⏳ Report is still rendering"}
+        )
+    raise HTTPException(status_code=404, detail="Report not found (render failed or cache evicted); generate it again")
+
 @router.get("/sample")
 async def get_sample_report():
     """
     Generate a sample report for demonstration
     """
-    sample_result = {
-        "experiment_id": "sample-001",
-        "model": "cnn",
-        "dataset": "MNIST",
-        "final_accuracy": 0.983,
-        "final_loss": 0.054,
-        "epochs": 10,
-        "training_time_seconds": 138,
-        "metrics": {
-            "accuracy": [0.1, 0.45, 0.67, 0.78, 0.82, 0.86, 0.89, 0.91, 0.95, 0.983],
-            "loss": [2.3, 1.8, 1.4, 1.1, 0.9, 0.7, 0.6, 0.5, 0.4, 0.054]
-        },
-        "insights": [
-            "✅ Excellent accuracy achieved — model learned effectively.",
-            "📉 Low final loss indicates good convergence.",
-            "📈 Strong improvement in accuracy over epochs.",
-            "💡 Tip: For images, consider data normalization and augmentation."
-        ]
-    }
-    
-    # Add report metadata
-    report_metadata = {
-        "generation_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "version": "AetherAI v0.1.0"
-    }
-    
-    # Render HTML with Jinja2
-    template = Template(PDF_TEMPLATE)
-    html_string = template.render(result=sample_result, report=report_metadata)
-    
     # Convert to PDF
     try:
-        html = HTML(string=html_string)
-        pdf = html.write_pdf()
+        pdf = await pdf_renderer.render(SAMPLE_RESULT)
         
         return Response(
             content=pdf,
@@ -294,4 +181,96 @@ async def get_sample_report():
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate sample PDF: {str(e)}"
-      )
+        )
+
+def _class_results(class_id: str) -> List[Dict[str, Any]]:
+    """Completed experiments tagged with the class or run by one of its students"""
+    from .training import training_jobs
+
+    classroom = ClassroomManager.CLASSROOM_DATA.get(class_id, {})
+    student_ids = {student["id"] for student in classroom.get("students", [])}
+    results = []
+    for experiment_id in list(training_results) + [job_id for job_id in training_jobs if job_id not in training_results]:
+        result = training_results.get(experiment_id) or build_result(experiment_id)
+        if result and (result.get("class_id") == class_id or result.get("student_id") in student_ids):
+            results.append(result)
+    return results
+
+@router.post("/bulk")
+async def start_bulk_export(request: BulkExportRequest):
+    """
+    Prepare a bulk export of many reports (a class or a list of experiments),
+    downloaded as a zip of PDFs or as one merged PDF
+    """
+    if request.format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(EXPORT_FORMATS)}")
+    if not request.experiment_ids and not request.class_id:
+        raise HTTPException(status_code=400, detail="experiment_ids or class_id is required")
+    
+    missing = []
+    if request.experiment_ids:
+        results = []
+        for experiment_id in dict.fromkeys(request.experiment_ids):
+            result = training_results.get(experiment_id) or build_result(experiment_id)
+            if result:
+                results.append(result)
+            else:
+                missing.append(experiment_id)
+        title = "aetherai_reports"
+    else:
+        results = _class_results(request.class_id)
+        title = f"aetherai_{request.class_id}_reports"
+    
+    if not results:
+        raise HTTPException(status_code=404, detail="No completed experiments found for this export")
+    
+    export_id = uuid.uuid4().hex[:12]
+    bulk_exports[export_id] = BulkReportExport(export_id, results, pdf_renderer, request.format, title)
+    while len(bulk_exports) > MAX_BULK_EXPORTS:
+        bulk_exports.pop(next(iter(bulk_exports)))
+    
+    return {
+        "export_id": export_id,
+        "format": request.format,
+        "total": len(results),
+        "missing": missing,
+        "download_url": f"/api/v1/reports/bulk/{export_id}/download",
+        "status": "ready",
+        "message": f"📦 {len(results)} reports ready to export"
+    }
+
+@router.get("/bulk/{export_id}")
+async def get_bulk_export(export_id: str):
+    """
+    Progress of a bulk export while it streams
+    """
+    if export_id not in bulk_exports:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return bulk_exports[export_id].progress()
+
+@router.get("/bulk/{export_id}/download")
+async def download_bulk_export(export_id: str):
+    """
+    Stream a bulk export; zip members are sent as soon as each report renders
+    """
+    export = bulk_exports.get(export_id)
+    if export is None:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if export.in_progress:
+        raise HTTPException(status_code=409, detail="This export is already being downloaded")
+    
+    try:
+        await export.prepare()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate PDF: {str(e)}"
+        )
+    
+    return StreamingResponse(
+        export.stream(),
+        media_type=export.media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={export.filename}"
+        }
+    )
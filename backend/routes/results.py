@@ -9,7 +9,7 @@ Vision: Every student deserves to understand their AI experiment results.
 """
 
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import random
 from datetime import datetime
 
@@ -61,33 +61,21 @@ def generate_insights(metrics: Dict) -> list:
     
     return insights
 
-@router.get("/{job_id}")
-async def get_training_results(job_id: str):
-    """
-    Get final results of a completed training job
-    """
-    # First check if job exists in training_jobs (active/completed)
+def build_result(job_id: str) -> Optional[Dict[str, Any]]:
+    """Result of a completed training job, stored in training_results; None if not completed"""
     from .training import training_jobs
     
-    if job_id not in training_jobs:
-        # Check if already stored in results
-        if job_id in training_results:
-            return training_results[job_id]
-        raise HTTPException(status_code=404, detail="Training job not found")
-    
-    job = training_jobs[job_id]
-    
-    if job["status"] != "completed":
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Job not completed yet. Current status: {job['status']}"
-        )
+    job = training_jobs.get(job_id)
+    if job is None or job["status"] != "completed":
+        return None
     
     # Generate result object
     result = {
         "experiment_id": job_id,
         "model": job["config"]["model"],
         "dataset": job["config"]["dataset"],
+        "student_id": job["config"].get("student_id"),
+        "class_id": job["config"].get("class_id"),
         "final_accuracy": job["final_accuracy"],
         "final_loss": job["final_loss"],
         "epochs": job["total_epochs"],
@@ -104,6 +92,30 @@ async def get_training_results(job_id: str):
     
     return result
 
+@router.get("/{job_id}")
+async def get_training_results(job_id: str):
+    """
+    Get final results of a completed training job
+    """
+    # First check if job exists in training_jobs (active/completed)
+    from .training import training_jobs
+    
+    if job_id not in training_jobs:
+        # Check if already stored in results
+        if job_id in training_results:
+            return training_results[job_id]
+        raise HTTPException(status_code=404, detail="Training job not found")
+    
+    job = training_jobs[job_id]
+    
+    if job["status"] != "completed":
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Job not completed yet. Current status: {job['status']}"
+        )
+    
+    return build_result(job_id)
+
 @router.get("/{job_id}/insights")
 async def get_model_insights(job_id: str):
     """
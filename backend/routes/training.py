@@ -10,17 +10,33 @@ Vision: Democratizing AI research for students without GPUs
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional
 import asyncio
 import random
 from datetime import datetime
 
+from ..utils.dataset_shards import SHARD_DIR, MAX_IMAGE_SIZE
+from ..utils.dataset_preview import PREVIEW_DIR, PREVIEW_ID
+from ..utils.tabular_ingest import ColumnarTable, TABLE_DIR
+from ..utils.text_tokens import TOKEN_DIR
+
 # Initialize router
 router = APIRouter(prefix="/api/v1/training", tags=["training"])
 
 # In-memory storage for training jobs (in production: use Redis or DB)
 training_jobs: Dict[str, Dict] = {}
 
+# Real training runs one job at a time so it never starves the API of CPU
+training_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="training")
+
+# Models the factory can build and train for real on prepared datasets
+REAL_TRAINING_MODELS = {"cnn", "mlp"}
+
+# Uploaded datasets (see routes/datasets.py) that can be trained on straight from the zip
+UPLOAD_DIR = Path("uploads/datasets")
+
 # Mock model configurations
 SUPPORTED_MODELS = [
     "cnn", "transformer", "mlp", "resnet-18", 
@@ -41,6 +57,16 @@ class TrainingConfig(BaseModel):
     epochs: int = 10
     learning_rate: float = 0.001
     batch_size: int = 32
+    student_id: Optional[str] = None  # Lets teachers export a whole class's reports
+    class_id: Optional[str] = None
+    shards: Optional[str] = None  # Uploaded dataset converted via /api/v1/datasets/shards: train on it for real
+    tokens: Optional[str] = None  # token_id from /api/v1/datasets/tokens: train an LSTM on it for real
+    upload: Optional[str] = None  # Uploaded image-folder zip (filename, or preview_id from /api/v1/datasets/analyze)
+    image_size: int = 32  # Side length uploaded images are decoded to
+    channels: int = 3
+    augment: bool = False  # Random crop/flip/shift of shard or zip images while training
+    table: Optional[str] = None  # table_id from /api/v1/datasets/tables: train an MLP to predict `target`
+    target: Optional[str] = None
 
 @router.post("/start")
 async def start_training(config: TrainingConfig):
@@ -58,6 +84,52 @@ async def start_training(config: TrainingConfig):
     if not config.dataset:
         raise HTTPException(status_code=400, detail="Dataset is required")
 
+    # Real training needs one prepared dataset; without one the run is simulated
+    sources = [name for name in ("shards", "tokens", "upload", "table") if getattr(config, name)]
+    if len(sources) > 1:
+        raise HTTPException(status_code=400, detail=f"Choose one dataset source, not {sources}")
+    mode, data_path = (sources[0], None) if sources else ("simulated", None)
+    if config.tokens:
+        data_path = TOKEN_DIR / Path(config.tokens).name
+        if not (data_path / "meta.json").exists():
+            raise HTTPException(status_code=404, detail="Tokenized corpus not found")
+        if config.model.lower() != "lstm":
+            raise HTTPException(status_code=400, detail="Training on tokens supports: ['lstm']")
+    if config.shards:
+        data_path = SHARD_DIR / Path(config.shards).stem.lower()
+        if not (data_path / "index.json").exists():
+            raise HTTPException(status_code=404, detail="Dataset has not been converted to shards yet")
+    if config.upload:
+        if PREVIEW_ID.match(config.upload):
+            data_path = PREVIEW_DIR / f"{config.upload}.zip"
+        else:
+            data_path = UPLOAD_DIR / Path(config.upload).name
+        if data_path.suffix.lower() != ".zip" or not data_path.exists():
+            raise HTTPException(status_code=404, detail="Uploaded zip dataset not found")
+        if not 1 <= config.image_size <= MAX_IMAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"image_size must be between 1 and {MAX_IMAGE_SIZE}")
+        if config.channels not in (1, 3):
+            raise HTTPException(status_code=400, detail="channels must be 1 or 3")
+    if config.table:
+        data_path = TABLE_DIR / Path(config.table).name
+        if not (data_path / "schema.json").exists():
+            raise HTTPException(status_code=404, detail="Ingested table not found")
+        if config.model.lower() != "mlp":
+            raise HTTPException(status_code=400, detail="Training on tables supports: ['mlp']")
+        table = ColumnarTable(data_path)
+        if config.target not in table.column_names:
+            raise HTTPException(status_code=400, detail=f"target must be one of the table's columns: {table.column_names}")
+        if not table.can_classify(config.target):
+            raise HTTPException(status_code=400, detail=f"Column '{config.target}' is not a class label "
+                                                        "(categorical, or integers with few distinct values)")
+    if mode in ("shards", "upload") and config.model.lower() not in REAL_TRAINING_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Training on {mode} supports: {sorted(REAL_TRAINING_MODELS)}"
+        )
+    if config.epochs < 1:
+        raise HTTPException(status_code=400, detail="epochs must be at least 1")
+
     # Generate job ID
     job_id = f"job_{len(training_jobs) + 1:06d}"
     
@@ -77,10 +149,21 @@ async def start_training(config: TrainingConfig):
             "accuracy": [],
             "loss": []
         },
-        "simulation_profile": profile
+        "simulation_profile": profile,
+        "mode": mode
     }
 
     # Run training in background
+    if data_path is not None:
+        asyncio.get_running_loop().run_in_executor(training_executor, run_dataset_training, job_id,
+                                                   mode, data_path)
+        return {
+            "message": "Training started successfully",
+            "job_id": job_id,
+            "status": "running",
+            "mode": training_jobs[job_id]["mode"],
+            "device": "cpu"
+        }
     asyncio.create_task(simulate_training(job_id))
 
     return {
@@ -126,6 +209,54 @@ async def simulate_training(job_id: str):
             job["final_loss"] = round(loss, 4)
             break
 
+def run_dataset_training(job_id: str, mode: str, data_path: Path):
+    """
+    Train for real on packed shards, an uploaded zip, an ingested table or a
+    tokenized corpus (runs on training_executor), recording the same
+    per-epoch metrics as the simulation
+    """
+    from ..utils.model_training import train_on_shards, train_on_table, train_on_tokens, train_on_zip
+    
+    job = training_jobs[job_id]
+    config = job["config"]
+    
+    def on_epoch(epoch: int, accuracy: float, loss: float):
+        job["current_epoch"] = epoch
+        job["progress"] = int(epoch / job["total_epochs"] * 100)
+        job["metrics"]["accuracy"].append(accuracy)
+        job["metrics"]["loss"].append(loss)
+    
+    settings = dict(
+        epochs=job["total_epochs"],
+        batch_size=config["batch_size"],
+        learning_rate=config["learning_rate"],
+        on_epoch=on_epoch,
+        should_cancel=lambda: job["status"] == "cancelled"
+    )
+    try:
+        if mode == "tokens":
+            history = train_on_tokens(data_path, **settings)
+        elif mode == "table":
+            history = train_on_table(data_path, config["target"], **settings)
+        elif mode == "upload":
+            history = train_on_zip(data_path, config["model"].lower(), image_size=config["image_size"],
+                                   channels=config["channels"], augment=config["augment"], **settings)
+        else:
+            history = train_on_shards(data_path, config["model"].lower(), augment=config["augment"], **settings)
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+        job["end_time"] = datetime.utcnow().isoformat()
+        return
+    
+    if history["cancelled"]:
+        return
+    job["status"] = "completed"
+    job["end_time"] = datetime.utcnow().isoformat()
+    job["final_accuracy"] = history["accuracy"][-1]
+    job["final_loss"] = history["loss"][-1]
+    job["num_samples"] = history["num_samples"]
+
 @router.get("/status/{job_id}")
 async def get_training_status(job_id: str):
     """
@@ -0,0 +1,130 @@
+"""
+AetherAI - Persistent Analysis Cache
+File: backend/utils/analysis_cache.py
+Purpose: Disk-backed, size-bounded LRU cache for dataset analysis results
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Never analyze the same dataset twice.
+"""
+
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import sqlite3
+import time
+
+# Defaults
+DEFAULT_CACHE_PATH = Path("uploads/cache/analysis_cache.sqlite3")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256MB
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_file(file_path: Path) -> str:
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """
+    LRU cache of JSON results stored in SQLite.
+
+    Entries are keyed by content hash plus analyzer version, so a renamed or
+    re-uploaded file never returns someone else's analysis. SQLite (WAL mode)
+    makes the cache safe to share between uvicorn worker processes and keeps
+    it across restarts. Filenames are stored as aliases pointing at the most
+    recent content key, so lookups by name still work.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS aliases ("
+                "name TEXT PRIMARY KEY, key TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(content_hash: str, version: str) -> str:
+        """Cache key for a dataset's content under a given analyzer version"""
+        return f"{content_hash}:{version}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value and mark it as recently used"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a value, then evict least recently used entries beyond max_bytes"""
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, size, time.time())
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, old_size in conn.execute(
+                    "SELECT key, size FROM entries WHERE key != ? ORDER BY last_access ASC", (key,)
+                ).fetchall():
+                    conn.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                    total -= old_size
+                    if total <= self.max_bytes:
+                        break
+            conn.execute("COMMIT")
+
+    def set_alias(self, name: str, key: str):
+        """Point a human-friendly name (e.g. upload filename) at a cache key"""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO aliases (name, key, updated_at) VALUES (?, ?, ?)",
+                (name, key, time.time())
+            )
+
+    def resolve_alias(self, name: str) -> Optional[str]:
+        """Return the cache key a name currently points at"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT key FROM aliases WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def get_by_alias(self, name: str) -> Optional[Dict[str, Any]]:
+        """Look up a value through its alias"""
+        key = self.resolve_alias(name)
+        return self.get(key) if key else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and size usage"""
+        with closing(self._connect()) as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "entries": count,
+            "size_bytes": total,
+            "max_bytes": self.max_bytes,
+            "usage": round(total / self.max_bytes, 4) if self.max_bytes else 0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; a fresh connection per call keeps this thread- and process-safe
+        return sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
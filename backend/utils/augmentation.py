@@ -0,0 +1,190 @@
+"""
+AetherAI - Batched Data Augmentation
+File: backend/utils/augmentation.py
+Purpose: Augment and normalize whole uint8 image batches with vectorized ops in a prefetch thread
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: The augmentation tips our mentor gives should cost students almost nothing.
+"""
+
+from typing import Iterable, Iterator, Optional, Sequence, Tuple, Any
+import threading
+import queue
+
+import numpy as np
+
+# Per-channel statistics for common datasets (RGB order)
+NORMALIZATION_PRESETS = {
+    "mnist": ((0.1307,), (0.3081,)),
+    "cifar": ((0.4914, 0.4822, 0.4465), (0.2470, 0.2435, 0.2616)),
+    "imagenet": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225))
+}
+DEFAULT_PREFETCH = 2
+
+class BatchAugmenter:
+    """
+    Random crop, horizontal flip and shift for a whole (N, H, W, C) uint8 batch
+    in one vectorized gather, followed by normalization to float32 (N, C, H, W).
+
+    For every sample a source coordinate grid is built from its crop box,
+    flip and shift, and the batch is gathered with a single np.take; pixels
+    shifted in from outside the image are filled with zeros. There is no
+    per-sample Python loop and no PIL round trip.
+
+    Usage with packed shards (see dataset_shards.py):
+        augmenter = BatchAugmenter(preset="cifar")
+        with PrefetchIterator(shards.iter_batches(64), augmenter, as_tensor=True) as batches:
+            for images, labels in batches:
+                ...
+    """
+
+    def __init__(self, crop_scale: Tuple[float, float] = (0.8, 1.0), flip: bool = True,
+                 max_shift: int = 2, mean: Optional[Sequence[float]] = None,
+                 std: Optional[Sequence[float]] = None, preset: Optional[str] = None,
+                 channels: Optional[int] = None, seed: Optional[int] = None):
+        if not 0 < crop_scale[0] <= crop_scale[1] <= 1:
+            raise ValueError("crop_scale must satisfy 0 < min <= max <= 1")
+        if preset is not None:
+            if preset not in NORMALIZATION_PRESETS:
+                raise ValueError(f"Unknown preset '{preset}'. Options: {list(NORMALIZATION_PRESETS)}")
+            mean, std = NORMALIZATION_PRESETS[preset]
+        self.crop_scale = crop_scale
+        self.flip = flip
+        self.max_shift = max_shift
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float32).ravel()
+        self.std = None if std is None else np.asarray(std, dtype=np.float32).ravel()
+        if self.mean is not None and self.std is not None and len(self.mean) != len(self.std):
+            raise ValueError(f"mean has {len(self.mean)} channels but std has {len(self.std)}")
+        if channels is not None:
+            self._check_channels(channels)
+        self.rng = np.random.default_rng(seed)
+
+    def _check_channels(self, channels: int):
+        """Per-channel stats must match the images' channels (one value is broadcast to all)"""
+        for name, stats in (("mean", self.mean), ("std", self.std)):
+            if stats is not None and len(stats) not in (1, channels):
+                raise ValueError(f"Normalization {name} has {len(stats)} channels but the images have "
+                                 f"{channels} (e.g. a 3-channel preset on grayscale images)")
+
+    def augment(self, images: np.ndarray) -> np.ndarray:
+        """Random crop (resized back with nearest-neighbour sampling), flip and shift; stays uint8 NHWC"""
+        n, h, w, _ = images.shape
+        rng = self.rng
+
+        # Crop box per sample (area fraction in crop_scale, aspect ratio kept)
+        side = np.sqrt(rng.uniform(self.crop_scale[0], self.crop_scale[1], n))
+        crop_h = np.maximum(1, np.round(side * h)).astype(np.int64)
+        crop_w = np.maximum(1, np.round(side * w)).astype(np.int64)
+        top = (rng.random(n) * (h - crop_h + 1)).astype(np.int64)
+        left = (rng.random(n) * (w - crop_w + 1)).astype(np.int64)
+
+        # Source row/column of every output pixel
+        rows = top[:, None] + (np.arange(h)[None, :] * crop_h[:, None]) // h
+        cols = left[:, None] + (np.arange(w)[None, :] * crop_w[:, None]) // w
+        if self.flip:
+            flipped = rng.random(n) < 0.5
+            cols = np.where(flipped[:, None], (left + left + crop_w - 1)[:, None] - cols, cols)
+        if self.max_shift:
+            rows = rows - rng.integers(-self.max_shift, self.max_shift + 1, n)[:, None]
+            cols = cols - rng.integers(-self.max_shift, self.max_shift + 1, n)[:, None]
+
+        # One gather over the flattened pixels: index = (sample * H + row) * W + col
+        valid = ((rows >= 0) & (rows < h))[:, :, None] & ((cols >= 0) & (cols < w))[:, None, :]
+        index = ((np.arange(n)[:, None] * h + np.clip(rows, 0, h - 1))[:, :, None] * w
+                 + np.clip(cols, 0, w - 1)[:, None, :])
+        out = np.take(images.reshape(n * h * w, -1), index.ravel(), axis=0).reshape(images.shape)
+        out[~valid] = 0
+        return out
+
+    def normalize(self, images: np.ndarray) -> np.ndarray:
+        """uint8 (N, H, W, C) -> float32 (N, C, H, W) scaled to [0, 1] and standardized per channel"""
+        self._check_channels(images.shape[-1])
+        # Transpose while still 1 byte per value, then fold /255, -mean and /std
+        # into a single in-place multiply-add
+        mean = self.mean if self.mean is not None else np.zeros(1, dtype=np.float32)
+        std = self.std if self.std is not None else np.ones(1, dtype=np.float32)
+        scale = (1.0 / (255.0 * std)).astype(np.float32).reshape(1, -1, 1, 1)
+        offset = (-mean / std).astype(np.float32).reshape(1, -1, 1, 1)
+        planar = np.ascontiguousarray(images.transpose(0, 3, 1, 2))
+        out = np.empty(planar.shape, dtype=np.float32)
+        np.multiply(planar, scale, out=out)
+        out += offset
+        return out
+
+    def __call__(self, images: np.ndarray, train: bool = True) -> np.ndarray:
+        if images.ndim != 4:
+            raise ValueError(f"Expected a (N, H, W, C) batch, got shape {images.shape}")
+        self._check_channels(images.shape[-1])
+        return self.normalize(self.augment(images) if train else images)
+
+class PrefetchIterator:
+    """
+    Run a batch source and its transform in a background thread, keeping up
+    to `depth` ready batches in a bounded queue so the training loop never
+    waits on data. Exceptions in the worker are re-raised in the consumer.
+    """
+
+    _DONE = object()
+
+    def __init__(self, source: Iterable[Tuple[np.ndarray, np.ndarray]], augmenter: Optional[BatchAugmenter] = None,
+                 train: bool = True, depth: int = DEFAULT_PREFETCH, as_tensor: bool = False):
+        self._source = source
+        self._augmenter = augmenter
+        self._train = train
+        self._as_tensor = as_tensor
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._worker, name="batch-prefetch", daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        try:
+            for images, labels in self._source:
+                if self._stop.is_set():
+                    break
+                if self._augmenter is not None:
+                    images = self._augmenter(images, self._train)
+                if self._as_tensor:
+                    import torch  # Only needed when handing batches straight to a model
+                    images, labels = torch.from_numpy(images), torch.from_numpy(np.asarray(labels))
+                self._put((images, labels))
+        except BaseException as e:
+            self._put(e)
+            return
+        self._put(self._DONE)
+
+    def _put(self, item: Any):
+        # Poll so close() can stop a worker blocked on a full queue
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        return self
+
+    def __next__(self) -> Tuple[Any, Any]:
+        if self._stop.is_set():
+            raise StopIteration
+        item = self._queue.get()
+        if item is self._DONE:
+            self._stop.set()
+            raise StopIteration
+        if isinstance(item, BaseException):
+            self._stop.set()
+            raise item
+        return item
+
+    def close(self):
+        """Stop the worker early (e.g. when training is cancelled mid-epoch)"""
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def __enter__(self) -> "PrefetchIterator":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
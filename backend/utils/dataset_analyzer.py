@@ -8,19 +8,27 @@ Year: 2025
 Vision: Help students understand their data before training.
 """
 
-import zipfile
 import os
 from pathlib import Path
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional
 import re
 from datetime import datetime
 
+from .zip_index import ZipEntry, read_central_directory, read_member
+from .leakage_index import find_split_leaks
+
+# Bump whenever the analysis output changes so cached results are recomputed
+ANALYZER_VERSION = "1.3.1"
+
 # Supported dataset structures
 SUPPORTED_FORMATS = ['.zip']
 IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif'}
 TEXT_EXTENSIONS = {'.txt', '.csv', '.json'}
 
+class AnalysisCancelled(Exception):
+    """Raised inside analyze() when the caller asked to stop"""
+
 class DatasetAnalyzer:
     """
     Analyze uploaded datasets to provide educational insights
@@ -29,27 +37,69 @@ class DatasetAnalyzer:
     def __init__(self, file_path: Path):
         self.file_path = file_path
         self.zip_path = str(file_path)
+        self._progress_callback: Optional[Callable[[float, str], None]] = None
+        self._should_cancel: Optional[Callable[[], bool]] = None
+        self.manifest: Optional[Dict[str, Any]] = None
     
-    def analyze(self) -> Dict[str, Any]:
+    def analyze(self,
+                progress_callback: Optional[Callable[[float, str], None]] = None,
+                should_cancel: Optional[Callable[[], bool]] = None,
+                previous_manifest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Analyze the dataset and return structured insights
+
+        progress_callback(percent, stage) is called as each section finishes and
+        should_cancel() is polled between sections; returning True aborts the
+        analysis with AnalysisCancelled.
+
+        When previous_manifest (self.manifest from an earlier analysis of an
+        older version of this dataset) is given, the central directory is diffed
+        against it by name, size and CRC32 and only the changed members are
+        analyzed; everything else is merged from the earlier run. The manifest
+        for this run is left in self.manifest for the caller to store.
         """
+        self._progress_callback = progress_callback
+        self._should_cancel = should_cancel
+        self.manifest = None
         try:
-            with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
-                file_list = zip_ref.namelist()
+            self._checkpoint(0, "reading archive")
+            with open(self.zip_path, 'rb') as zip_file:
+                infos = read_central_directory(zip_file)
+                self._checkpoint(20, "comparing with previous version")
+                
+                if previous_manifest and previous_manifest.get("version") == ANALYZER_VERSION:
+                    manifest, incremental = self._update_manifest(previous_manifest, infos)
+                else:
+                    manifest, incremental = self._build_manifest(infos), None
+                self._checkpoint(40, "sampling images")
+                self._sample_images(zip_file, infos, manifest)
+                self._checkpoint(70, "summarizing")
+                
+                stats = manifest["stats"]
+                structure = self._analyze_structure(stats, manifest["members"])
+                images = self._analyze_images(stats, manifest["samples"])
+                text = self._analyze_text(stats)
+                self._checkpoint(85, "checking issues")
                 
                 analysis = {
-                    "summary": self._get_summary(file_list),
-                    "structure": self._analyze_structure(file_list),
-                    "images": self._analyze_images(zip_ref, file_list),
-                    "text": self._analyze_text(file_list),
-                    "issues": self._detect_issues(file_list),
-                    "suggestions": self._generate_suggestions(file_list),
-                    "analysis_timestamp": datetime.utcnow().isoformat()
+                    "summary": self._get_summary(stats),
+                    "structure": structure,
+                    "images": images,
+                    "text": text,
+                    "issues": self._detect_issues(stats, structure),
+                    "suggestions": self._generate_suggestions(stats, structure, images, text),
+                    "analysis_timestamp": datetime.utcnow().isoformat(),
+                    "analyzer_version": ANALYZER_VERSION
                 }
+                if incremental is not None:
+                    analysis["incremental"] = incremental
+                self.manifest = manifest
+                self._checkpoint(100, "done")
                 
                 return analysis
                 
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             return {
                 "error": f"Failed to analyze dataset: {str(e)}",
@@ -57,124 +107,228 @@ class DatasetAnalyzer:
                 "timestamp": datetime.utcnow().isoformat()
             }
     
-    def _get_summary(self, file_list: List[str]) -> Dict[str, Any]:
-        """Get basic summary of the dataset"""
-        total_files = len(file_list)
-        directories = len([f for f in file_list if f.endswith('/')])
-        files = total_files - directories
+    def _checkpoint(self, percent: float, stage: str):
+        """Report progress and stop early if cancellation was requested"""
+        if self._should_cancel is not None and self._should_cancel():
+            raise AnalysisCancelled(f"Analysis cancelled during: {stage}")
+        if self._progress_callback is not None:
+            self._progress_callback(percent, stage)
+    
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {
+            "total_files": 0,
+            "directories": 0,
+            "image_files": 0,
+            "text_files": 0,
+            "train": 0,
+            "val": 0,
+            "test": 0,
+            "roots": {},
+            "depths": {}
+        }
+    
+    @staticmethod
+    def _member_record(name: str) -> Dict[str, Any]:
+        """Everything the analysis needs to know about one archive member"""
+        lower = name.lower()
+        suffix = Path(name).suffix.lower()
+        parts = [p for p in name.split('/') if p and not p.startswith('.')]
+        return {
+            "is_dir": name.endswith('/'),
+            "is_image": suffix in IMAGE_EXTENSIONS,
+            "is_text": suffix in TEXT_EXTENSIONS,
+            "train": 'train' in lower,
+            "val": 'val' in lower or 'validation' in lower,
+            "test": 'test' in lower,
+            "root": parts[0] if parts else None,
+            "depth": len([p for p in name.split('/') if p])
+        }
+    
+    @staticmethod
+    def _apply_member(stats: Dict[str, Any], name: str, sign: int):
+        """Add (sign=1) or remove (sign=-1) one member's contribution to the counters"""
+        record = DatasetAnalyzer._member_record(name)
+        stats["total_files"] += sign
+        stats["directories"] += sign * record["is_dir"]
+        stats["image_files"] += sign * record["is_image"]
+        stats["text_files"] += sign * record["is_text"]
+        for split in ("train", "val", "test"):
+            stats[split] += sign * record[split]
+        
+        for counter, key in ((stats["roots"], record["root"]), (stats["depths"], str(record["depth"]))):
+            if key is None:
+                continue
+            counter[key] = counter.get(key, 0) + sign
+            if counter[key] <= 0:
+                del counter[key]
+    
+    def _build_manifest(self, infos: List[ZipEntry]) -> Dict[str, Any]:
+        """Full scan: record every member and aggregate the counters"""
+        stats = self._empty_stats()
+        members = {}
+        for index, info in enumerate(infos):
+            if index % 5000 == 0:
+                self._checkpoint(20 + 20 * index / max(len(infos), 1), "scanning members")
+            members[info.name] = [info.file_size, info.crc]
+            self._apply_member(stats, info.name, 1)
+        
+        return {"version": ANALYZER_VERSION, "members": members, "stats": stats, "samples": {}}
+    
+    def _update_manifest(self, previous: Dict[str, Any], infos: List[ZipEntry]):
+        """
+        Diff the central directory against a previous manifest and update the
+        counters for changed members only
+        """
+        old_members = previous["members"]
+        stats = json.loads(json.dumps(previous["stats"]))  # deep copy
+        members = {}
+        added, changed = [], []
         
+        for info in infos:
+            entry = [info.file_size, info.crc]
+            members[info.name] = entry
+            old_entry = old_members.get(info.name)
+            if old_entry is None:
+                added.append(info.name)
+            elif old_entry != entry:
+                changed.append(info.name)
+        removed = [name for name in old_members if name not in members]
+        
+        for name in removed:
+            self._apply_member(stats, name, -1)
+        for name in added:
+            self._apply_member(stats, name, 1)
+        # Changed members keep their name, so their counters are unchanged;
+        # only content-derived data (image samples) needs refreshing
+        
+        stale = set(removed) | set(changed)
+        samples = {name: size for name, size in previous.get("samples", {}).items() if name not in stale}
+        
+        incremental = {
+            "previous_members": len(old_members),
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+            "reused_members": len(members) - len(added) - len(changed),
+            "analyzed_members": len(added) + len(changed)
+        }
+        return {"version": ANALYZER_VERSION, "members": members, "stats": stats, "samples": samples}, incremental
+    
+    def _sample_images(self, zip_file, infos: List[ZipEntry], manifest: Dict[str, Any], sample_size: int = 10):
+        """Top up the image sample (kept across incremental runs) to sample_size members"""
+        samples = manifest["samples"]
+        if len(samples) >= sample_size:
+            return
+        
+        entries = None
+        for name in manifest["members"]:
+            if len(samples) >= sample_size:
+                break
+            if name in samples or Path(name).suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            if entries is None:
+                entries = {entry.name: entry for entry in infos}
+            try:
+                read_member(zip_file, entries[name])
+                # This is simplified - in real app would use PIL to get size
+                samples[name] = "Unknown (simulated)"
+            except:
+                continue
+    
+    def _get_summary(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Get basic summary of the dataset"""
         return {
-            "total_files": total_files,
-            "directories": directories,
-            "files": files,
+            "total_files": stats["total_files"],
+            "directories": stats["directories"],
+            "files": stats["total_files"] - stats["directories"],
             "size_mb": round(os.path.getsize(self.file_path) / (1024 * 1024), 2)
         }
     
-    def _analyze_structure(self, file_list: List[str]) -> Dict[str, Any]:
+    def _analyze_structure(self, stats: Dict[str, Any], members: Dict[str, List[int]]) -> Dict[str, Any]:
         """Analyze directory structure"""
-        root_dirs = set()
-        train_dirs = 0
-        val_dirs = 0
-        test_dirs = 0
-        
-        for path in file_list:
-            parts = [p for p in path.split('/') if p and not p.startswith('.')]
-            if len(parts) > 0:
-                root_dirs.add(parts[0])
-            
-            if 'train' in path.lower():
-                train_dirs += 1
-            if 'val' in path.lower() or 'validation' in path.lower():
-                val_dirs += 1
-            if 'test' in path.lower():
-                test_dirs += 1
+        root_dirs = list(stats["roots"].keys())
         
         return {
-            "root_directories": list(root_dirs),
-            "has_train_split": train_dirs > 0,
-            "has_validation_split": val_dirs > 0,
-            "has_test_split": test_dirs > 0,
-            "suggests_classification": len(root_dirs) > 1 and all(d.isalpha() for d in root_dirs)
+            "root_directories": root_dirs,
+            "has_train_split": stats["train"] > 0,
+            "has_validation_split": stats["val"] > 0,
+            "has_test_split": stats["test"] > 0,
+            "suggests_classification": len(root_dirs) > 1 and all(d.isalpha() for d in root_dirs),
+            # Same file (size + CRC32, confirmed by content) in more than one split
+            "split_leakage": find_split_leaks(members, self.file_path)
         }
     
-    def _analyze_images(self, zip_ref, file_list: List[str]) -> Dict[str, Any]:
+    def _analyze_images(self, stats: Dict[str, Any], samples: Dict[str, str]) -> Dict[str, Any]:
         """Analyze image content"""
-        image_files = [f for f in file_list if Path(f).suffix.lower() in IMAGE_EXTENSIONS]
-        
-        if not image_files:
+        if stats["image_files"] == 0:
             return {"image_files": 0, "has_images": False}
         
-        # Extract sizes (simplified - in real version would extract actual image dimensions)
-        sizes = []
-        for img_file in image_files[:10]:  # Sample first 10
-            try:
-                with zip_ref.open(img_file) as img:
-                    # This is simplified - in real app would use PIL to get size
-                    sizes.append("Unknown (simulated)")
-            except:
-                continue
-        
         return {
-            "image_files": len(image_files),
+            "image_files": stats["image_files"],
             "has_images": True,
-            "sample_sizes": sizes[:3],
-            "suggests_cnn": len(image_files) > 0
+            "sample_sizes": list(samples.values())[:3],
+            "suggests_cnn": True
         }
     
-    def _analyze_text(self, file_list: List[str]) -> Dict[str, Any]:
+    def _analyze_text(self, stats: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze text content"""
-        text_files = [f for f in file_list if Path(f).suffix.lower() in TEXT_EXTENSIONS]
-        
-        if not text_files:
+        if stats["text_files"] == 0:
             return {"text_files": 0, "has_text": False}
         
         return {
-            "text_files": len(text_files),
+            "text_files": stats["text_files"],
             "has_text": True,
-            "suggests_nlp": len(text_files) > 0
+            "suggests_nlp": True
         }
     
-    def _detect_issues(self, file_list: List[str]) -> List[str]:
+    def _detect_issues(self, stats: Dict[str, Any], structure: Dict[str, Any]) -> List[str]:
         """Detect potential issues"""
         issues = []
         
-        if len(file_list) == 0:
+        if stats["total_files"] == 0:
             issues.append("Dataset appears to be empty")
         
         # Check for very deep nesting
-        max_depth = max((len([p for p in f.split('/') if p]) for f in file_list), default=0)
+        max_depth = max((int(depth) for depth in stats["depths"]), default=0)
         if max_depth > 5:
             issues.append("Deep directory structure - may be hard to navigate")
         
         # Check for mixed content
-        has_images = any(Path(f).suffix.lower() in IMAGE_EXTENSIONS for f in file_list)
-        has_text = any(Path(f).suffix.lower() in TEXT_EXTENSIONS for f in file_list)
-        if has_images and has_text:
+        if stats["image_files"] > 0 and stats["text_files"] > 0:
             issues.append("Mixed image and text files - ensure clear organization")
         
+        # Check for files shared between splits
+        leakage = structure["split_leakage"]
+        if leakage["has_leakage"]:
+            pairs = ", ".join(leakage["by_split_pair"])
+            issues.append(f"{leakage['leaked_files']} files appear in more than one split ({pairs}) - test results will be too optimistic")
+        
         return issues
     
-    def _generate_suggestions(self, file_list: List[str]) -> List[str]:
+    def _generate_suggestions(self, stats: Dict[str, Any],
+                              structure: Dict[str, Any],
+                              images: Dict[str, Any],
+                              text: Dict[str, Any]) -> List[str]:
         """Generate educational suggestions"""
         suggestions = []
         
-        structure = self._analyze_structure(file_list)
-        
         if structure["suggests_classification"]:
             suggestions.append("✅ This structure suggests a classification task. Each folder may be a class.")
         
-        images = self._analyze_images(None, file_list)
         if images["has_images"]:
             suggestions.append("📸 Images detected. A CNN model would be appropriate.")
         
-        text = self._analyze_text(file_list)
         if text["has_text"]:
             suggestions.append("📄 Text files detected. Consider NLP models like Transformer or LSTM.")
         
         if not structure["has_train_split"]:
             suggestions.append("⚠️ No 'train' split found. Consider organizing data into train/validation/test.")
         
-        if not any(Path(f).suffix.lower() in (IMAGE_EXTENSIONS | TEXT_EXTENSIONS) for f in file_list):
+        if structure["split_leakage"]["has_leakage"]:
+            suggestions.append("🚨 Some files are copied between train/validation/test. Remove the copies so the model is tested on data it has never seen.")
+        
+        if stats["image_files"] + stats["text_files"] == 0:
             suggestions.append("⚠️ No common data files found. Ensure dataset contains usable files.")
         
         if len(suggestions) == 0:
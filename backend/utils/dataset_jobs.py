@@ -0,0 +1,200 @@
+"""
+AetherAI - Dataset Background Jobs
+File: backend/utils/dataset_jobs.py
+Purpose: Run slow dataset work (analysis, conversion) off the event loop with progress tracking
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Big datasets should never make the whole platform feel slow.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+from datetime import datetime
+import threading
+import logging
+import asyncio
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = {JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED}
+
+
+class JobContext:
+    """
+    Handle passed to a running job so it can report progress and notice cancellation
+    """
+
+    def __init__(self, manager: "DatasetJobManager", job_id: str, cancel_event: threading.Event):
+        self._manager = manager
+        self.job_id = job_id
+        self._cancel_event = cancel_event
+
+    def report(self, percent: float, stage: Optional[str] = None):
+        """Record job progress (0-100) and the current stage name"""
+        self._manager._update(self.job_id, progress=int(max(0, min(100, percent))), stage=stage)
+
+    def is_cancelled(self) -> bool:
+        """True once a cancellation was requested for this job"""
+        return self._cancel_event.is_set()
+
+
+class DatasetJobManager:
+    """
+    Run dataset jobs on a thread pool and keep their status in memory.
+
+    zipfile/zlib and NumPy release the GIL for the heavy parts, so a small
+    thread pool keeps the API responsive while analyses run in the background.
+    Job functions receive a JobContext as their first argument.
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished_jobs: int = 200):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dataset-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Any] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._cleanups: Dict[str, Callable[[], None]] = {}
+        self._lock = threading.Lock()
+        self._max_finished_jobs = max_finished_jobs
+
+    def submit(self, kind: str, func: Callable[..., Any], *args,
+               cleanup: Optional[Callable[[], None]] = None,
+               metadata: Optional[Dict[str, Any]] = None, **kwargs) -> str:
+        """
+        Queue a job and return its id. `cleanup` always runs once the job ends.
+        """
+        job_id = f"{kind}_{uuid.uuid4().hex[:12]}"
+        cancel_event = threading.Event()
+
+        with self._lock:
+            self._prune_finished()
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": JOB_QUEUED,
+                "progress": 0,
+                "stage": "queued",
+                "created_at": datetime.utcnow().isoformat(),
+                "metadata": metadata or {},
+                "result": None,
+                "error": None
+            }
+            self._cancel_events[job_id] = cancel_event
+            if cleanup is not None:
+                self._cleanups[job_id] = cleanup
+
+        context = JobContext(self, job_id, cancel_event)
+        future = self._executor.submit(self._run, job_id, context, func, args, kwargs)
+        with self._lock:
+            if self._jobs[job_id]["status"] not in FINISHED_STATES:
+                self._futures[job_id] = future
+        return job_id
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Return a snapshot of the job (without its result unless asked)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+        if not include_result:
+            snapshot.pop("result", None)
+        return snapshot
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait up to `timeout` seconds for the job to end without blocking the
+        event loop (the job keeps running if it does not), then return its
+        snapshot including the result.
+        """
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and timeout > 0:
+            await asyncio.wait({asyncio.wrap_future(future)}, timeout=timeout)
+        return self.get(job_id, include_result=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation. Queued jobs stop immediately, running jobs stop
+        at their next progress checkpoint. Returns False if the job already ended.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in FINISHED_STATES:
+                return False
+            self._cancel_events[job_id].set()
+
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            # Never started: _run will not execute, so finish the bookkeeping here
+            self._finish(job_id, JOB_CANCELLED)
+        return True
+
+    def active_count(self) -> int:
+        """Number of queued or running jobs"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] not in FINISHED_STATES)
+
+    def _run(self, job_id: str, context: JobContext, func: Callable[..., Any], args, kwargs):
+        if context.is_cancelled():
+            self._finish(job_id, JOB_CANCELLED)
+            return
+        self._update(job_id, status=JOB_RUNNING, stage="starting", started_at=datetime.utcnow().isoformat())
+        try:
+            result = func(context, *args, **kwargs)
+        except Exception as e:
+            if context.is_cancelled():
+                self._finish(job_id, JOB_CANCELLED)
+            else:
+                logger.error(f"Dataset job {job_id} failed: {str(e)}")
+                self._finish(job_id, JOB_FAILED, error=str(e))
+            return
+        if context.is_cancelled():
+            self._finish(job_id, JOB_CANCELLED)
+        else:
+            self._finish(job_id, JOB_COMPLETED, result=result)
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in FINISHED_STATES:
+                return
+            job["status"] = status
+            job["stage"] = status
+            job["finished_at"] = datetime.utcnow().isoformat()
+            if status == JOB_COMPLETED:
+                job["progress"] = 100
+                job["result"] = result
+            job["error"] = error
+            cleanup = self._cleanups.pop(job_id, None)
+            self._futures.pop(job_id, None)
+
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception as e:
+                logger.warning(f"Cleanup for dataset job {job_id} failed: {str(e)}")
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in FINISHED_STATES:
+                return
+            for key, value in fields.items():
+                if value is not None:
+                    job[key] = value
+
+    def _prune_finished(self):
+        """Forget the oldest finished jobs so the store stays bounded (lock held)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self._max_finished_jobs)]:
+            self._jobs.pop(job_id, None)
+            self._cancel_events.pop(job_id, None)
@@ -0,0 +1,268 @@
+"""
+AetherAI - Dataset Preview
+File: backend/utils/dataset_preview.py
+Purpose: Serve random or per-class thumbnails from uploaded zips without extracting them
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Students should see their data before they train on it.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+import base64
+import io
+import os
+import re
+import time
+
+import numpy as np
+
+from .zip_index import ZipEntry, read_central_directory, read_member
+from .dataset_shards import IMAGE_EXTENSIONS, image_label, member_split
+
+# Configuration
+THUMBNAIL_DIR = Path("uploads/cache/thumbnails")
+DEFAULT_THUMB_SIZE = 96
+MAX_THUMB_SIZE = 256
+MAX_PREVIEW_IMAGES = 128
+INDEX_CACHE_SIZE = 16  # Zips whose image index stays in memory
+PREVIEW_MODES = ("random", "per_class")
+PREVIEW_DIR = Path("uploads/previews")
+PREVIEW_STORE_MAX_BYTES = int(os.getenv("PREVIEW_STORE_MAX_MB", "2048")) * 1024 * 1024
+PREVIEW_ID = re.compile(r"^[0-9a-f]{24}$")
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    """Encoded image -> JPEG thumbnail that fits in size x size (aspect ratio kept)"""
+    from PIL import Image  # Optional dependency, only needed when decoding
+
+    with Image.open(io.BytesIO(data)) as img:
+        # Let JPEG decode at reduced scale; a thumbnail never needs full resolution
+        img.draft("RGB", (size, size))
+        thumb = img.convert("L" if img.mode in ("1", "L") else "RGB")
+        thumb.thumbnail((size, size), Image.BILINEAR)
+        out = io.BytesIO()
+        thumb.save(out, format="JPEG", quality=80)
+    return out.getvalue()
+
+class _ImageIndex:
+    """Image members of one zip with class ids and splits, ready for sampling"""
+
+    def __init__(self, zip_path: Path):
+        self.entries: List[ZipEntry] = []
+        labels, splits = [], []
+        for entry in read_central_directory(zip_path):
+            # Plain string ops: pathlib dominates the cost on 60k-member archives
+            name = entry.name
+            basename = name.rsplit("/", 1)[-1]
+            if os.path.splitext(basename)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            if basename.startswith(".") or name.startswith("__MACOSX"):
+                continue
+            self.entries.append(entry)
+            labels.append(image_label(name))
+            splits.append(member_split(name))
+
+        self.classes: List[str] = sorted({label for label in labels if label is not None})
+        class_ids = {name: i for i, name in enumerate(self.classes)}
+        self.labels = np.array([class_ids.get(label, -1) for label in labels], dtype=np.int64)
+        self.splits = np.array([split or "" for split in splits])
+
+    def select(self, split: Optional[str], label: Optional[str]) -> np.ndarray:
+        """Positions of the images matching an optional split and class filter"""
+        mask = np.ones(len(self.entries), dtype=bool)
+        if split:
+            mask &= self.splits == split
+        if label:
+            mask &= self.labels == (self.classes.index(label) if label in self.classes else -2)
+        return np.flatnonzero(mask)
+
+class PreviewStore:
+    """
+    Analyzed uploads kept under a preview id (a prefix of their SHA-256), so
+    their images can still be previewed once the analysis job is done with
+    its temporary upload. Identical uploads share one file; the least
+    recently previewed zips are evicted past max_bytes.
+
+    Recency is kept in the access time: the modification time stays that of
+    the upload, so DatasetPreviewer's index (keyed on size and mtime) keeps
+    hitting across previews.
+    """
+
+    def __init__(self, store_dir: Path = PREVIEW_DIR, max_bytes: int = PREVIEW_STORE_MAX_BYTES):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def keep(self, upload: Path, sha256: str) -> str:
+        """Move an upload into the store and return its preview id"""
+        preview_id = sha256[:24]
+        path = self.store_dir / f"{preview_id}.zip"
+        os.replace(upload, path)
+        self._evict(keep=path)
+        return preview_id
+
+    def path(self, preview_id: str) -> Optional[Path]:
+        """Stored zip of a preview id, or None if it is unknown or was evicted"""
+        if not PREVIEW_ID.match(preview_id):
+            return None
+        path = self.store_dir / f"{preview_id}.zip"
+        try:
+            os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _evict(self, keep: Path):
+        files = []
+        for path in self.store_dir.glob("*.zip"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue  # The upload just stored is about to be analyzed
+            path.unlink(missing_ok=True)
+            total -= size
+
+class DatasetPreviewer:
+    """
+    Random-access thumbnails for uploaded image datasets.
+
+    The central directory of each zip is parsed once into an in-memory image
+    index (keyed by path, size and mtime, so a re-upload is picked up), and
+    every sampled member is read by seeking straight to its local header.
+    Thumbnails are generated on a thread pool (PIL and zlib release the GIL)
+    and cached on disk by CRC32, size and thumbnail size, so the same image in
+    any dataset is only ever decoded once.
+    """
+
+    def __init__(self, thumb_dir: Path = THUMBNAIL_DIR, max_workers: Optional[int] = None):
+        self.thumb_dir = Path(thumb_dir)
+        self.thumb_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers or max(2, min(8, os.cpu_count() or 2))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="thumbnails")
+        self._indexes: "OrderedDict[Tuple[str, int, int], _ImageIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index(self, zip_path: Path) -> _ImageIndex:
+        stat = zip_path.stat()
+        key = (str(zip_path.resolve()), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+        index = _ImageIndex(zip_path)
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > INDEX_CACHE_SIZE:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _thumb_path(self, entry: ZipEntry, size: int) -> Path:
+        return self.thumb_dir / f"{entry.crc:08x}-{entry.file_size}-{size}.jpg"
+
+    def _render(self, zip_path: Path, entries: List[ZipEntry], size: int) -> List[Optional[bytes]]:
+        """Worker task: thumbnail a slice of members with one file handle; None marks a failure"""
+        thumbs: List[Optional[bytes]] = []
+        with open(zip_path, "rb") as f:
+            for entry in entries:
+                try:
+                    thumb = make_thumbnail(read_member(f, entry), size)
+                except Exception:
+                    thumbs.append(None)
+                    continue
+                # Write then rename, so concurrent requests never read a partial file
+                path = self._thumb_path(entry, size)
+                tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+                tmp.write_bytes(thumb)
+                os.replace(tmp, path)
+                thumbs.append(thumb)
+        return thumbs
+
+    def preview(self, zip_path: Path, n: int = 16, mode: str = "random", per_class: int = 4,
+                split: Optional[str] = None, label: Optional[str] = None, seed: Optional[int] = None,
+                size: int = DEFAULT_THUMB_SIZE) -> Dict[str, Any]:
+        """
+        Sample images from a zip and return them as thumbnail data URIs.
+
+        mode "random" picks n images; mode "per_class" picks per_class images
+        from every class. split ("train"/"val"/"test") and label narrow the pool.
+        """
+        try:
+            zip_path = Path(zip_path)
+            if mode not in PREVIEW_MODES:
+                return {"error": f"mode must be one of {list(PREVIEW_MODES)}", "status": "failed"}
+            size = max(16, min(int(size), MAX_THUMB_SIZE))
+            index = self._index(zip_path)
+            pool = index.select(split, label)
+            if not index.entries:
+                return {"error": "No images found in this dataset", "status": "failed"}
+            if len(pool) == 0:
+                return {"error": "No images match the requested split/label", "status": "failed"}
+
+            rng = np.random.default_rng(seed)
+            if mode == "per_class" and index.classes:
+                per_class = max(1, min(per_class, MAX_PREVIEW_IMAGES // max(len(index.classes), 1)))
+                picked = []
+                for class_id in np.unique(index.labels[pool]):
+                    members = pool[index.labels[pool] == class_id]
+                    picked.append(rng.choice(members, min(per_class, len(members)), replace=False))
+                chosen = np.concatenate(picked)[:MAX_PREVIEW_IMAGES]
+            else:
+                chosen = rng.choice(pool, min(n, len(pool), MAX_PREVIEW_IMAGES), replace=False)
+
+            # Serve cached thumbnails; render the rest in archive order, one slice per worker
+            entries = [index.entries[i] for i in chosen]
+            thumbs: List[Optional[bytes]] = [None] * len(entries)
+            missing = []
+            for i, entry in enumerate(entries):
+                path = self._thumb_path(entry, size)
+                if path.exists():
+                    thumbs[i] = path.read_bytes()
+                else:
+                    missing.append(i)
+            missing.sort(key=lambda i: entries[i].header_offset)
+            if missing:
+                parts = [part for part in np.array_split(np.array(missing), min(self.max_workers, len(missing)))
+                         if len(part)]
+                futures = [self._pool.submit(self._render, zip_path, [entries[i] for i in part], size)
+                           for part in parts]
+                for part, future in zip(parts, futures):
+                    for i, thumb in zip(part, future.result()):
+                        thumbs[i] = thumb
+
+            samples = []
+            for position, entry, thumb in zip(chosen, entries, thumbs):
+                if thumb is None:
+                    continue
+                class_id = int(index.labels[position])
+                samples.append({
+                    "name": entry.name,
+                    "label": index.classes[class_id] if class_id >= 0 else None,
+                    "split": index.splits[position] or None,
+                    "thumbnail": "data:image/jpeg;base64," + base64.b64encode(thumb).decode("ascii")
+                })
+
+            return {
+                "samples": samples,
+                "classes": index.classes,
+                "total_images": len(index.entries),
+                "matching_images": int(len(pool)),
+                "cached_thumbnails": len(entries) - len(missing),
+                "generated_thumbnails": len(missing),
+                "failed": len(entries) - len(samples),
+                "thumb_size": size,
+                "status": "success"
+            }
+
+        except Exception as e:
+            return {"error": str(e), "status": "failed"}
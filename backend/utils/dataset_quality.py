@@ -8,11 +8,21 @@ Year: 2025
 Vision: Help students identify and fix dataset issues before training.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from pathlib import Path
 import random
 from datetime import datetime, timedelta
 import numpy as np
 
+from .streaming_stats import HyperLogLog, TDigest, hash_rows
+from .tabular_ingest import ColumnarTable, NUMERIC_KINDS, KIND_CATEGORICAL, DEFAULT_CHUNK_ROWS
+from .image_hashing import PerceptualHashIndex, DEFAULT_THRESHOLD
+from .dataset_shards import image_label
+
+# Exact duplicate counting keeps one 8-byte hash per row up to this many rows,
+# then falls back to the HyperLogLog estimate so memory stays bounded
+EXACT_DUPLICATE_LIMIT = 4_000_000
+
 class DatasetQualityScorer:
     """
     Analyze dataset quality and provide improvement suggestions
@@ -103,23 +113,35 @@ class DatasetQualityScorer:
             }
             
             # 3. Diversity score
-            # Simulate diversity based on feature count and sample count
-            diversity_score = min(1.0, (feature_count * 0.1 + sample_count / 10000) / 2)
+            # Measured from per-column cardinality when available (see score_table)
+            if dataset_info.get("diversity_score") is not None:
+                diversity_score = float(dataset_info["diversity_score"])
+                diversity_details = dataset_info.get("diversity_details",
+                                                     f"Measured from distinct values in {feature_count} features")
+            else:
+                # Simulate diversity based on feature count and sample count
+                diversity_score = min(1.0, (feature_count * 0.1 + sample_count / 10000) / 2)
+                diversity_details = f"Estimated diversity based on {feature_count} features"
             scores["diversity"] = {
                 "score": diversity_score,
                 "rating": "Excellent" if diversity_score >= 0.8 else "Good" if diversity_score >= 0.6 else "Fair" if diversity_score >= 0.4 else "Poor",
                 "value": f"{diversity_score:.2f}",
-                "details": f"Estimated diversity based on {feature_count} features"
+                "details": diversity_details
             }
             
             # 4. Relevance score
-            # Simulate relevance based on correlation with target
-            relevance_score = random.uniform(0.5, 0.9)  # Simulated value
+            # Measured from feature/target correlation when available (see score_table)
+            if dataset_info.get("relevance_score") is not None:
+                relevance_score = float(dataset_info["relevance_score"])
+                relevance_details = "Measured correlation of the strongest features with the target"
+            else:
+                relevance_score = random.uniform(0.5, 0.9)  # Simulated value
+                relevance_details = "Estimated feature relevance to target variable"
             scores["relevance"] = {
                 "score": relevance_score,
                 "rating": "Excellent" if relevance_score >= 0.8 else "Good" if relevance_score >= 0.6 else "Fair" if relevance_score >= 0.4 else "Poor",
                 "value": f"{relevance_score:.2f}",
-                "details": "Estimated feature relevance to target variable"
+                "details": relevance_details
             }
             
             # 5. Size score
@@ -216,6 +238,230 @@ class DatasetQualityScorer:
                 "timestamp": datetime.utcnow().isoformat()
             }
     
+    @staticmethod
+    def score_table(table_dir: Path, target: Optional[str] = None,
+                    model_type: str = "classification", name: Optional[str] = None,
+                    chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, Any]:
+        """
+        Score an ingested table (see tabular_ingest.py) from its actual data.
+
+        One streaming pass with bounded memory measures missing values,
+        duplicate rows (row hashing), robust z-score outliers (t-digest),
+        per-column cardinality (HyperLogLog) and feature/target correlation.
+        The measurements then feed score_dataset.
+        """
+        try:
+            table = ColumnarTable(table_dir)
+            measurements = DatasetQualityScorer._measure_table(table, target, chunk_rows)
+            
+            dataset_info = {
+                "name": name or table.schema.get("member") or Path(table_dir).name,
+                "model_type": model_type,
+                "target_variable": target or "target",
+                "feature_count": len(measurements["columns"]) - (1 if target else 0),
+                "sample_count": table.num_rows,
+                "class_distribution": measurements.get("class_distribution", {}),
+                "missing_values": measurements["missing_cells"],
+                # Cleanliness counts data points, so duplicate rows count once per column
+                "duplicates": measurements["duplicate_rows"] * len(measurements["columns"]),
+                "outliers": measurements["outlier_cells"],
+                "diversity_score": measurements["diversity_score"],
+                "relevance_score": measurements.get("relevance_score")
+            }
+            result = DatasetQualityScorer.score_dataset(dataset_info)
+            if "error" not in result:
+                result["quality_report"]["measurements"] = measurements
+            return result
+            
+        except Exception as e:
+            return {
+                "error": f"Failed to score table: {str(e)}",
+                "timestamp": datetime.utcnow().isoformat()
+            }
+    
+    @staticmethod
+    def score_images(hash_index: PerceptualHashIndex, name: str = "Image Dataset",
+                     model_type: str = "classification",
+                     threshold: int = DEFAULT_THRESHOLD, hash_kind: str = "dhash",
+                     duplicates: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Score an image dataset using its perceptual-hash index: near-duplicate
+        images count as dirty samples, and the share of visually distinct
+        images is the diversity score. Pass `duplicates` (a duplicate_report)
+        to reuse clusters the caller already computed.
+        """
+        try:
+            if duplicates is None:
+                duplicates = hash_index.duplicate_report(threshold, hash_kind)
+            class_distribution: Dict[str, int] = {}
+            for member in hash_index.names:
+                label = image_label(member)
+                if label is not None:
+                    class_distribution[label] = class_distribution.get(label, 0) + 1
+            
+            images = len(hash_index)
+            dataset_info = {
+                "name": name,
+                "model_type": model_type,
+                "target_variable": "class",
+                "feature_count": 1,  # Each image is one data point
+                "sample_count": images,
+                "class_distribution": class_distribution,
+                "duplicates": duplicates["duplicate_images"],
+                "diversity_score": duplicates["unique_images"] / images if images else 0.0,
+                "diversity_details": f"Visually distinct images: {duplicates['unique_images']}/{images}"
+            }
+            result = DatasetQualityScorer.score_dataset(dataset_info)
+            if "error" not in result:
+                result["quality_report"]["measurements"] = {"duplicates": duplicates}
+            return result
+            
+        except Exception as e:
+            return {
+                "error": f"Failed to score images: {str(e)}",
+                "timestamp": datetime.utcnow().isoformat()
+            }
+    
+    @staticmethod
+    def _measure_table(table: ColumnarTable, target: Optional[str], chunk_rows: int) -> Dict[str, Any]:
+        """Single pass over the table collecting every quality measurement"""
+        names = table.column_names
+        meta = table.columns_meta
+        if target is not None and target not in meta:
+            raise KeyError(f"Unknown target column: {target}")
+        features = [n for n in names if n != target and meta[n]["kind"] in NUMERIC_KINDS | {KIND_CATEGORICAL}]
+        numeric = [n for n in names if meta[n]["kind"] in NUMERIC_KINDS and n != target]
+        
+        missing = {n: 0 for n in names}
+        sketches = {n: HyperLogLog() for n in names}
+        digests = {n: TDigest() for n in numeric}
+        row_hash_sketch = HyperLogLog()
+        row_hashes: Optional[List[np.ndarray]] = []
+        stored_hashes = 0
+        
+        target_kind = meta[target]["kind"] if target else None
+        num_classes = len(meta[target]["categories"]) if target_kind == KIND_CATEGORICAL else 0
+        class_counts = np.zeros(num_classes, dtype=np.int64)
+        # Accumulators for correlation (numeric target) or correlation ratio (categorical target)
+        f = len(features)
+        acc = {key: np.zeros(f) for key in ("n", "sx", "sxx", "sy", "syy", "sxy")}
+        class_n = np.zeros((num_classes, f))
+        class_sx = np.zeros((num_classes, f))
+        
+        for chunk in table.iter_chunks(chunk_rows=chunk_rows):
+            for n in names:
+                values = chunk[n]
+                if values.dtype.kind == "f":
+                    missing[n] += int(np.isnan(values).sum())
+                elif meta[n]["kind"] not in NUMERIC_KINDS:
+                    missing[n] += int((values < 0).sum())
+                sketches[n].add(values)
+            for n in numeric:
+                digests[n].update(chunk[n])
+            
+            hashes = hash_rows([chunk[n] for n in names])
+            row_hash_sketch.add_hashes(hashes)
+            if row_hashes is not None:
+                row_hashes.append(hashes)
+                stored_hashes += len(hashes)
+                if stored_hashes > EXACT_DUPLICATE_LIMIT:
+                    row_hashes = None
+            
+            if target is None or f == 0:
+                continue
+            x = np.column_stack([chunk[n].astype(np.float64) for n in features])
+            for j, n in enumerate(features):
+                if meta[n]["kind"] == KIND_CATEGORICAL:
+                    x[x[:, j] < 0, j] = np.nan
+            y = chunk[target].astype(np.float64)
+            if target_kind == KIND_CATEGORICAL:
+                y[y < 0] = np.nan
+            mask = ~np.isnan(x) & ~np.isnan(y)[:, None]
+            x0 = np.where(mask, x, 0.0)
+            y0 = np.where(mask, np.nan_to_num(y)[:, None], 0.0)
+            acc["n"] += mask.sum(axis=0)
+            acc["sx"] += x0.sum(axis=0)
+            acc["sxx"] += (x0 * x0).sum(axis=0)
+            acc["sy"] += y0.sum(axis=0)
+            acc["syy"] += (y0 * y0).sum(axis=0)
+            acc["sxy"] += (x0 * y0).sum(axis=0)
+            if target_kind == KIND_CATEGORICAL:
+                labels = chunk[target]
+                valid = labels >= 0
+                class_counts += np.bincount(labels[valid], minlength=num_classes)
+                # Scatter-add rows into their class: O(rows x features), no rows x classes matrix
+                np.add.at(class_n, labels[valid], mask[valid])
+                np.add.at(class_sx, labels[valid], x0[valid])
+        
+        rows = table.num_rows
+        if row_hashes is not None:
+            distinct_rows = int(np.unique(np.concatenate(row_hashes)).size) if row_hashes else 0
+            duplicate_method = "exact"
+        else:
+            distinct_rows = min(rows, int(round(row_hash_sketch.count())))
+            duplicate_method = "hyperloglog"
+        
+        columns = {}
+        outlier_cells = 0
+        for n in names:
+            column = {
+                "kind": meta[n]["kind"],
+                "missing_rate": round(missing[n] / rows, 6) if rows else 0.0,
+                "distinct_estimate": int(round(sketches[n].count()))
+            }
+            if n in digests and digests[n].count:
+                digest = digests[n]
+                outliers = int(round(digest.outlier_fraction() * digest.count))
+                outlier_cells += outliers
+                column.update({
+                    "quantiles": {f"p{int(q * 100)}": digest.quantile(q) for q in (0.01, 0.25, 0.5, 0.75, 0.99)},
+                    "mad": digest.median_absolute_deviation(),
+                    "outliers": outliers
+                })
+            columns[n] = column
+        
+        # Diversity: share of distinct values per feature on a log scale
+        cap = np.log1p(min(rows, 1000)) if rows else 1.0
+        diversity = [min(1.0, np.log1p(columns[n]["distinct_estimate"]) / cap) for n in features] or [0.0]
+        
+        measurements = {
+            "rows": rows,
+            "columns": columns,
+            "missing_cells": int(sum(missing.values())),
+            "duplicate_rows": rows - distinct_rows,
+            "duplicate_method": duplicate_method,
+            "outlier_cells": outlier_cells,
+            "diversity_score": round(float(np.mean(diversity)), 4)
+        }
+        
+        if target is not None and f > 0:
+            n_pairs = np.maximum(acc["n"], 1)
+            if target_kind == KIND_CATEGORICAL:
+                # Correlation ratio (eta): share of feature variance explained by the class
+                total_ss = acc["sxx"] - acc["sx"] ** 2 / n_pairs
+                between_ss = (class_sx ** 2 / np.maximum(class_n, 1)).sum(axis=0) - acc["sx"] ** 2 / n_pairs
+                strength = np.sqrt(np.clip(between_ss / np.where(total_ss > 0, total_ss, np.inf), 0, 1))
+                measurements["class_distribution"] = {
+                    category: int(count) for category, count in zip(meta[target]["categories"], class_counts)
+                }
+                method = "correlation_ratio"
+            else:
+                cov = acc["sxy"] - acc["sx"] * acc["sy"] / n_pairs
+                var_x = acc["sxx"] - acc["sx"] ** 2 / n_pairs
+                var_y = acc["syy"] - acc["sy"] ** 2 / n_pairs
+                denom = np.sqrt(var_x * var_y)
+                strength = np.abs(np.divide(cov, denom, out=np.zeros_like(cov), where=denom > 0))
+                method = "pearson"
+            # Relevance: how strongly the best quarter of the features track the target
+            top = np.sort(strength)[::-1][:max(1, f // 4)]
+            measurements["feature_target_correlation"] = {
+                "method": method,
+                "features": {n: round(float(v), 4) for n, v in zip(features, strength)}
+            }
+            measurements["relevance_score"] = round(float(top.mean()), 4)
+        
+        return measurements
+    
     @staticmethod
     def get_quality_guidelines() -> Dict[str, Any]:
         """
@@ -302,7 +548,7 @@ if __name__ == "__main__":
         if "error" not in result:
             report = result["quality_report"]
             print(f"  Score: {report['total_score']}/100 [{report['overall_rating']}]")
-            print(f  "  Suggestions: {len(report['suggestions'])}")
+            print(f"  Suggestions: {len(report['suggestions'])}")
         
         # Test quality guidelines
         guidelines = scorer.get_quality_guidelines()
@@ -0,0 +1,219 @@
+"""
+AetherAI - Packed Training Shards
+File: backend/utils/dataset_shards.py
+Purpose: Convert image-folder zips into memory-mappable uint8 shards for fast training
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Decode once, train many times — even on a student's laptop.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Tuple, Iterator
+from datetime import datetime
+import multiprocessing
+import json
+import io
+import os
+
+import numpy as np
+
+from .zip_index import ZipEntry, read_central_directory, read_member
+
+# Configuration
+SHARD_DIR = Path("uploads/shards")
+SHARD_FORMAT_VERSION = 1
+DEFAULT_SHARD_SIZE = 4096
+MAX_IMAGE_SIZE = 512  # Pixels per side; one 512x512 RGB shard of 4096 images is already 3 GB
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif'}
+SPLIT_NAMES = {"train", "training", "val", "valid", "validation", "test", "testing"}
+
+def image_label(name: str) -> Optional[str]:
+    """
+    Class of an image member in an image-folder layout: its parent folder
+    (e.g. "train/cat/001.png" -> "cat"). Returns None for non-images and for
+    images that sit directly in the root or in a split folder.
+    """
+    if os.path.splitext(name)[1].lower() not in IMAGE_EXTENSIONS:
+        return None
+    parts = [p for p in name.split('/') if p and not p.startswith('.')]
+    if len(parts) < 2 or parts[-2].lower() in SPLIT_NAMES or name.startswith("__MACOSX"):
+        return None
+    return parts[-2]
+
+def member_split(name: str) -> Optional[str]:
+    """Split folder (train/val/test) a member lives in, if any"""
+    for part in name.lower().split('/')[:-1]:
+        if part in ("train", "training"):
+            return "train"
+        if part in ("val", "valid", "validation"):
+            return "val"
+        if part in ("test", "testing"):
+            return "test"
+    return None
+
+def decode_image(data: bytes, image_size: Tuple[int, int], channels: int) -> np.ndarray:
+    """Decode image bytes into a (H, W, C) uint8 array of the requested size"""
+    from PIL import Image  # Optional dependency, only needed when decoding
+
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("L" if channels == 1 else "RGB")
+        if img.size != (image_size[1], image_size[0]):
+            img = img.resize((image_size[1], image_size[0]), Image.BILINEAR)
+        array = np.asarray(img, dtype=np.uint8)
+    return array.reshape(image_size[0], image_size[1], channels)
+
+def _convert_shard(zip_path: str, entries: List[ZipEntry], labels: List[int],
+                   images_path: str, labels_path: str,
+                   image_size: Tuple[int, int], channels: int) -> Dict[str, int]:
+    """Worker process: decode one shard's members and save them as .npy files"""
+    images = np.empty((len(entries), image_size[0], image_size[1], channels), dtype=np.uint8)
+    kept = np.zeros(len(entries), dtype=bool)
+
+    with open(zip_path, "rb") as f:
+        for i, entry in enumerate(entries):
+            try:
+                images[i] = decode_image(read_member(f, entry), image_size, channels)
+                kept[i] = True
+            except Exception:
+                continue
+
+    np.save(images_path, images[kept])
+    np.save(labels_path, np.asarray(labels, dtype=np.int64)[kept])
+    return {"count": int(kept.sum()), "failed": int(len(entries) - kept.sum())}
+
+class ShardConverter:
+    """
+    Decode an image-folder zip into fixed-size uint8 shards plus label arrays.
+
+    Output layout (in output_dir):
+        index.json                      classes, shapes and shard list
+        images_00000.npy ...            (N, H, W, C) uint8
+        labels_00000.npy ...            (N,) int64
+    Shards are decoded in parallel worker processes.
+    """
+
+    def __init__(self, zip_path: Path, output_dir: Path, image_size: Tuple[int, int] = (32, 32),
+                 channels: int = 3, shard_size: int = DEFAULT_SHARD_SIZE,
+                 split: Optional[str] = None, max_workers: Optional[int] = None):
+        self.zip_path = Path(zip_path)
+        self.output_dir = Path(output_dir)
+        self.image_size = (int(image_size[0]), int(image_size[1]))
+        if not all(1 <= side <= MAX_IMAGE_SIZE for side in self.image_size):
+            raise ValueError(f"image_size must be between 1 and {MAX_IMAGE_SIZE} pixels per side")
+        self.channels = channels
+        self.shard_size = shard_size
+        self.split = split
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+
+    def convert(self, progress_callback: Optional[Callable[[float, str], None]] = None,
+                should_cancel: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """Run the conversion and return the written index"""
+        entries = read_central_directory(self.zip_path)
+        samples = []
+        for entry in entries:
+            label = image_label(entry.name)
+            if label is None or (self.split and member_split(entry.name) != self.split):
+                continue
+            samples.append((entry, label))
+
+        if not samples:
+            raise ValueError("No class-folder images found (expected e.g. train/cat/001.png)")
+
+        classes = sorted({label for _, label in samples})
+        class_ids = {name: i for i, name in enumerate(classes)}
+        chunks = [samples[i:i + self.shard_size] for i in range(0, len(samples), self.shard_size)]
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        shards: List[Optional[Dict[str, Any]]] = [None] * len(chunks)
+        failed = 0
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(chunks)), mp_context=context) as pool:
+            futures = {}
+            for shard_id, chunk in enumerate(chunks):
+                images_file = f"images_{shard_id:05d}.npy"
+                labels_file = f"labels_{shard_id:05d}.npy"
+                future = pool.submit(
+                    _convert_shard, str(self.zip_path),
+                    [entry for entry, _ in chunk], [class_ids[label] for _, label in chunk],
+                    str(self.output_dir / images_file), str(self.output_dir / labels_file),
+                    self.image_size, self.channels
+                )
+                futures[future] = (shard_id, images_file, labels_file)
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                if should_cancel is not None and should_cancel():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise RuntimeError("Shard conversion cancelled")
+                shard_id, images_file, labels_file = futures[future]
+                result = future.result()
+                failed += result["failed"]
+                shards[shard_id] = {"images": images_file, "labels": labels_file, "count": result["count"]}
+                if progress_callback is not None:
+                    progress_callback(100 * done / len(chunks), f"decoded shard {done}/{len(chunks)}")
+
+        index = {
+            "format_version": SHARD_FORMAT_VERSION,
+            "source": self.zip_path.name,
+            "created_at": datetime.utcnow().isoformat(),
+            "split": self.split,
+            "classes": classes,
+            "image_shape": [self.image_size[0], self.image_size[1], self.channels],
+            "dtype": "uint8",
+            "num_samples": sum(shard["count"] for shard in shards),
+            "failed": failed,
+            "shards": shards
+        }
+        tmp_path = self.output_dir / "index.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.output_dir / "index.json")
+        return index
+
+class ShardDataset:
+    """
+    Read packed shards through np.memmap: batches are sliced straight from the
+    page cache with no decoding.
+    """
+
+    def __init__(self, shard_dir: Path):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / "index.json") as f:
+            self.index = json.load(f)
+        self.classes: List[str] = self.index["classes"]
+        self.images = [np.load(self.shard_dir / s["images"], mmap_mode="r") for s in self.index["shards"]]
+        self.labels = [np.load(self.shard_dir / s["labels"], mmap_mode="r") for s in self.index["shards"]]
+        self._offsets = np.cumsum([0] + [len(labels) for labels in self.labels])
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def num_classes(self) -> int:
+        return len(self.classes)
+
+    def get_batch(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Gather samples by global index, reading each shard with sorted indices"""
+        indices = np.asarray(indices, dtype=np.int64)
+        shard_ids = np.searchsorted(self._offsets, indices, side="right") - 1
+        images = np.empty((len(indices),) + tuple(self.index["image_shape"]), dtype=np.uint8)
+        labels = np.empty(len(indices), dtype=np.int64)
+        for shard_id in np.unique(shard_ids):
+            positions = np.nonzero(shard_ids == shard_id)[0]
+            local = indices[positions] - self._offsets[shard_id]
+            order = np.argsort(local)
+            images[positions[order]] = self.images[shard_id][local[order]]
+            labels[positions[order]] = self.labels[shard_id][local[order]]
+        return images, labels
+
+    def iter_batches(self, batch_size: int = 32, shuffle: bool = True, seed: Optional[int] = None,
+                     drop_last: bool = False) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (images uint8 [B, H, W, C], labels int64 [B]) batches for one epoch"""
+        order = np.random.default_rng(seed).permutation(len(self)) if shuffle else np.arange(len(self))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            if drop_last and len(batch) < batch_size:
+                break
+            yield self.get_batch(batch)
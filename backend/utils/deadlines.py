@@ -0,0 +1,70 @@
+"""
+AetherAI - Request Deadlines
+File: backend/utils/deadlines.py
+Purpose: Per-request latency budgets that expensive endpoints check before and while doing work
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: A fast good-enough answer beats a perfect one that never arrives.
+"""
+
+from typing import Dict, Any, Optional
+import time
+import os
+
+# Configuration
+BUDGET_HEADER = "X-Latency-Budget-Ms"  # Clients may ask for a tighter (or looser) budget
+PATH_HEADER = "X-Response-Path"  # Which path served the response: cache, model, rendered, fallback, queued...
+REASON_HEADER = "X-Fallback-Reason"
+MIN_BUDGET_MS = 50.0
+MAX_BUDGET_MS = 60000.0
+
+# Default budgets per endpoint
+INSIGHT_BUDGET_MS = float(os.environ.get("INSIGHT_BUDGET_MS", "6000"))
+REPORT_BUDGET_MS = float(os.environ.get("REPORT_BUDGET_MS", "8000"))
+ANALYSIS_BUDGET_MS = float(os.environ.get("ANALYSIS_BUDGET_MS", "2000"))
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The budget cannot be met. reason is "queue" (the estimated wait is
+    already too long, so the work was never started) or "timeout" (the work
+    ran past the deadline).
+    """
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(detail or reason)
+        self.reason = reason
+
+class Deadline:
+    """A latency budget that started when the request arrived"""
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = float(budget_ms)
+        self.started = time.monotonic()
+        self.expires = self.started + self.budget_ms / 1000
+
+    @classmethod
+    def from_request(cls, budget_ms: Optional[float], default_ms: float) -> "Deadline":
+        """Budget from the request header if given (clamped to sane bounds), else the endpoint default"""
+        budget = default_ms if budget_ms is None else budget_ms
+        return cls(max(MIN_BUDGET_MS, min(float(budget), MAX_BUDGET_MS)))
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)"""
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def elapsed_ms(self) -> float:
+        return round((time.monotonic() - self.started) * 1000, 1)
+
+    def check(self, needed_seconds: float, reason: str = "queue"):
+        """Raise DeadlineExceeded if work estimated at needed_seconds cannot finish in time"""
+        if needed_seconds > self.remaining():
+            raise DeadlineExceeded(reason, f"needs ~{needed_seconds:.2f}s, {self.remaining():.2f}s left")
+
+    def report(self, path: str, reason: Optional[str] = None) -> Dict[str, Any]:
+        """What a response says about how it was produced"""
+        return {"path": path, "reason": reason, "budget_ms": self.budget_ms, "elapsed_ms": self.elapsed_ms()}
@@ -8,10 +8,15 @@ Year: 2025
 Vision: Promote ethical AI by detecting bias in datasets.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
 import random
 from datetime import datetime
 
+import numpy as np
+
+from .tabular_ingest import ColumnarTable, KIND_CATEGORICAL, KIND_FLOAT, KIND_HASHED
+
 class EthicsDetector:
     """
     Analyze datasets for bias and ethical concerns
@@ -31,6 +36,15 @@ class EthicsDetector:
     # Ethical risk levels
     RISK_LEVELS = ["Low", "Medium", "High", "Critical"]
     
+    # Fairness thresholds
+    MAX_GROUPS = 20  # Numeric attributes with more values are split into quantile bins
+    QUANTILE_BINS = 5
+    MIN_REPRESENTATION = 0.1  # Groups below 10% of the rows are underrepresented
+    MAX_PARITY_GAP = 0.1  # Selection-rate difference between groups
+    MIN_DISPARATE_IMPACT = 0.8  # "Four-fifths rule"
+    MAX_ODDS_GAP = 0.1  # Largest TPR/FPR difference between groups
+    POSITIVE_NAMES = {"1", "yes", "true", "positive", "approved", "accepted", "pass", "admitted"}
+    
     @staticmethod
     def detect_bias(dataset_info: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -141,14 +155,7 @@ class EthicsDetector:
                 ]
             
             # Calculate overall risk score
-            risk_mapping = {"Low": 1, "Medium": 2, "High": 3, "Critical": 4}
-            if bias_report["ethical_concerns"]:
-                avg_risk = sum(risk_mapping[c["risk_level"]] for c in bias_report["ethical_concerns"]) / len(bias_report["ethical_concerns"])
-                bias_report["overall_risk_level"] = "Low" if avg_risk < 1.5 else "Medium" if avg_risk < 2.5 else "High" if avg_risk < 3.5 else "Critical"
-                bias_report["risk_score"] = round(avg_risk, 2)
-            else:
-                bias_report["overall_risk_level"] = "Low"
-                bias_report["risk_score"] = 1.0
+            EthicsDetector._score_risk(bias_report)
             
             return {
                 "status": "success",
@@ -162,6 +169,234 @@ class EthicsDetector:
                 "timestamp": datetime.utcnow().isoformat()
             }
     
+    @staticmethod
+    def _score_risk(bias_report: Dict[str, Any]):
+        """Set overall_risk_level and risk_score from the listed concerns"""
+        risk_mapping = {"Low": 1, "Medium": 2, "High": 3, "Critical": 4}
+        if bias_report["ethical_concerns"]:
+            avg_risk = sum(risk_mapping[c["risk_level"]] for c in bias_report["ethical_concerns"]) / len(bias_report["ethical_concerns"])
+            bias_report["overall_risk_level"] = "Low" if avg_risk < 1.5 else "Medium" if avg_risk < 2.5 else "High" if avg_risk < 3.5 else "Critical"
+            bias_report["risk_score"] = round(avg_risk, 2)
+        else:
+            bias_report["overall_risk_level"] = "Low"
+            bias_report["risk_score"] = 1.0
+    
+    @staticmethod
+    def measure_fairness(table_dir: Path, sensitive_attributes: List[str],
+                         label: Optional[str] = None, prediction: Optional[str] = None,
+                         positive_label: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Measure fairness from real data in an ingested table (see tabular_ingest.py),
+        e.g. a dataset or a prediction file with label and prediction columns.
+
+        For each sensitive attribute: per-group representation, base rate
+        (label), selection rate (prediction), TPR/FPR, and the demographic
+        parity, disparate impact and equalized-odds gaps. Group-by uses
+        np.bincount over integer group ids, so millions of rows take
+        milliseconds.
+        """
+        try:
+            table = ColumnarTable(table_dir)
+            for column in list(sensitive_attributes) + [c for c in (label, prediction) if c]:
+                if column not in table.columns_meta:
+                    raise KeyError(f"Unknown column: {column}")
+            if not sensitive_attributes:
+                raise ValueError("At least one sensitive attribute is required")
+            
+            y, y_valid, positive = (None, None, None) if label is None else \
+                EthicsDetector._binary_outcome(table, label, positive_label)
+            y_hat, y_hat_valid, predicted_positive = (None, None, None) if prediction is None else \
+                EthicsDetector._binary_outcome(table, prediction, positive or positive_label)
+            
+            bias_report = {
+                "dataset_name": table.schema.get("member") or Path(table_dir).name,
+                "analysis_timestamp": datetime.utcnow().isoformat(),
+                "total_samples": table.num_rows,
+                "target_variable": label or prediction or "none",
+                "positive_outcome": positive or predicted_positive,
+                "collection_method": "measured",
+                "fairness": {},
+                "ethical_concerns": []
+            }
+            
+            for attribute in sensitive_attributes:
+                groups, group_names = EthicsDetector._group_ids(table, attribute)
+                metrics = EthicsDetector._group_metrics(groups, group_names, y, y_valid, y_hat, y_hat_valid)
+                bias_report["fairness"][attribute] = metrics
+                bias_report["ethical_concerns"].extend(EthicsDetector._fairness_concerns(attribute, metrics))
+            
+            EthicsDetector._score_risk(bias_report)
+            return {
+                "status": "success",
+                "bias_report": bias_report,
+                "message": "📊 Fairness metrics measured from your data!"
+            }
+            
+        except Exception as e:
+            return {
+                "error": f"Failed to measure fairness: {str(e)}",
+                "timestamp": datetime.utcnow().isoformat()
+            }
+    
+    @staticmethod
+    def _group_ids(table: ColumnarTable, column: str) -> Tuple[np.ndarray, List[str]]:
+        """
+        Map a column to dense group ids 0..k-1 (k = missing-value group, if any).
+        Categorical codes are used as-is; other columns are factorized by
+        sorting, and numeric columns with many values are cut into quantile bins.
+        """
+        meta = table.columns_meta[column]
+        values = np.asarray(table.column(column))
+        
+        if meta["kind"] == KIND_CATEGORICAL:
+            names = list(meta["categories"])
+            ids = values.astype(np.int64)
+            missing = ids < 0
+        else:
+            missing = np.isnan(values) if meta["kind"] == KIND_FLOAT else values == -1 if meta["kind"] == KIND_HASHED \
+                else np.zeros(len(values), dtype=bool)
+            present = values[~missing]
+            uniques = np.unique(present)
+            if meta["kind"] != KIND_HASHED and len(uniques) > EthicsDetector.MAX_GROUPS:
+                edges = np.unique(np.quantile(present, np.linspace(0, 1, EthicsDetector.QUANTILE_BINS + 1)))
+                ids = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+                names = [f"{edges[i]:g}-{edges[i + 1]:g}" for i in range(len(edges) - 1)]
+            else:
+                ids = np.searchsorted(uniques, values)
+                names = [f"{value:g}" if meta["kind"] == KIND_FLOAT else str(value) for value in uniques.tolist()]
+        
+        ids = ids.astype(np.int64)
+        if missing.any():
+            ids[missing] = len(names)
+            names = names + ["(missing)"]
+        return ids, names
+    
+    @staticmethod
+    def _binary_outcome(table: ColumnarTable, column: str,
+                        positive_label: Optional[str]) -> Tuple[np.ndarray, np.ndarray, str]:
+        """
+        Turn a label/prediction column into 0/1 outcomes plus a validity mask.
+        The positive class is positive_label, a recognizable name such as
+        "yes" or "1", or else the rarer class.
+        """
+        meta = table.columns_meta[column]
+        values = np.asarray(table.column(column))
+        
+        if meta["kind"] == KIND_CATEGORICAL:
+            categories = [str(c) for c in meta["categories"]]
+            valid = values >= 0
+            if positive_label is not None and str(positive_label) in categories:
+                positive = str(positive_label)
+            else:
+                named = [c for c in categories if c.lower() in EthicsDetector.POSITIVE_NAMES]
+                if named:
+                    positive = named[0]
+                else:
+                    counts = np.bincount(values[valid], minlength=len(categories))
+                    positive = categories[int(np.argmin(np.where(counts > 0, counts, np.iinfo(np.int64).max)))]
+            return (values == categories.index(positive)).astype(np.float64), valid, positive
+        
+        valid = ~np.isnan(values) if values.dtype.kind == "f" else np.ones(len(values), dtype=bool)
+        try:
+            target = float(positive_label) if positive_label is not None else None
+        except ValueError:
+            target = None  # e.g. a "yes" label paired with 0/1 predictions
+        if target is not None:
+            return (values == target).astype(np.float64), valid, str(positive_label)
+        # Numeric outcomes: 1 (or any positive score) counts as the positive class
+        return (np.nan_to_num(values) > 0).astype(np.float64), valid, "> 0"
+    
+    @staticmethod
+    def _group_metrics(groups: np.ndarray, names: List[str],
+                       y: Optional[np.ndarray], y_valid: Optional[np.ndarray],
+                       y_hat: Optional[np.ndarray], y_hat_valid: Optional[np.ndarray]) -> Dict[str, Any]:
+        """Per-group rates and cross-group gaps with one bincount per quantity"""
+        k = len(names)
+        count = lambda weights=None: np.bincount(groups, weights=weights, minlength=k)
+        
+        def rate(numerator, denominator):
+            return np.divide(numerator, denominator, out=np.full(k, np.nan), where=denominator > 0)
+        
+        sizes = count()
+        per_group = {"count": sizes, "representation": sizes / max(len(groups), 1)}
+        if y is not None:
+            per_group["base_rate"] = rate(count(y * y_valid), count(y_valid.astype(np.float64)))
+        if y_hat is not None:
+            per_group["selection_rate"] = rate(count(y_hat * y_hat_valid), count(y_hat_valid.astype(np.float64)))
+        if y is not None and y_hat is not None:
+            both = (y_valid & y_hat_valid).astype(np.float64)
+            positives = count(y * both)
+            negatives = count((1 - y) * both)
+            per_group["true_positive_rate"] = rate(count(y * y_hat * both), positives)
+            per_group["false_positive_rate"] = rate(count((1 - y) * y_hat * both), negatives)
+            per_group["accuracy"] = rate(count((y == y_hat) * both), positives + negatives)
+        
+        def spread(values):
+            values = values[~np.isnan(values)]
+            return (float(values.max() - values.min()), float(values.min() / values.max()) if values.max() > 0 else 1.0) \
+                if len(values) > 1 else (0.0, 1.0)
+        
+        # Selection rates come from predictions if given, else from the labels themselves
+        selection = per_group.get("selection_rate", per_group.get("base_rate"))
+        gaps: Dict[str, Any] = {"representation_ratio": spread(per_group["representation"][sizes > 0])[1]}
+        if selection is not None:
+            gaps["demographic_parity_difference"], gaps["disparate_impact_ratio"] = spread(selection)
+            gaps["parity_source"] = "prediction" if "selection_rate" in per_group else "label"
+        if "true_positive_rate" in per_group:
+            tpr_gap = spread(per_group["true_positive_rate"])[0]
+            fpr_gap = spread(per_group["false_positive_rate"])[0]
+            gaps.update({"true_positive_rate_gap": tpr_gap, "false_positive_rate_gap": fpr_gap,
+                         "equalized_odds_gap": max(tpr_gap, fpr_gap)})
+        
+        rows = []
+        for i, name in enumerate(names):
+            row = {"group": name}
+            for metric, values in per_group.items():
+                value = values[i]
+                row[metric] = int(value) if metric == "count" else None if np.isnan(value) else round(float(value), 4)
+            rows.append(row)
+        return {
+            "groups": rows,
+            "gaps": {key: round(value, 4) if isinstance(value, float) else value for key, value in gaps.items()}
+        }
+    
+    @staticmethod
+    def _fairness_concerns(attribute: str, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Translate measured gaps into ethical_concerns entries"""
+        concerns = []
+        gaps = metrics["gaps"]
+        groups = [g for g in metrics["groups"] if g["count"] > 0]
+        
+        smallest = min(groups, key=lambda g: g["representation"]) if groups else None
+        if smallest is not None and len(groups) > 1 and smallest["representation"] < EthicsDetector.MIN_REPRESENTATION:
+            concerns.append({
+                "issue": f"Underrepresented group in '{attribute}'",
+                "description": f"Group '{smallest['group']}' is only {smallest['representation']:.1%} of the data, so the model sees few examples of it.",
+                "risk_level": "High" if smallest["representation"] < EthicsDetector.MIN_REPRESENTATION / 2 else "Medium",
+                "recommendation": "Collect more data for this group or reweight/oversample it during training."
+            })
+        
+        parity = gaps.get("demographic_parity_difference")
+        if parity is not None and parity > EthicsDetector.MAX_PARITY_GAP:
+            source = "predicted" if gaps["parity_source"] == "prediction" else "labelled"
+            impact = gaps["disparate_impact_ratio"]
+            concerns.append({
+                "issue": f"Demographic parity gap in '{attribute}'",
+                "description": f"Positive {source} outcome rates differ by {parity:.1%} between groups (disparate impact ratio {impact:.2f}).",
+                "risk_level": "Critical" if impact < EthicsDetector.MIN_DISPARATE_IMPACT / 2 else "High" if impact < EthicsDetector.MIN_DISPARATE_IMPACT else "Medium",
+                "recommendation": "Check whether the difference is justified; consider reweighting, threshold adjustment per group, or removing proxy features."
+            })
+        
+        odds = gaps.get("equalized_odds_gap")
+        if odds is not None and odds > EthicsDetector.MAX_ODDS_GAP:
+            concerns.append({
+                "issue": f"Equalized odds gap in '{attribute}'",
+                "description": f"True/false positive rates differ by up to {odds:.1%} between groups, so the model's errors fall unevenly.",
+                "risk_level": "High" if odds > 2 * EthicsDetector.MAX_ODDS_GAP else "Medium",
+                "recommendation": "Evaluate per-group error rates and consider post-processing (equalized odds) or more data for the worst group."
+            })
+        return concerns
+    
     @staticmethod
     def generate_ethics_report(dataset_info: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -0,0 +1,276 @@
+"""
+AetherAI - Micro-Batched Text Generation
+File: backend/utils/generation_batcher.py
+Purpose: Collect concurrent generation requests for a few ms and run them as one padded batch
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: A whole classroom asking at once should cost little more than one student.
+"""
+
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple, Callable, Iterator
+import threading
+import queue
+import copy
+import time
+import os
+
+# Configuration
+MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", "8"))
+BATCH_WINDOW_MS = float(os.environ.get("INFERENCE_BATCH_WINDOW_MS", "10"))
+GENERATION_KWARGS = {"do_sample": True, "temperature": 0.7, "top_p": 0.9, "repetition_penalty": 1.2}
+TIMING_SMOOTHING = 0.2  # Weight of the newest batch in the moving average used for wait estimates
+
+# (prompt, max_new_tokens, future, on_token): on_token gets each new token id as it is generated
+_Request = Tuple[str, int, Future, Optional[Callable[[int], None]]]
+
+def _repeat_cache(cache, rows: int):
+    """
+    A prefix cache copied for every row of a batch. generate() extends a
+    Cache object in place, so each batch works on its own copy; older
+    transformers (e.g. 4.45 with GPT-2) return per-layer (key, value) tuples.
+    """
+    if isinstance(cache, tuple):
+        return tuple(tuple(tensor.repeat_interleave(rows, dim=0) for tensor in layer) for layer in cache)
+    cache = copy.deepcopy(cache)
+    cache.batch_repeat_interleave(rows)
+    return cache
+
+class _RowStreamer:
+    """
+    generate() streamer that hands every row's new tokens to its own callback
+    (transformers' streamers only handle batch size 1). The first put() is
+    the prompt; rows stop at EOS or their own max_new_tokens.
+    """
+
+    def __init__(self, batch: List[_Request], eos_token_id: int):
+        self.sinks = [request[3] for request in batch]
+        self.limits = [request[1] for request in batch]
+        self.counts = [0] * len(batch)
+        self.finished = [sink is None for sink in self.sinks]
+        self.eos = eos_token_id
+        self.prompt_seen = False
+
+    def put(self, value):
+        if not self.prompt_seen:
+            self.prompt_seen = True
+            return
+        for row, tokens in enumerate(value.reshape(len(self.sinks), -1).tolist()):
+            for token in tokens:
+                if self.finished[row]:
+                    break
+                if token == self.eos or self.counts[row] >= self.limits[row]:
+                    self.finished[row] = True
+                    break
+                self.counts[row] += 1
+                self.sinks[row](token)
+
+    def end(self):
+        pass
+
+class GenerationBatcher:
+    """
+    Single generation thread in front of a causal LM.
+
+    submit() queues a prompt and returns a Future. The thread takes the first
+    waiting request, keeps collecting for up to window_ms (or until max_batch
+    requests), then runs one left-padded model.generate() for all of them and
+    hands every caller its own continuation, cut to its own max_new_tokens.
+    On CPU a batch of 8 costs far less than 8 separate calls, because each
+    decoding step becomes one matrix multiply instead of eight.
+
+    Prompts that start with a registered prefix (a fixed instruction block)
+    reuse its precomputed attention key/value cache: only the variable suffix
+    and the new tokens are run through the model. Within such a batch the
+    padding sits between prefix and suffix and is masked out, so every row
+    still sees the prefix at positions 0..P-1.
+    """
+
+    def __init__(self, model, tokenizer, max_batch: int = MAX_BATCH, window_ms: float = BATCH_WINDOW_MS,
+                 generation_kwargs: Optional[Dict[str, Any]] = None):
+        self.model = model
+        self.tokenizer = tokenizer
+        # Decoder-only models continue from the right edge, so pad on the left
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.max_batch = max(1, max_batch)
+        self.window = max(0.0, window_ms) / 1000
+        self.generation_kwargs = dict(GENERATION_KWARGS if generation_kwargs is None else generation_kwargs)
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._prefixes: Dict[str, Tuple[List[int], Any]] = {}
+        self._stats = {"requests": 0, "batches": 0, "generated_tokens": 0, "busy_seconds": 0.0,
+                       "prefix_hits": 0, "prefix_tokens_reused": 0}
+        self._stats_lock = threading.Lock()
+        self._batch_seconds = 0.0  # Moving average, 0 until the first batch is timed
+        self._busy = False
+        self._thread = threading.Thread(target=self._run, name="generation-batcher", daemon=True)
+        self._thread.start()
+
+    def register_prefix(self, prefix: str):
+        """Precompute the key/value cache of a prompt prefix shared by many requests"""
+        import torch
+
+        ids = self.tokenizer(prefix)["input_ids"]
+        with torch.inference_mode():
+            # Keep the cache in whatever format this transformers version returns
+            cache = self.model(torch.tensor([ids]), use_cache=True).past_key_values
+        self._prefixes[prefix] = (ids, cache)
+
+    def _prefix_of(self, prompt: str) -> Optional[str]:
+        matches = [prefix for prefix in self._prefixes if prompt.startswith(prefix)]
+        return max(matches, key=len) if matches else None
+
+    def submit(self, prompt: str, max_new_tokens: int = 120,
+               on_token: Optional[Callable[[int], None]] = None) -> Future:
+        """Queue a prompt; the Future resolves to the generated continuation"""
+        future: Future = Future()
+        self._queue.put((prompt, max(1, int(max_new_tokens)), future, on_token))
+        return future
+
+    def generate(self, prompt: str, max_new_tokens: int = 120, timeout: Optional[float] = None) -> str:
+        return self.submit(prompt, max_new_tokens).result(timeout)
+
+    def stream(self, prompt: str, max_new_tokens: int = 120, timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield the continuation in text pieces as its tokens are generated (still batched)"""
+        tokens: "queue.Queue[Optional[int]]" = queue.Queue()
+        future = self.submit(prompt, max_new_tokens, on_token=tokens.put)
+        future.add_done_callback(lambda _: tokens.put(None))
+        ids: List[int] = []
+        text = ""
+        while True:
+            token = tokens.get(timeout=timeout)
+            if token is None:
+                break
+            ids.append(token)
+            decoded = self.tokenizer.decode(ids, skip_special_tokens=True)
+            if decoded.endswith("\ufffd"):
+                continue  # Multi-byte character split across tokens; wait for the rest
+            if len(decoded) > len(text):
+                yield decoded[len(text):]
+                text = decoded
+        final = future.result()  # Raises if generation failed
+        if len(final) > len(text) and final.startswith(text):
+            yield final[len(text):]
+
+    def estimate_wait(self) -> float:
+        """
+        Rough seconds a request submitted now would wait before its own batch
+        starts: the batches queued or running ahead of it. 0 when idle or
+        until the first batch has been timed.
+        """
+        batches_ahead = self._queue.qsize() // self.max_batch + (1 if self._busy else 0)
+        return batches_ahead * self._batch_seconds
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Finish this batch, then stop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [request for request in self._collect(first) if request[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            self._busy = True
+            try:
+                self._generate(batch)
+            except Exception as e:
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                self._busy = False
+
+    def _generate(self, batch: List[_Request]):
+        groups: Dict[Optional[str], List[_Request]] = {}
+        for request in batch:
+            groups.setdefault(self._prefix_of(request[0]), []).append(request)
+        for prefix, requests in groups.items():
+            self._generate_group(prefix, requests)
+
+    def _generate_group(self, prefix: Optional[str], batch: List[_Request]):
+        import torch
+
+        started = time.perf_counter()
+        pad = self.tokenizer.pad_token_id
+        if prefix is None:
+            inputs = dict(self.tokenizer([request[0] for request in batch], return_tensors="pt", padding=True))
+        else:
+            # [prefix][padding][suffix]: the cached prefix stays at the same positions for every row
+            prefix_ids, prefix_cache = self._prefixes[prefix]
+            suffixes = self.tokenizer([request[0][len(prefix):] for request in batch])["input_ids"]
+            width = max(len(ids) for ids in suffixes)
+            inputs = {
+                "input_ids": torch.tensor([prefix_ids + [pad] * (width - len(ids)) + ids for ids in suffixes]),
+                "attention_mask": torch.tensor([[1] * len(prefix_ids) + [0] * (width - len(ids)) + [1] * len(ids)
+                                                for ids in suffixes]),
+                "past_key_values": _repeat_cache(prefix_cache, len(batch))
+            }
+        streamer = _RowStreamer(batch, self.tokenizer.eos_token_id) if any(r[3] for r in batch) else None
+        with torch.inference_mode():
+            output = self.model.generate(
+                **inputs,
+                max_new_tokens=max(request[1] for request in batch),
+                pad_token_id=pad,
+                streamer=streamer,
+                **self.generation_kwargs
+            )
+        new_tokens = output[:, inputs["input_ids"].shape[1]:].tolist()
+
+        generated = 0
+        eos = self.tokenizer.eos_token_id
+        for (_, limit, future, _), tokens in zip(batch, new_tokens):
+            tokens = tokens[:limit]
+            if eos in tokens:
+                tokens = tokens[:tokens.index(eos)]  # Finished early; the rest is padding
+            generated += len(tokens)
+            future.set_result(self.tokenizer.decode(tokens, skip_special_tokens=True))
+
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._stats["requests"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["generated_tokens"] += generated
+            self._stats["busy_seconds"] += elapsed
+            weight = TIMING_SMOOTHING if self._batch_seconds else 1.0  # First batch seeds the average
+            self._batch_seconds += weight * (elapsed - self._batch_seconds)
+            if prefix is not None:
+                self._stats["prefix_hits"] += len(batch)
+                self._stats["prefix_tokens_reused"] += len(batch) * len(prefix_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            "max_batch": self.max_batch,
+            "window_ms": round(self.window * 1000, 1),
+            "queued": self._queue.qsize(),
+            "estimated_wait_seconds": round(self.estimate_wait(), 2),
+            "requests": stats["requests"],
+            "batches": stats["batches"],
+            "mean_batch_size": round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0,
+            "generated_tokens": stats["generated_tokens"],
+            "prefixes": len(self._prefixes),
+            "prefix_hits": stats["prefix_hits"],
+            "prefix_tokens_reused": stats["prefix_tokens_reused"],
+            "tokens_per_second": round(stats["generated_tokens"] / stats["busy_seconds"], 1) if stats["busy_seconds"] else 0.0
+        }
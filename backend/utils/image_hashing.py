@@ -0,0 +1,238 @@
+"""
+AetherAI - Perceptual Image Hashing
+File: backend/utils/image_hashing.py
+Purpose: Find duplicate and near-duplicate images in uploaded datasets with aHash/dHash
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Teach students that a copied image is not a new example.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import multiprocessing
+import io
+import os
+
+import numpy as np
+
+from .zip_index import ZipEntry, read_central_directory, read_member
+from .dataset_shards import IMAGE_EXTENSIONS
+
+# Configuration
+PHASH_DIR = Path("uploads/phash")
+HASH_CHUNK_SIZE = 2048
+DEFAULT_THRESHOLD = 4  # Max differing bits (out of 64) for two images to count as near-duplicates
+HASH_KINDS = ("dhash", "ahash")
+
+# SWAR popcount masks
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+def hamming_distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Bitwise Hamming distance between two uint64 hash arrays (SWAR popcount)"""
+    x = np.bitwise_xor(a, b).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        x = x - ((x >> np.uint64(1)) & _M1)
+        x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+        x = (x + (x >> np.uint64(4))) & _M4
+        return (x * _H01) >> np.uint64(56)
+
+def _pack_bits(bits: np.ndarray) -> int:
+    """64 booleans -> one unsigned 64-bit integer"""
+    return int.from_bytes(np.packbits(bits.reshape(-1)).tobytes(), "big")
+
+def image_hashes(data: bytes) -> Tuple[int, int]:
+    """
+    Compute (aHash, dHash) of an encoded image.
+
+    aHash: 8x8 grayscale thumbnail, one bit per pixel brighter than the mean.
+    dHash: 9x8 grayscale thumbnail, one bit per pixel brighter than its right neighbour.
+    """
+    from PIL import Image  # Optional dependency, only needed when decoding
+
+    with Image.open(io.BytesIO(data)) as img:
+        # Let JPEG decode at reduced scale; the hash only needs a tiny thumbnail
+        img.draft("L", (64, 64))
+        gray = img.convert("L")
+        small = np.asarray(gray.resize((8, 8), Image.BILINEAR), dtype=np.float32)
+        wide = np.asarray(gray.resize((9, 8), Image.BILINEAR), dtype=np.float32)
+    return _pack_bits(small > small.mean()), _pack_bits(wide[:, 1:] > wide[:, :-1])
+
+def _hash_members(zip_path: str, entries: List[ZipEntry]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Worker process: hash one chunk of members; returns (ahash, dhash, decoded mask)"""
+    ahash = np.zeros(len(entries), dtype=np.uint64)
+    dhash = np.zeros(len(entries), dtype=np.uint64)
+    ok = np.zeros(len(entries), dtype=bool)
+
+    with open(zip_path, "rb") as f:
+        for i, entry in enumerate(entries):
+            try:
+                ahash[i], dhash[i] = image_hashes(read_member(f, entry))
+                ok[i] = True
+            except Exception:
+                continue
+    return ahash, dhash, ok
+
+def _near_pairs(hashes: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Multi-index Hamming search: split the 64 bits into threshold + 1 bands.
+    Two hashes within `threshold` bits must agree exactly on at least one
+    band (pigeonhole), so only hashes sharing a band value are compared.
+    Returns unique (i, j) index pairs with i < j that are within the threshold.
+    """
+    bands = threshold + 1
+    width = 64 // bands
+    positions = np.arange(len(hashes))
+    pairs = []
+    for band in range(bands):
+        shift = band * width
+        bits = 64 - shift if band == bands - 1 else width
+        keys = (hashes >> np.uint64(shift)) & np.uint64((1 << bits) - 1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        # End (exclusive) of the bucket each sorted position belongs to
+        boundaries = np.flatnonzero(np.diff(sorted_keys)) + 1
+        bucket_end = np.append(boundaries, len(keys))[np.searchsorted(boundaries, positions, side="right")]
+
+        # Compare every position with the one `offset` places later in its bucket,
+        # vectorized over all buckets at once (memory stays O(n) per step)
+        active = positions[bucket_end - positions > 1]
+        offset = 1
+        while len(active):
+            left, right = order[active], order[active + offset]
+            close = hamming_distance(hashes[left], hashes[right]) <= threshold
+            if close.any():
+                pairs.append(np.stack([left[close], right[close]], axis=1))
+            offset += 1
+            active = active[bucket_end[active] - active > offset]
+
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    return np.unique(pairs, axis=0)
+
+def _connected_components(count: int, pairs: np.ndarray) -> np.ndarray:
+    """Label each node with the smallest node id in its component (vectorized union-find)"""
+    labels = np.arange(count)
+    if len(pairs) == 0:
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        low = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, low)
+        np.minimum.at(updated, right, low)
+        updated = updated[updated]  # Pointer jumping
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+class PerceptualHashIndex:
+    """
+    aHash and dHash of every image in a dataset, with near-duplicate
+    clustering in sub-quadratic time.
+
+    Exact-hash duplicates collapse through np.unique; the remaining distinct
+    hashes are matched with a multi-index Hamming search, so the cost grows
+    with the number of band collisions rather than with n^2.
+    """
+
+    def __init__(self, names: List[str], ahash: np.ndarray, dhash: np.ndarray):
+        self.names = list(names)
+        self.ahash = np.asarray(ahash, dtype=np.uint64)
+        self.dhash = np.asarray(dhash, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def build(cls, zip_path: Path, progress_callback: Optional[Callable[[float, str], None]] = None,
+              should_cancel: Optional[Callable[[], bool]] = None,
+              max_workers: Optional[int] = None) -> "PerceptualHashIndex":
+        """Hash every image member of a zip in parallel worker processes"""
+        entries = [entry for entry in read_central_directory(zip_path)
+                   if Path(entry.name).suffix.lower() in IMAGE_EXTENSIONS
+                   and not entry.name.startswith("__MACOSX")]
+        if not entries:
+            return cls([], np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.uint64))
+
+        chunks = [entries[i:i + HASH_CHUNK_SIZE] for i in range(0, len(entries), HASH_CHUNK_SIZE)]
+        results: List[Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = [None] * len(chunks)
+        workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+            futures = {pool.submit(_hash_members, str(zip_path), chunk): i for i, chunk in enumerate(chunks)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                if should_cancel is not None and should_cancel():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise RuntimeError("Image hashing cancelled")
+                results[futures[future]] = future.result()
+                if progress_callback is not None:
+                    progress_callback(100 * done / len(chunks), f"hashed {min(done * HASH_CHUNK_SIZE, len(entries))}/{len(entries)} images")
+
+        ahash = np.concatenate([r[0] for r in results])
+        dhash = np.concatenate([r[1] for r in results])
+        ok = np.concatenate([r[2] for r in results])
+        names = [entry.name for entry, kept in zip(entries, ok) if kept]
+        return cls(names, ahash[ok], dhash[ok])
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, names=np.array(self.names, dtype=str), ahash=self.ahash, dhash=self.dhash)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "PerceptualHashIndex":
+        with np.load(path) as data:
+            return cls(data["names"].tolist(), data["ahash"], data["dhash"])
+
+    def find_clusters(self, threshold: int = DEFAULT_THRESHOLD, hash_kind: str = "dhash") -> List[List[str]]:
+        """
+        Groups of images whose hashes differ in at most `threshold` bits,
+        largest groups first. Singletons are not returned.
+        """
+        if hash_kind not in HASH_KINDS:
+            raise ValueError(f"hash_kind must be one of {HASH_KINDS}")
+        if not 0 <= threshold < 32:
+            raise ValueError("threshold must be between 0 and 31 bits")
+        if len(self) == 0:
+            return []
+
+        hashes = self.dhash if hash_kind == "dhash" else self.ahash
+        unique, inverse = np.unique(hashes, return_inverse=True)
+        labels = np.arange(len(unique))
+        if threshold > 0 and len(unique) > 1:
+            labels = _connected_components(len(unique), _near_pairs(unique, threshold))
+
+        member_labels = labels[inverse.reshape(-1)]
+        order = np.argsort(member_labels, kind="stable")
+        sorted_labels = member_labels[order]
+        starts = np.flatnonzero(np.diff(sorted_labels, prepend=sorted_labels[:1] - 1))
+        groups = np.split(order, starts[1:])
+        clusters = [[self.names[i] for i in group] for group in groups if len(group) > 1]
+        clusters.sort(key=len, reverse=True)
+        return clusters
+
+    def duplicate_report(self, threshold: int = DEFAULT_THRESHOLD, hash_kind: str = "dhash",
+                         max_clusters: int = 100) -> Dict[str, Any]:
+        """Summary of near-duplicate clusters for API responses and the quality scorer"""
+        clusters = self.find_clusters(threshold, hash_kind)
+        # Every image beyond the first in its cluster is a redundant copy
+        duplicates = sum(len(cluster) - 1 for cluster in clusters)
+        return {
+            "images": len(self),
+            "hash_kind": hash_kind,
+            "threshold": threshold,
+            "cluster_count": len(clusters),
+            "duplicate_images": duplicates,
+            "unique_images": len(self) - duplicates,
+            "clusters": clusters[:max_clusters],
+            "truncated": len(clusters) > max_clusters
+        }
@@ -0,0 +1,163 @@
+"""
+AetherAI - Inference Sidecar Client
+File: backend/utils/inference_client.py
+Purpose: Reach the shared text-generation sidecar from API workers over a Unix socket or local HTTP
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Many API workers, one model in memory.
+"""
+
+from typing import Dict, Any, Optional, Tuple, Iterator
+from urllib.parse import urlparse
+import http.client
+import threading
+import logging
+import socket
+import json
+import time
+import os
+
+from .deadlines import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+DEFAULT_SOCKET_PATH = "/tmp/aetherai-inference.sock"
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", "30"))
+HEALTH_TTL_SECONDS = 5.0  # How long a sidecar health probe is trusted
+DEADLINE_GRACE_SECONDS = 0.25  # Extra socket time for the sidecar to answer 504 on its own deadline
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket"""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class RemoteTextGenerator:
+    """
+    Same interface as report_generator.InsightModel (warm, ready, generate,
+    stream, status), backed by the inference sidecar (backend/inference_server.py).
+
+    Only the standard library is used, so API workers never import torch or
+    transformers. A sidecar that is down, still loading or busy makes
+    generate() return None and callers fall back to static insights.
+    """
+
+    def __init__(self, url: str = f"unix://{DEFAULT_SOCKET_PATH}", timeout: float = INFERENCE_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        parsed = urlparse(url)
+        if parsed.scheme == "unix":
+            self._socket_path = parsed.path or DEFAULT_SOCKET_PATH
+            self._address = None
+        elif parsed.scheme == "http":
+            self._socket_path = None
+            self._address = (parsed.hostname or "127.0.0.1", parsed.port or 80)
+        else:
+            raise ValueError(f"Unsupported inference URL (use unix:// or http://): {url}")
+        self._health: Dict[str, Any] = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        if self._socket_path:
+            return _UnixHTTPConnection(self._socket_path, timeout)
+        return http.client.HTTPConnection(*self._address, timeout=timeout)
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[float] = None) -> Tuple[int, Dict[str, Any]]:
+        conn = self._connection(timeout or self.timeout)
+        try:
+            body = json.dumps(payload).encode("utf-8") if payload is not None else None
+            conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read() or b"{}")
+        finally:
+            conn.close()
+
+    def _probe(self) -> Dict[str, Any]:
+        """Sidecar /health, cached for HEALTH_TTL_SECONDS so readiness checks stay cheap"""
+        with self._lock:
+            if time.monotonic() - self._checked_at < HEALTH_TTL_SECONDS:
+                return self._health
+            try:
+                _, health = self._request("GET", "/health", timeout=1.0)
+            except (OSError, ValueError) as e:
+                health = {"state": "unreachable", "ready": False, "error": str(e)}
+            self._health = health
+            self._checked_at = time.monotonic()
+            return health
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._probe().get("ready"))
+
+    def warm(self):
+        """The sidecar warms its own model; nothing to load here"""
+
+    def generate(self, prompt: str, max_new_tokens: int = 120, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """
+        Text generated after the prompt, or None if the sidecar cannot serve it
+        now. With a deadline the sidecar gets the remaining budget and
+        DeadlineExceeded is raised when it (or the socket) runs out.
+        """
+        payload: Dict[str, Any] = {"prompt": prompt, "max_new_tokens": max_new_tokens}
+        timeout = self.timeout
+        if deadline is not None:
+            payload["deadline_ms"] = deadline.remaining() * 1000
+            timeout = min(timeout, deadline.remaining() + DEADLINE_GRACE_SECONDS)
+        try:
+            status, data = self._request("POST", "/generate", payload, timeout=timeout)
+        except socket.timeout as e:
+            if deadline is None:
+                logger.warning(f"⚠️ Inference sidecar timed out: {str(e)}")
+                return None
+            raise DeadlineExceeded("timeout", "inference sidecar did not answer in time")
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Inference sidecar unavailable: {str(e)}")
+            self._checked_at = 0.0  # Re-probe on the next readiness check
+            return None
+        if status == 504 and deadline is not None:
+            detail = data.get("detail") or {}
+            raise DeadlineExceeded(detail.get("reason", "timeout"), detail.get("message", ""))
+        if status != 200:
+            logger.warning(f"⚠️ Inference sidecar returned {status}: {data.get('detail')}")
+            return None
+        return data.get("text")
+
+    def stream(self, prompt: str, max_new_tokens: int = 120) -> Optional[Iterator[str]]:
+        """Text pieces as the sidecar generates them (NDJSON), or None if it cannot serve now"""
+        conn = self._connection(self.timeout)
+        try:
+            body = json.dumps({"prompt": prompt, "max_new_tokens": max_new_tokens}).encode("utf-8")
+            conn.request("POST", "/generate/stream", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+        except OSError as e:
+            conn.close()
+            logger.warning(f"⚠️ Inference sidecar unavailable: {str(e)}")
+            self._checked_at = 0.0
+            return None
+        if response.status != 200:
+            conn.close()
+            logger.warning(f"⚠️ Inference sidecar returned {response.status}")
+            return None
+        return self._read_stream(conn, response)
+
+    @staticmethod
+    def _read_stream(conn: http.client.HTTPConnection, response: http.client.HTTPResponse) -> Iterator[str]:
+        try:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)["text"]
+        finally:
+            conn.close()
+
+    def status(self) -> Dict[str, Any]:
+        return {**self._probe(), "backend": "sidecar", "url": self.url}
@@ -0,0 +1,105 @@
+"""
+AetherAI - Insight Response Cache
+File: backend/utils/insight_cache.py
+Purpose: Bounded LRU + TTL cache of generated insights, keyed on a coarse run signature
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Thirty students training the same CNN should not wait for thirty generations.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+import random
+import math
+import time
+import os
+
+# Configuration
+INSIGHT_CACHE_SIZE = int(os.environ.get("INSIGHT_CACHE_SIZE", "1024"))  # Signatures kept
+INSIGHT_CACHE_TTL = float(os.environ.get("INSIGHT_CACHE_TTL", "3600"))  # Seconds
+INSIGHT_VARIANTS = 3  # Generations kept per signature, so a class does not all read the same text
+ACCURACY_BUCKET = 0.01
+LOSS_TREND_BUCKET = 0.1
+
+Signature = Tuple[str, str, int, int, str]
+
+def insight_signature(model: str, dataset: str, accuracy: float, metrics: Dict[str, List[float]],
+                      language: str = "en") -> Signature:
+    """
+    (model, dataset, accuracy bucket, loss-trend bucket, language). Runs that
+    land in the same 1% accuracy bucket and whose loss fell by a similar
+    share (10% steps) get the same insights.
+    """
+    losses = metrics.get("loss") or [0.0]
+    start, end = losses[0], losses[-1]
+    trend = (start - end) / start if start else 0.0  # 1.0 = loss went to zero, < 0 = diverged
+    return (
+        model.strip().lower(),
+        dataset.strip().lower(),
+        int(math.floor(round(accuracy / ACCURACY_BUCKET, 6))),  # round first: 0.29 / 0.01 = 28.999...
+        int(round(max(-1.0, min(trend, 1.0)) / LOSS_TREND_BUCKET)),
+        language.strip().lower()
+    )
+
+class InsightCache:
+    """
+    In-memory LRU of insight lists with a time-to-live.
+
+    Each signature keeps up to `variants` different generations: until that
+    many exist a lookup counts as a miss (the caller generates and adds one),
+    afterwards lookups are hits that return one of them at random. Entries
+    expire `ttl` seconds after their first generation.
+    """
+
+    def __init__(self, max_entries: int = INSIGHT_CACHE_SIZE, ttl: float = INSIGHT_CACHE_TTL,
+                 variants: int = INSIGHT_VARIANTS):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self._entries: "OrderedDict[Signature, Tuple[float, List[List[str]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: Signature) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None or len(entry[1]) < self.variants:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return list(random.choice(entry[1]))
+
+    def put(self, key: Signature, insights: List[str]):
+        with self._lock:
+            created, variants = self._entries.get(key, (time.monotonic(), []))
+            if insights not in variants and len(variants) < self.variants:
+                variants.append(list(insights))
+            self._entries[key] = (created, variants)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0
+        }
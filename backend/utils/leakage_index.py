@@ -0,0 +1,230 @@
+"""
+AetherAI - Train/Test Leakage Index
+File: backend/utils/leakage_index.py
+Purpose: Find files shared between splits and between uploaded datasets via hashed member keys
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: A test set only means something if the model has never seen it.
+"""
+
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+import hashlib
+import sqlite3
+import time
+
+from .zip_index import ZipEntry, read_central_directory, read_member
+from .dataset_shards import member_split
+
+# Defaults
+DEFAULT_INDEX_PATH = Path("uploads/cache/member_index.sqlite3")
+MAX_EXAMPLES = 20
+PROBE_BATCH = 50000
+
+def member_key(size: int, crc: int) -> int:
+    """
+    Content key of a zip member from its central directory: uncompressed size
+    and CRC32. Identical files always share a key, so no decompression is
+    needed; distinct files collide only if size and CRC32 both match.
+    Kept below 2^63 so it fits an SQLite INTEGER.
+    """
+    return ((size & 0x7FFFFFFF) << 32) | (crc & 0xFFFFFFFF)
+
+def _data_members(entries: Iterable[ZipEntry]) -> Iterable[ZipEntry]:
+    """Real files only: no directories, macOS metadata or empty files (which would all collide)"""
+    for entry in entries:
+        if entry.is_dir or entry.file_size == 0 or entry.name.startswith("__MACOSX"):
+            continue
+        if Path(entry.name).name.startswith("."):
+            continue
+        yield entry
+
+def _content_groups(f, entries: Dict[str, ZipEntry], names: List[str]) -> List[List[str]]:
+    """
+    Split members that share a key into groups of byte-identical files
+    (BLAKE2b of the content). Members that cannot be read stay grouped by key.
+    """
+    groups: Dict[Optional[bytes], List[str]] = {}
+    for name in names:
+        try:
+            digest = hashlib.blake2b(read_member(f, entries[name]), digest_size=16).digest()
+        except Exception:
+            digest = None
+        groups.setdefault(digest, []).append(name)
+    return list(groups.values())
+
+def find_split_leaks(members: Dict[str, Tuple[int, int]], zip_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Exact duplicates shared across train/val/test inside one dataset.
+
+    members maps name -> (size, crc), e.g. DatasetAnalyzer's manifest. One pass
+    buckets every split member by its key in a dict, so each lookup is a
+    constant-time probe and no pairs of files are ever compared. With the
+    zip_path, the candidates (and only those) are read to confirm they are
+    byte-identical, so a size + CRC32 collision is never reported.
+    """
+    buckets: Dict[int, List[Tuple[str, str]]] = {}
+    for name, (size, crc) in members.items():
+        split = member_split(name)
+        if split is None or size == 0 or name.endswith("/"):
+            continue
+        buckets.setdefault(member_key(size, crc), []).append((split, name))
+
+    candidates = [group for group in buckets.values() if len({split for split, _ in group}) > 1]
+    if zip_path is not None and candidates:
+        entries = {entry.name: entry for entry in read_central_directory(zip_path)}
+        confirmed = []
+        with open(zip_path, "rb") as f:
+            for group in candidates:
+                split_of = {name: split for split, name in group}
+                confirmed.extend([(split_of[name], name) for name in names]
+                                 for names in _content_groups(f, entries, list(split_of)))
+        candidates = confirmed
+
+    by_pair: Dict[str, int] = {}
+    examples = []
+    groups = 0
+    leaked_files = 0
+    for group in candidates:
+        splits = {split for split, _ in group}
+        if len(splits) < 2:
+            continue
+        groups += 1
+        # Copies outside the training split are the leaked ones
+        leaked_files += sum(1 for split, _ in group if split != "train") if "train" in splits else len(group) - 1
+        ordered = sorted(splits, key=("train", "val", "test").index)
+        for i, first in enumerate(ordered):
+            for second in ordered[i + 1:]:
+                pair = f"{first}-{second}"
+                by_pair[pair] = by_pair.get(pair, 0) + 1
+        if len(examples) < MAX_EXAMPLES:
+            examples.append(sorted(name for _, name in group))
+
+    return {
+        "has_leakage": groups > 0,
+        "leaked_files": leaked_files,
+        "duplicate_groups": groups,
+        "by_split_pair": by_pair,
+        "examples": examples,
+        "content_verified": zip_path is not None
+    }
+
+class MemberIndex:
+    """
+    Global index of member keys across every registered dataset, stored in
+    SQLite (WAL mode) so all worker processes share it and it survives restarts.
+
+    Probing a new dataset joins its keys against the indexed key column, so
+    each file costs one index lookup regardless of how many datasets are
+    registered. Datasets flagged as reference (e.g. the public MNIST train
+    set) are what students' test sets are usually checked against.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_INDEX_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS datasets ("
+                "dataset TEXT PRIMARY KEY, files INTEGER NOT NULL, "
+                "reference INTEGER NOT NULL DEFAULT 0, registered_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS members ("
+                "key INTEGER NOT NULL, dataset TEXT NOT NULL, name TEXT NOT NULL, split TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS members_key ON members (key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS members_dataset ON members (dataset)")
+
+    def register(self, dataset: str, entries: Iterable[ZipEntry], reference: bool = False) -> int:
+        """Add (or replace) a dataset's members; returns the number of files indexed"""
+        rows = [(member_key(entry.file_size, entry.crc), dataset, entry.name, member_split(entry.name))
+                for entry in _data_members(entries)]
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM members WHERE dataset = ?", (dataset,))
+            conn.executemany("INSERT INTO members (key, dataset, name, split) VALUES (?, ?, ?, ?)", rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO datasets (dataset, files, reference, registered_at) VALUES (?, ?, ?, ?)",
+                (dataset, len(rows), int(reference), time.time())
+            )
+            conn.execute("COMMIT")
+        return len(rows)
+
+    def register_zip(self, dataset: str, zip_path: Path, reference: bool = False) -> int:
+        return self.register(dataset, read_central_directory(zip_path), reference)
+
+    def probe(self, entries: Iterable[ZipEntry], exclude: Optional[str] = None,
+              splits: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Files of a dataset that already exist in other registered datasets.
+
+        splits restricts the probe to members of those splits (e.g. ["test"]);
+        matches are grouped by the dataset they were found in.
+        """
+        wanted = set(splits) if splits else None
+        probes: Dict[int, List[str]] = {}
+        for entry in _data_members(entries):
+            if wanted is not None and member_split(entry.name) not in wanted:
+                continue
+            probes.setdefault(member_key(entry.file_size, entry.crc), []).append(entry.name)
+
+        matches: Dict[str, Dict[str, Any]] = {}
+        seen = set()  # (dataset, file) pairs already counted
+        matched_files = set()
+        keys = list(probes)
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS probe (key INTEGER PRIMARY KEY)")
+            for start in range(0, len(keys), PROBE_BATCH):
+                conn.execute("DELETE FROM probe")
+                conn.executemany("INSERT OR IGNORE INTO probe (key) VALUES (?)",
+                                 ((key,) for key in keys[start:start + PROBE_BATCH]))
+                rows = conn.execute(
+                    "SELECT m.key, m.dataset, m.name, m.split, d.reference FROM probe p "
+                    "JOIN members m ON m.key = p.key JOIN datasets d ON d.dataset = m.dataset "
+                    "WHERE m.dataset != ?", (exclude or "",)
+                ).fetchall()
+                for key, dataset, other_name, other_split, reference in rows:
+                    found = matches.setdefault(dataset, {
+                        "reference": bool(reference), "matched_files": 0, "by_split": {}, "examples": []
+                    })
+                    for name in probes[key]:
+                        if (dataset, name) in seen:
+                            continue
+                        seen.add((dataset, name))
+                        found["matched_files"] += 1
+                        matched_files.add(name)
+                        split = f"{member_split(name) or 'unsplit'}->{other_split or 'unsplit'}"
+                        found["by_split"][split] = found["by_split"].get(split, 0) + 1
+                        if len(found["examples"]) < MAX_EXAMPLES:
+                            found["examples"].append({"file": name, "matches": other_name})
+
+        probed = sum(len(names) for names in probes.values())
+        return {
+            "probed_files": probed,
+            "leaked_files": len(matched_files),
+            "leak_rate": round(len(matched_files) / probed, 4) if probed else 0.0,
+            "datasets": matches
+        }
+
+    def datasets(self) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT dataset, files, reference, registered_at FROM datasets ORDER BY registered_at DESC"
+            ).fetchall()
+        return [{"dataset": d, "files": n, "reference": bool(r), "registered_at": t} for d, n, r, t in rows]
+
+    def remove(self, dataset: str) -> bool:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM members WHERE dataset = ?", (dataset,))
+            removed = conn.execute("DELETE FROM datasets WHERE dataset = ?", (dataset,)).rowcount
+            conn.execute("COMMIT")
+        return removed > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; a fresh connection per call keeps this thread- and process-safe
+        return sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
@@ -86,10 +86,19 @@ class LSTMClassifier(nn.Module):
         self.lstm = nn.LSTM(embed_dim, hidden_dim, num_layers, batch_first=True, dropout=0.3 if num_layers > 1 else 0)
         self.classifier = nn.Linear(hidden_dim, num_classes)
     
-    def forward(self, x):
+    def forward(self, x, lengths: Optional[torch.Tensor] = None):
         x = self.embedding(x)
-        x, (hidden, _) = self.lstm(x)
-        return self.classifier(hidden[-1])
+        if lengths is None:
+            _, (hidden, _) = self.lstm(x)
+            return self.classifier(hidden[-1])
+        # Right-padded batch: the top layer's output at each sequence's real
+        # last step equals the final hidden state of a packed run, since a
+        # step never sees later (padding) steps. The dense LSTM keeps the fused
+        # CPU kernel; packed sequences lose it and train ~2x slower, so
+        # length-bucketed batches (little padding) are the way to skip padding.
+        output, _ = self.lstm(x)
+        last = lengths.to(output.device).long().clamp(min=1, max=output.shape[1]) - 1
+        return self.classifier(output[torch.arange(output.shape[0], device=output.device), last])
 
 def create_model(config: Dict[str, Any]) -> Optional[nn.Module]:
     """
@@ -101,8 +110,38 @@ def create_model(config: Dict[str, Any]) -> Optional[nn.Module]:
     # Auto-detect input/output sizes
     input_size = config.get("input_size", 784)  # Default for MNIST
     num_classes = config.get("num_classes", 10)
+    vocab_size = config.get("vocab_size", 10000)
+    input_channels = config.get("input_channels", 1 if "mnist" in dataset else 3)
     
-    if "mnist" in dataset or "fashion-mnist" in dataset:
+    # Prepared datasets describe their own sizes; the dataset-name defaults
+    # below only apply when none was given
+    if config.get("shard_dir"):
+        # Packed image shards (see dataset_shards.py) record their image shape and classes
+        from .dataset_shards import ShardDataset
+        shards = ShardDataset(config["shard_dir"])
+        height, width, input_channels = shards.index["image_shape"]
+        input_size = height * width * input_channels
+        num_classes = shards.num_classes
+    elif config.get("zip_path"):
+        # Image-folder zips (see zip_loader.py) are decoded at image_size; their folders are the classes
+        from .zip_loader import ZipImageDataset
+        images = ZipImageDataset(config["zip_path"], config.get("image_size", (32, 32)), input_channels,
+                                 config.get("split"))
+        input_size = images.image_size[0] * images.image_size[1] * input_channels
+        num_classes = images.num_classes
+    elif config.get("table_dir") and config.get("target"):
+        # Ingested tables (see tabular_ingest.py) describe their own input/output sizes
+        from .tabular_ingest import ColumnarTable
+        table = ColumnarTable(config["table_dir"])
+        input_size = len(table.feature_columns(config["target"]))
+        num_classes = table.num_classes(config["target"])
+    elif config.get("token_dir"):
+        # Tokenized text corpora (see text_tokens.py) fix the vocabulary and classes
+        from .text_tokens import TokenizedCorpus
+        corpus = TokenizedCorpus(config["token_dir"])
+        vocab_size = corpus.vocab_size
+        num_classes = corpus.num_classes
+    elif "mnist" in dataset or "fashion-mnist" in dataset:
         input_size = 784
         num_classes = 10
     elif "cifar" in dataset:
@@ -115,7 +154,7 @@ def create_model(config: Dict[str, Any]) -> Optional[nn.Module]:
     # Create model
     if model_type == "cnn":
         return SimpleCNN(
-            input_channels=1 if "mnist" in dataset else 3,
+            input_channels=input_channels,
             num_classes=num_classes,
             hidden_layers=config.get("hidden_layers", 2)
         )
@@ -128,7 +167,7 @@ def create_model(config: Dict[str, Any]) -> Optional[nn.Module]:
         )
     elif model_type == "lstm":
         return LSTMClassifier(
-            vocab_size=config.get("vocab_size", 10000),
+            vocab_size=vocab_size,
             num_classes=num_classes,
             hidden_dim=config.get("hidden_dim", 128),
             num_layers=config.get("num_layers", 2)
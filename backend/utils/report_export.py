@@ -0,0 +1,189 @@
+"""
+AetherAI - Bulk Report Export
+File: backend/utils/report_export.py
+Purpose: Stream a whole class's experiment reports as a zip or one merged PDF while they render
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: A teacher should get every student's report with one click.
+"""
+
+from datetime import datetime
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple
+import asyncio
+import zipfile
+import json
+import re
+
+from .pdf_renderer import PdfRenderer
+
+# Configuration
+EXPORT_FORMATS = ("zip", "pdf")
+STREAM_CHUNK_SIZE = 256 * 1024
+
+class _ChunkSink:
+    """
+    Write-only, unseekable file object. zipfile switches to streaming mode
+    (data descriptors after each member) and the response drains what was
+    written after every report, so the archive is never held in memory.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def report_filename(result: Dict[str, Any]) -> str:
+    """Archive member name of a report, e.g. std_001_job_000012.pdf"""
+    owner = result.get("student_id") or "experiment"
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{owner}_{result.get('experiment_id', 'unknown')}") + ".pdf"
+
+class BulkReportExport:
+    """
+    One bulk export: the results to render, progress counters and the async
+    generators that stream it.
+
+    Reports are rendered in parallel by the shared PdfRenderer, with at most
+    two per worker in flight so a slow client never piles finished PDFs up
+    in memory; each one is written to the archive as soon as it is ready
+    (completion order). Reports that fail are listed in export_summary.json
+    instead of aborting the download.
+    """
+
+    def __init__(self, export_id: str, results: List[Dict[str, Any]], renderer: PdfRenderer,
+                 export_format: str = "zip", title: str = "aetherai_reports"):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of {list(EXPORT_FORMATS)}")
+        self.export_id = export_id
+        self.results = results
+        self.renderer = renderer
+        self.format = export_format
+        self.title = re.sub(r"[^A-Za-z0-9_.-]+", "_", title)
+        self.status = "ready"
+        self.completed = 0
+        self.failed: List[Dict[str, str]] = []
+        self._merged = b""
+        self.created_at = datetime.now().isoformat()
+
+    @property
+    def filename(self) -> str:
+        return f"{self.title}.{self.format}"
+
+    @property
+    def media_type(self) -> str:
+        return "application/zip" if self.format == "zip" else "application/pdf"
+
+    @property
+    def in_progress(self) -> bool:
+        return self.status in ("rendering", "streaming")
+
+    def progress(self) -> Dict[str, Any]:
+        total = len(self.results)
+        done = self.completed + len(self.failed)
+        return {
+            "export_id": self.export_id,
+            "format": self.format,
+            "status": self.status,
+            "total": total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "progress": round(100 * done / total, 1) if total else 100.0,
+            "created_at": self.created_at
+        }
+
+    def stream(self) -> AsyncIterator[bytes]:
+        return self._stream_zip() if self.format == "zip" else self._stream_merged()
+
+    async def _rendered(self) -> AsyncIterator[Tuple[Dict[str, Any], Optional[bytes], Optional[BaseException]]]:
+        """(result, pdf, error) for every result, as renders finish"""
+        window = max(2, 2 * self.renderer.max_workers)
+        queue = iter(self.results)
+        pending: Dict[asyncio.Future, Dict[str, Any]] = {}
+
+        def fill():
+            while len(pending) < window:
+                result = next(queue, None)
+                if result is None:
+                    return
+                pending[asyncio.wrap_future(self.renderer.submit(result))] = result
+
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                result = pending.pop(future)
+                error = future.exception()
+                yield result, None if error else future.result(), error
+            fill()
+
+    async def _stream_zip(self) -> AsyncIterator[bytes]:
+        # A repeat download renders (from the cache) and counts everything again
+        self.status = "streaming"
+        self.completed = 0
+        self.failed = []
+        sink = _ChunkSink()
+        names = set()
+        try:
+            with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+                async for result, pdf, error in self._rendered():
+                    if error is not None:
+                        self.failed.append({"experiment_id": str(result.get("experiment_id")), "error": str(error)})
+                        continue
+                    name = report_filename(result)
+                    while name in names:
+                        name = name[:-4] + "_1.pdf"
+                    names.add(name)
+                    archive.writestr(name, pdf)  # PDFs are already compressed
+                    self.completed += 1
+                    yield sink.drain()
+                self.status = "completed"
+                archive.writestr("export_summary.json", json.dumps(self.progress(), indent=2))
+            yield sink.drain()
+        except BaseException:
+            if self.status != "completed":
+                self.status = "cancelled"
+            raise
+
+    async def prepare(self):
+        """
+        Work that must finish before the response starts. A merged PDF is one
+        document laid out by one renderer, so it is rendered (or taken from the
+        cache) here, and render errors can still become a proper HTTP error.
+        """
+        if self.format != "pdf":
+            return
+        self.status = "rendering"
+        self.completed = 0
+        self.failed = []
+        try:
+            self._merged = await asyncio.wrap_future(self.renderer.submit_merged(self.results))
+        except Exception as e:
+            self.status = "failed"
+            self.failed = [{"experiment_id": "*", "error": str(e)}]
+            raise
+        self.completed = len(self.results)
+        self.status = "ready"
+
+    async def _stream_merged(self) -> AsyncIterator[bytes]:
+        self.status = "streaming"
+        try:
+            view = memoryview(self._merged)
+            for start in range(0, len(view), STREAM_CHUNK_SIZE):
+                yield bytes(view[start:start + STREAM_CHUNK_SIZE])
+            self.status = "completed"
+        finally:
+            # Exports are kept for progress polling; a repeat download takes the PDF from the render cache
+            view = None
+            self._merged = b""
+            if self.status != "completed":
+                self.status = "cancelled"
@@ -8,42 +8,189 @@ Year: 2025
 Vision: No GPU? No problem. Just generate smart reports.
 """
 
-from transformers import pipeline
+from concurrent.futures import TimeoutError as FutureTimeout
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Iterator
+from datetime import datetime
+import threading
+import time
+import os
 import re
 
+from .insight_cache import InsightCache, insight_signature
+from .deadlines import Deadline, DeadlineExceeded
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize text generation pipeline (will run on CPU)
-try:
-    generator = pipeline(
-        "text-generation",
-        model="gpt2",  # Lightweight, works on CPU
-        max_new_tokens=150,
-        temperature=0.7,
-        top_p=0.9,
-        repetition_penalty=1.2
-    )
-    MODEL_LOADED = True
-    logger.info("✅ Hugging Face GPT-2 model loaded successfully (CPU mode)")
-except Exception as e:
-    logger.warning(f"⚠️ Failed to load GPT-2 model: {str(e)}. Running in fallback mode.")
-    MODEL_LOADED = False
-
-def generate_ai_insights(metrics: Dict[str, List[float]], model: str, dataset: str, accuracy: float) -> List[str]:
+# Configuration
+INSIGHT_MODEL_NAME = os.environ.get("INSIGHT_MODEL", "gpt2")  # Lightweight, works on CPU
+# "int8": dynamic int8 linear layers (~3x less weight RAM, faster on CPU); "none": fp32
+INSIGHT_QUANTIZATION = os.environ.get("INSIGHT_QUANTIZATION", "none")
+# unix:///path/to.sock or http://host:port of the inference sidecar; unset = load the model in-process
+INFERENCE_URL = os.environ.get("INFERENCE_URL")
+
+# Fixed instruction block, first in every insight prompt so its key/value cache is computed once
+INSIGHT_PROMPT_PREFIX = """
+Write a short, professional analysis of the AI training experiment below with:
+1. Performance summary
+2. What went well
+3. One suggestion for improvement
+
+Keep it educational and encouraging for students.
+"""
+
+class InsightModel:
     """
-    Generate AI-powered natural language insights about training performance
+    GPT-2 causal LM behind a micro-batching queue, loaded off the request path.
+
+    Nothing is loaded at import: warm() starts a background thread (called
+    from app startup), and the first generate call starts it too if nobody
+    did. Until the model is ready generate() returns None and callers answer
+    with fallback insights instead of waiting on the load. Once loaded,
+    concurrent generate() calls are batched together (see GenerationBatcher).
     """
-    if not MODEL_LOADED:
-        return _fallback_insights(accuracy, model, dataset)
-    
-    try:
-        # Create prompt for the model
-        prompt = f"""
-Analyze this AI training experiment:
+
+    def __init__(self, model_name: str = INSIGHT_MODEL_NAME, quantization: str = INSIGHT_QUANTIZATION):
+        self.model_name = model_name
+        quantization = (quantization or "none").strip().lower()
+        if quantization != "none":
+            # Only pulls in torch when quantization was asked for; it is needed at load anyway
+            from .quantization import QUANTIZATION_MODES
+            if quantization not in QUANTIZATION_MODES:
+                logger.warning(f"⚠️ Unknown INSIGHT_QUANTIZATION '{quantization}' (expected one of "
+                               f"{', '.join(QUANTIZATION_MODES)}). Running the model in fp32.")
+                quantization = "none"
+        self.quantization = quantization
+        self.quantization_report: Optional[Dict[str, Any]] = None
+        self.state = "not_loaded"  # not_loaded -> loading -> ready | failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.loaded_at: Optional[str] = None
+        self._batcher = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def warm(self):
+        """Start loading in the background (no-op if already loading or loaded)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.state = "loading"
+            self._thread = threading.Thread(target=self._load, name="insight-model-warmup", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the model is ready (scripts and tests); False on timeout or failure"""
+        self.warm()
+        self._thread.join(timeout)
+        return self.ready
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            # Heavy imports, kept off the import path
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+            from .generation_batcher import GenerationBatcher
+
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            # safetensors weights are mmapped from the HF cache, not copied onto the heap
+            model = AutoModelForCausalLM.from_pretrained(self.model_name, low_cpu_mem_usage=True)
+            model.eval()
+            if self.quantization == "int8":
+                model = self._quantize(model, tokenizer, AutoModelForCausalLM)
+            self._batcher = GenerationBatcher(model, tokenizer)
+            self._batcher.register_prefix(INSIGHT_PROMPT_PREFIX)
+            self.load_seconds = round(time.perf_counter() - started, 2)
+            self.loaded_at = datetime.utcnow().isoformat()
+            self.state = "ready"
+            self._ready.set()
+            logger.info(f"✅ Hugging Face {self.model_name} model loaded in {self.load_seconds}s (CPU mode)")
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            logger.warning(f"⚠️ Failed to load {self.model_name} model: {str(e)}. Running in fallback mode.")
+
+    def _quantize(self, model, tokenizer, model_class):
+        """Dynamic int8, kept only if it still agrees with fp32 on the quality probe"""
+        from .quantization import quantize_checked
+
+        model, self.quantization_report = quantize_checked(model, tokenizer)
+        quality = self.quantization_report["quality"]
+        if quality["passed"]:
+            logger.info(f"✅ int8 insight model: {self.quantization_report['weights_mb']} MB weights, "
+                        f"{quality['top1_agreement']:.1%} next-token agreement with fp32")
+            return model
+        logger.warning(f"⚠️ int8 insight model failed the quality check ({quality}). Using fp32.")
+        self.quantization_report["mode"] = "none"
+        return model_class.from_pretrained(self.model_name, low_cpu_mem_usage=True).eval()
+
+    def generate(self, prompt: str, max_new_tokens: int = 120, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """
+        Text generated after the prompt, or None while the model is not ready.
+        With a deadline, raises DeadlineExceeded instead of waiting past it.
+        """
+        if not self.ready:
+            self.warm()
+            return None
+        if deadline is None:
+            return self._batcher.generate(prompt, max_new_tokens)
+        
+        # Don't queue behind batches that alone take longer than the budget
+        deadline.check(self._batcher.estimate_wait(), "queue")
+        future = self._batcher.submit(prompt, max_new_tokens)
+        try:
+            return future.result(timeout=deadline.remaining())
+        except FutureTimeout:
+            future.cancel()  # Still queued: drop it; already in a batch: its result is discarded
+            raise DeadlineExceeded("timeout", f"generation still running after {deadline.budget_ms:.0f}ms")
+
+    def stream(self, prompt: str, max_new_tokens: int = 120) -> Optional[Iterator[str]]:
+        """Text pieces as they are generated, or None while the model is not ready"""
+        if not self.ready:
+            self.warm()
+            return None
+        return self._batcher.stream(prompt, max_new_tokens)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "backend": "in_process",
+            "model": self.model_name,
+            "state": self.state,
+            "ready": self.ready,
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+            "quantization": self.quantization_report or {"mode": self.quantization},
+            "batching": self._batcher.stats() if self._batcher else None
+        }
+
+def _shared_model():
+    if INFERENCE_URL:
+        # One model copy in the sidecar, shared by every API worker
+        from .inference_client import RemoteTextGenerator
+        return RemoteTextGenerator(INFERENCE_URL)
+    return InsightModel()
+
+# Shared instance, warmed on app startup
+insight_model = _shared_model()
+
+# Generated insights for near-identical runs, shared by every request in this worker
+insight_cache = InsightCache()
+
+MAX_INSIGHT_SENTENCES = 4
+
+def _insight_prompt(metrics: Dict[str, List[float]], model: str, dataset: str, accuracy: float, language: str) -> str:
+    """Shared instructions, then this experiment's numbers"""
+    language_line = f"- Respond in language: {language}" if language != "en" else ""
+    return INSIGHT_PROMPT_PREFIX + f"""
+Experiment:
 - Model: {model.upper()}
 - Dataset: {dataset}
 - Final Accuracy: {accuracy:.1%}
@@ -52,36 +199,112 @@ Analyze this AI training experiment:
 Key metrics:
 - Accuracy started at {metrics['accuracy'][0]:.3f} and ended at {metrics['accuracy'][-1]:.3f}
 - Loss decreased from {metrics['loss'][0]:.3f} to {metrics['loss'][-1]:.3f}
+{language_line}
+Analysis:
+"""
 
-Write a short, professional analysis with:
-1. Performance summary
-2. What went well
-3. One suggestion for improvement
+def _split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in re.split(r'(?<=[.!?])\s+', text.strip()) if s.strip()]
 
-Keep it educational and encouraging for students.
-"""
-        
-        # Generate text
-        outputs = generator(prompt, max_new_tokens=120, num_return_sequences=1)
-        generated_text = outputs[0]["generated_text"][len(prompt):].strip()
+def _format_insight(sentence: str) -> str:
+    # Ensure the sentence is complete
+    if not re.match(r'.*[.!?]$', sentence):
+        sentence += "."
+    return f"🧠 {sentence}"
+
+def generate_ai_insights(metrics: Dict[str, List[float]], model: str, dataset: str, accuracy: float,
+                         language: str = "en", deadline: Optional[Deadline] = None) -> List[str]:
+    """
+    Generate AI-powered natural language insights about training performance
+    """
+    return generate_ai_insights_detailed(metrics, model, dataset, accuracy, language, deadline)["insights"]
+
+def generate_ai_insights_detailed(metrics: Dict[str, List[float]], model: str, dataset: str, accuracy: float,
+                                  language: str = "en", deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """
+    Insights plus the path that produced them: "cache", "model" or "fallback"
+    (with the reason: loading, queue, timeout or error). With a deadline the
+    static fallback is returned whenever the model cannot answer within it.
+    """
+    # Same model, dataset, accuracy bucket and loss trend: reuse an earlier generation
+    signature = insight_signature(model, dataset, accuracy, metrics, language)
+    cached = insight_cache.get(signature)
+    if cached is not None:
+        return {"insights": cached, "path": "cache", "reason": None}
+    
+    if not insight_model.ready:
+        # Not warmed up yet (or sidecar unreachable): answer now rather than wait on the load
+        insight_model.warm()
+        return {"insights": _fallback_insights(accuracy, model, dataset), "path": "fallback", "reason": "loading"}
+    
+    try:
+        prompt = _insight_prompt(metrics, model, dataset, accuracy, language)
+        generated_text = insight_model.generate(prompt, max_new_tokens=120, deadline=deadline)
+        if generated_text is None:
+            return {"insights": _fallback_insights(accuracy, model, dataset), "path": "fallback", "reason": "loading"}
         
         # Clean and format
-        sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', generated_text) if s.strip()]
-        sentences = sentences[:4]  # Limit to 4 sentences
-        
-        # Ensure last sentence is complete
-        if sentences and not re.match(r'.*[.!?]$', sentences[-1]):
-            sentences[-1] += "."
-        
-        return [f"🧠 {sent}" for sent in sentences]
+        sentences = _split_sentences(generated_text)[:MAX_INSIGHT_SENTENCES]
+        insights = [_format_insight(sent) for sent in sentences]
+        if insights:
+            insight_cache.put(signature, insights)
+        return {"insights": insights, "path": "model", "reason": None}
     
+    except DeadlineExceeded as e:
+        logger.info(f"Insight generation over budget ({e.reason}): {str(e)}")
+        return {"insights": _fallback_insights(accuracy, model, dataset), "path": "fallback", "reason": e.reason}
     except Exception as e:
         logger.error(f"Error in AI insight generation: {str(e)}")
-        return _fallback_insights(accuracy, model, dataset)
+        return {"insights": _fallback_insights(accuracy, model, dataset), "path": "fallback", "reason": "error"}
+
+def stream_ai_insights(metrics: Dict[str, List[float]], model: str, dataset: str, accuracy: float,
+                       language: str = "en") -> Iterator[str]:
+    """
+    Same insights as generate_ai_insights, yielded one sentence at a time as
+    soon as the model has finished writing it
+    """
+    signature = insight_signature(model, dataset, accuracy, metrics, language)
+    cached = insight_cache.get(signature)
+    if cached is not None:
+        yield from cached
+        return
+    
+    pieces = insight_model.stream(_insight_prompt(metrics, model, dataset, accuracy, language), max_new_tokens=120)
+    if pieces is None:
+        yield from _fallback_insights(accuracy, model, dataset)
+        return
+    
+    insights: List[str] = []
+    text = ""
+    try:
+        for piece in pieces:
+            text += piece
+            # Every sentence but the last is final once the next one has started
+            for sent in _split_sentences(text)[len(insights):-1]:
+                insights.append(_format_insight(sent))
+                yield insights[-1]
+                if len(insights) == MAX_INSIGHT_SENTENCES:
+                    break
+            if len(insights) == MAX_INSIGHT_SENTENCES:
+                break
+        else:
+            for sent in _split_sentences(text)[len(insights):MAX_INSIGHT_SENTENCES]:
+                insights.append(_format_insight(sent))
+                yield insights[-1]
+    except Exception as e:
+        logger.error(f"Error in AI insight streaming: {str(e)}")
+        if not insights:
+            yield from _fallback_insights(accuracy, model, dataset)
+        return
+    finally:
+        pieces.close()
+    
+    if insights:
+        insight_cache.put(signature, insights)
 
 def _fallback_insights(accuracy: float, model: str, dataset: str) -> List[str]:
     """
-    Fallback static insights if model fails to load
+    Fallback static insights while the model is loading or if it fails to load
     """
     base = [
         f"✅ {model.upper()} model trained on {dataset} dataset.",
@@ -107,6 +330,7 @@ if __name__ == "__main__":
         "loss": [2.3, 1.8, 1.4, 1.1, 0.9, 0.7, 0.6, 0.5, 0.4, 0.054]
     }
     
+    insight_model.wait()
     insights = generate_ai_insights(sample_metrics, "cnn", "MNIST", 0.983)
     for insight in insights:
         print(insight)
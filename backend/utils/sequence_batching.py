@@ -0,0 +1,138 @@
+"""
+AetherAI - Length-Bucketed Sequence Batching
+File: backend/utils/sequence_batching.py
+Purpose: Group text sequences of similar length so LSTMs stop paying for padding
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Short reviews should train at the speed of short reviews.
+"""
+
+from typing import Dict, Any, Iterator, Optional
+import time
+
+import numpy as np
+
+# A pool of this many batches is sorted by length at a time: large enough for
+# tight buckets, small enough that batches still mix across the epoch
+BUCKET_POOL_BATCHES = 50
+
+def length_bucketed_batches(lengths: np.ndarray, batch_size: int = 32, shuffle: bool = True,
+                            seed: Optional[int] = None,
+                            pool_batches: int = BUCKET_POOL_BATCHES) -> Iterator[np.ndarray]:
+    """
+    Yield index arrays whose sequences have similar lengths.
+
+    The epoch order is shuffled, cut into pools of pool_batches * batch_size
+    samples, each pool is sorted by length and split into batches, and the
+    batches are shuffled again. Padding per batch shrinks to the spread
+    within a bucket while every sample is still seen once per epoch.
+    """
+    lengths = np.asarray(lengths)
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(lengths)) if shuffle else np.arange(len(lengths))
+    pool_size = batch_size * pool_batches
+
+    batches = []
+    for start in range(0, len(order), pool_size):
+        pool = order[start:start + pool_size]
+        pool = pool[np.argsort(lengths[pool], kind="stable")]
+        batches.extend(pool[i:i + batch_size] for i in range(0, len(pool), batch_size))
+
+    if shuffle:
+        rng.shuffle(batches)
+    yield from batches
+
+def padding_ratio(lengths: np.ndarray, batches) -> float:
+    """Fraction of the padded [B, T] cells that are padding"""
+    real = padded = 0
+    for batch in batches:
+        batch_lengths = np.maximum(lengths[batch], 1)
+        real += int(batch_lengths.sum())
+        padded += int(batch_lengths.max()) * len(batch)
+    return round(1 - real / padded, 4) if padded else 0.0
+
+def benchmark_lstm_batching(corpus, batch_size: int = 32, max_batches: int = 30,
+                            max_length: Optional[int] = 400, seed: int = 0,
+                            model_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Compare LSTMClassifier training throughput with fully padded batches
+    (before) and length-bucketed batches read at each row's real last token
+    (after).
+
+    corpus is a TokenizedCorpus. Both runs train on the same sampled documents
+    for the same number of steps; throughput is real (non-pad) tokens per
+    CPU-second of the process, so it is fair on shared machines.
+    """
+    import torch
+    import torch.nn as nn
+    from .model_factory import LSTMClassifier
+
+    config = {"embed_dim": 128, "hidden_dim": 128, "num_layers": 2}
+    config.update(model_config or {})
+    lengths = corpus.lengths if max_length is None else np.minimum(corpus.lengths, max_length)
+    sample = np.random.default_rng(seed).permutation(len(corpus))[:batch_size * max_batches]
+
+    modes = {
+        "padded": [sample[i:i + batch_size] for i in range(0, len(sample), batch_size)],
+        "bucketed": [sample[batch] for batch in
+                     length_bucketed_batches(lengths[sample], batch_size, shuffle=True, seed=seed)]
+    }
+
+    results = {}
+    for mode, batches in modes.items():
+        torch.manual_seed(seed)
+        model = LSTMClassifier(vocab_size=corpus.vocab_size, num_classes=max(corpus.num_classes, 2),
+                               embed_dim=config["embed_dim"], hidden_dim=config["hidden_dim"],
+                               num_layers=config["num_layers"])
+        optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+        loss_fn = nn.CrossEntropyLoss()
+        model.train()
+
+        tokens = 0
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for batch in batches:
+            x, batch_lengths, y = corpus.get_batch(batch, max_length)
+            x, y = torch.from_numpy(x), torch.from_numpy(y)
+            if mode == "padded":
+                # Before: every sequence is padded to the corpus-wide max length
+                width = int(lengths.max())
+                x = nn.functional.pad(x, (0, width - x.shape[1]))
+                logits = model(x)
+            else:
+                logits = model(x, torch.from_numpy(batch_lengths))
+            loss = loss_fn(logits, y)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            tokens += int(np.maximum(batch_lengths, 1).sum())
+        cpu_seconds = time.process_time() - cpu_start
+        wall_seconds = time.perf_counter() - wall_start
+
+        if mode == "padded":
+            width = max(int(lengths.max()), 1)
+            padding = round(1 - tokens / (width * len(sample)), 4)
+        else:
+            padding = padding_ratio(lengths, batches)
+        results[mode] = {
+            "batches": len(batches),
+            "tokens": tokens,
+            "cpu_seconds": round(cpu_seconds, 3),
+            "wall_seconds": round(wall_seconds, 3),
+            "tokens_per_cpu_second": round(tokens / cpu_seconds, 1) if cpu_seconds else None,
+            "padding_ratio": padding
+        }
+
+    before = results["padded"]["tokens_per_cpu_second"]
+    after = results["bucketed"]["tokens_per_cpu_second"]
+    results["speedup"] = round(after / before, 2) if before and after else None
+    return results
+
+# Example usage
+if __name__ == "__main__":
+    import json
+    import sys
+    from .text_tokens import TokenizedCorpus
+
+    # python -m backend.utils.sequence_batching uploads/tokens/<token_id>
+    print(json.dumps(benchmark_lstm_batching(TokenizedCorpus(sys.argv[1])), indent=2))
@@ -0,0 +1,19 @@
+"""
+AetherAI - Server-Sent Events
+File: backend/utils/sse.py
+Purpose: Format streamed responses as Server-Sent Events
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Show students the first sentence instead of a spinner.
+"""
+
+from typing import Dict, Any
+import json
+
+# Keep proxies (nginx) from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """One SSE frame: named event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
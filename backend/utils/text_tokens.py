@@ -0,0 +1,334 @@
+"""
+AetherAI - Tokenization Cache
+File: backend/utils/text_tokens.py
+Purpose: Tokenize text datasets once into packed, memory-mapped int32 sequences
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Every LSTM and Transformer lesson starts from the same ready-made tokens.
+"""
+
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Tuple, Iterator
+from datetime import datetime
+import hashlib
+import zipfile
+import shutil
+import json
+import csv
+import io
+import os
+import re
+import uuid
+
+import numpy as np
+
+from .zip_index import read_central_directory, read_member
+from .dataset_shards import member_split, SPLIT_NAMES
+from .analysis_cache import hash_file
+from .sequence_batching import length_bucketed_batches
+
+# Configuration
+TOKEN_DIR = Path("uploads/tokens")
+TOKEN_FORMAT_VERSION = 1
+PAD_ID = 0
+UNK_ID = 1
+SPECIAL_TOKENS = ["<pad>", "<unk>"]
+TEXT_DOCUMENT_EXTENSIONS = {'.txt'}
+TABLE_EXTENSIONS = {'.csv': ',', '.tsv': '\t'}
+UNLABELED_FOLDERS = {"unsup", "unlabeled", "unlabelled"}
+TEXT_COLUMN_NAMES = ("text", "sentence", "review", "content", "document")
+LABEL_COLUMN_NAMES = ("label", "sentiment", "target", "class", "category")
+MAX_TRACKED_WORDS = 2_000_000  # Rare words are pruned from the counts beyond this
+
+DEFAULT_TOKENIZER_CONFIG = {
+    "vocab_size": 10000,  # Including <pad> and <unk>
+    "min_freq": 1,
+    "lowercase": True,
+    "max_length": None,  # Truncate documents to this many tokens (None keeps everything)
+    "split": None  # Only documents from this split folder (train/val/test)
+}
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)?|[^\w\s]", re.UNICODE)
+
+def tokenize(text: str, lowercase: bool = True) -> List[str]:
+    """Split text into words and punctuation; HTML tags such as IMDB's <br /> are dropped"""
+    text = _TAG_RE.sub(" ", text)
+    if lowercase:
+        text = text.lower()
+    return _TOKEN_RE.findall(text)
+
+def normalize_config(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Fill in defaults so equal settings always produce the same cache key"""
+    merged = dict(DEFAULT_TOKENIZER_CONFIG)
+    merged.update({key: value for key, value in (config or {}).items() if value is not None})
+    unknown = set(merged) - set(DEFAULT_TOKENIZER_CONFIG) - {"member", "text_column", "label_column"}
+    if unknown:
+        raise ValueError(f"Unknown tokenizer options: {sorted(unknown)}")
+    if merged["vocab_size"] <= len(SPECIAL_TOKENS):
+        raise ValueError("vocab_size must leave room for real tokens")
+    return merged
+
+def cache_key(dataset_hash: str, config: Dict[str, Any]) -> str:
+    """Directory name of a tokenized corpus: (dataset content hash, tokenizer config)"""
+    payload = json.dumps({"dataset": dataset_hash, "config": config,
+                          "format": TOKEN_FORMAT_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+class _DocumentSource:
+    """
+    Stream (text, label) documents from a zip. Two layouts are understood:
+    folder-per-class .txt files (aclImdb/train/pos/0_9.txt) or one CSV/TSV
+    with a text and a label column (SST-2).
+    """
+
+    def __init__(self, zip_path: Path, config: Dict[str, Any]):
+        self.zip_path = Path(zip_path)
+        self.config = config
+        entries = [entry for entry in read_central_directory(self.zip_path)
+                   if not entry.is_dir and not entry.name.startswith("__MACOSX")]
+        self.table_member = config.get("member")
+        if self.table_member is None:
+            tables = [e.name for e in entries if Path(e.name).suffix.lower() in TABLE_EXTENSIONS]
+            text_files = [e for e in entries if Path(e.name).suffix.lower() in TEXT_DOCUMENT_EXTENSIONS]
+            if not text_files and len(tables) == 1:
+                self.table_member = tables[0]
+            elif not text_files:
+                raise ValueError(f"No .txt documents found; choose a table via 'member'. Found: {tables}")
+        self.documents = [] if self.table_member else [
+            (entry, label) for entry, label in
+            ((e, self._folder_label(e.name)) for e in entries if Path(e.name).suffix.lower() in TEXT_DOCUMENT_EXTENSIONS)
+            if label is not None and (config["split"] is None or member_split(entry.name) == config["split"])
+        ]
+
+    @staticmethod
+    def _folder_label(name: str) -> Optional[str]:
+        parts = [p for p in name.split('/') if p]
+        if len(parts) < 2:
+            return None
+        label = parts[-2]
+        if label.lower() in SPLIT_NAMES or label.lower() in UNLABELED_FOLDERS:
+            return None
+        return label
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        if self.table_member:
+            yield from self._iter_table()
+            return
+        with open(self.zip_path, "rb") as f:
+            for entry, label in self.documents:
+                yield read_member(f, entry).decode("utf-8", errors="replace"), label
+
+    def _iter_table(self) -> Iterator[Tuple[str, str]]:
+        delimiter = TABLE_EXTENSIONS.get(Path(self.table_member).suffix.lower(), ",")
+        with zipfile.ZipFile(self.zip_path) as zf, zf.open(self.table_member) as raw:
+            reader = csv.reader(io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline=""),
+                                delimiter=delimiter, quoting=csv.QUOTE_MINIMAL)
+            header = [h.strip().lower() for h in next(reader, [])]
+            text_index = self._column(header, self.config.get("text_column"), TEXT_COLUMN_NAMES)
+            label_index = self._column(header, self.config.get("label_column"), LABEL_COLUMN_NAMES)
+            for row in reader:
+                if len(row) > max(text_index, label_index) and row[label_index].strip():
+                    yield row[text_index], row[label_index].strip()
+
+    @staticmethod
+    def _column(header: List[str], requested: Optional[str], candidates: Tuple[str, ...]) -> int:
+        if requested is not None:
+            if requested.lower() not in header:
+                raise ValueError(f"Column '{requested}' not found. Columns: {header}")
+            return header.index(requested.lower())
+        for name in candidates:
+            if name in header:
+                return header.index(name)
+        raise ValueError(f"Could not find one of {list(candidates)} in columns {header}")
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+class TokenCache:
+    """
+    Build-once store of tokenized corpora, keyed by (dataset hash, tokenizer config).
+
+    Output layout (in TOKEN_DIR/<key>):
+        meta.json      config, counts, classes
+        vocab.json     id -> token list (0 = <pad>, 1 = <unk>)
+        tokens.npy     every document's token ids back to back (int32)
+        offsets.npy    document i is tokens[offsets[i]:offsets[i + 1]] (int64)
+        labels.npy     class id per document (int64)
+    Corpora are written to a temporary folder and renamed into place, so
+    concurrent builders never expose a half-written corpus.
+    """
+
+    def __init__(self, root: Path = TOKEN_DIR):
+        self.root = Path(root)
+
+    def get_or_build(self, zip_path: Path, config: Optional[Dict[str, Any]] = None,
+                     dataset_hash: Optional[str] = None,
+                     progress_callback: Optional[Callable[[float, str], None]] = None,
+                     should_cancel: Optional[Callable[[], bool]] = None) -> "TokenizedCorpus":
+        config = normalize_config(config)
+        key = cache_key(dataset_hash or hash_file(zip_path), config)
+        target = self.root / key
+        if (target / "meta.json").exists():
+            if progress_callback is not None:
+                progress_callback(100, "reused cached tokens")
+            return TokenizedCorpus(target)
+
+        tmp_dir = self.root / f".{key}.{uuid.uuid4().hex[:8]}"
+        try:
+            self._build(zip_path, config, key, tmp_dir, progress_callback, should_cancel)
+            try:
+                os.rename(tmp_dir, target)
+            except OSError:
+                if not (target / "meta.json").exists():
+                    raise  # Someone else finishing first is fine; anything else is not
+        finally:
+            if tmp_dir.exists():
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        return TokenizedCorpus(target)
+
+    def _build(self, zip_path: Path, config: Dict[str, Any], key: str, output_dir: Path,
+               progress_callback: Optional[Callable[[float, str], None]],
+               should_cancel: Optional[Callable[[], bool]]):
+        def checkpoint(fraction: float, stage: str):
+            if should_cancel is not None and should_cancel():
+                raise RuntimeError("Tokenization cancelled")
+            if progress_callback is not None:
+                progress_callback(round(100 * fraction, 1), stage)
+
+        source = _DocumentSource(zip_path, config)
+        lowercase, max_length = config["lowercase"], config["max_length"]
+
+        # Pass 1: streaming word counts, class names and document lengths
+        counts: Counter = Counter()
+        lengths: List[int] = []
+        classes = set()
+        for i, (text, label) in enumerate(source):
+            tokens = tokenize(text, lowercase)
+            counts.update(tokens)
+            lengths.append(min(len(tokens), max_length) if max_length else len(tokens))
+            classes.add(label)
+            if len(counts) > MAX_TRACKED_WORDS:
+                counts = Counter({word: c for word, c in counts.items() if c > 1})
+            if i % 5000 == 0:
+                checkpoint(0.5 * i / max(len(source), 1) if len(source) else 0.0, f"counting words ({i} documents)")
+        if not lengths:
+            raise ValueError("No labelled text documents found")
+
+        vocabulary = SPECIAL_TOKENS + [word for word, c in counts.most_common(config["vocab_size"] - len(SPECIAL_TOKENS))
+                                       if c >= config["min_freq"]]
+        token_ids = {word: i for i, word in enumerate(vocabulary)}
+        class_names = sorted(classes)
+        class_ids = {name: i for i, name in enumerate(class_names)}
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        del counts
+
+        # Pass 2: encode straight into pre-sized memory-mapped arrays
+        output_dir.mkdir(parents=True, exist_ok=True)
+        tokens_out = np.lib.format.open_memmap(output_dir / "tokens.npy", mode="w+", dtype=np.int32,
+                                               shape=(int(offsets[-1]),))
+        labels = np.empty(len(lengths), dtype=np.int64)
+        lookup = token_ids.get
+        for i, (text, label) in enumerate(source):
+            tokens = tokenize(text, lowercase)[:lengths[i]]
+            tokens_out[offsets[i]:offsets[i + 1]] = [lookup(token, UNK_ID) for token in tokens]
+            labels[i] = class_ids[label]
+            if i % 5000 == 0:
+                checkpoint(0.5 + 0.5 * i / len(lengths), f"encoding ({i}/{len(lengths)} documents)")
+        tokens_out.flush()
+        del tokens_out
+
+        np.save(output_dir / "offsets.npy", offsets)
+        np.save(output_dir / "labels.npy", labels)
+        with open(output_dir / "vocab.json", "w") as f:
+            json.dump(vocabulary, f)
+        meta = {
+            "key": key,
+            "format_version": TOKEN_FORMAT_VERSION,
+            "source": Path(zip_path).name,
+            "created_at": datetime.utcnow().isoformat(),
+            "config": config,
+            "vocab_size": len(vocabulary),
+            "num_documents": len(lengths),
+            "num_tokens": int(offsets[-1]),
+            "classes": class_names,
+            "length": {
+                "mean": round(float(np.mean(lengths)), 1),
+                "p50": int(np.percentile(lengths, 50)),
+                "p95": int(np.percentile(lengths, 95)),
+                "max": int(max(lengths))
+            }
+        }
+        with open(output_dir / "meta.json", "w") as f:
+            json.dump(meta, f, indent=2)
+        checkpoint(1.0, "done")
+
+class TokenizedCorpus:
+    """
+    Read a tokenized corpus through np.memmap. Documents are slices of one
+    flat int32 array, so any number of training jobs can share it.
+    """
+
+    def __init__(self, corpus_dir: Path):
+        self.corpus_dir = Path(corpus_dir)
+        with open(self.corpus_dir / "meta.json") as f:
+            self.meta = json.load(f)
+        self.tokens = np.load(self.corpus_dir / "tokens.npy", mmap_mode="r")
+        self.offsets = np.load(self.corpus_dir / "offsets.npy")
+        self.labels = np.load(self.corpus_dir / "labels.npy")
+        self.lengths = np.diff(self.offsets)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @property
+    def vocab_size(self) -> int:
+        return self.meta["vocab_size"]
+
+    @property
+    def num_classes(self) -> int:
+        return len(self.meta["classes"])
+
+    def vocabulary(self) -> List[str]:
+        with open(self.corpus_dir / "vocab.json") as f:
+            return json.load(f)
+
+    def document(self, index: int) -> np.ndarray:
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def get_batch(self, indices: np.ndarray, max_length: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gather documents into (token ids int64 [B, T] padded with 0, lengths int64 [B],
+        labels int64 [B]); T is the longest document in the batch.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = self.lengths[indices]
+        if max_length is not None:
+            lengths = np.minimum(lengths, max_length)
+        batch = np.full((len(indices), max(int(lengths.max(initial=0)), 1)), PAD_ID, dtype=np.int64)
+        for row, (index, length) in enumerate(zip(indices, lengths)):
+            start = self.offsets[index]
+            batch[row, :length] = self.tokens[start:start + length]
+        return batch, lengths.astype(np.int64), self.labels[indices]
+
+    def iter_batches(self, batch_size: int = 32, shuffle: bool = True, seed: Optional[int] = None,
+                     max_length: Optional[int] = None,
+                     bucket_by_length: bool = False) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Yield padded batches for one epoch in random (or corpus) order.
+        With bucket_by_length, batches hold documents of similar length (see
+        sequence_batching.py), so each batch is padded only to its own longest
+        document. Pass the lengths to LSTMClassifier, which reads every row's
+        output at its last real token instead of after the padding.
+        """
+        if bucket_by_length:
+            lengths = self.lengths if max_length is None else np.minimum(self.lengths, max_length)
+            for batch in length_bucketed_batches(lengths, batch_size, shuffle=shuffle, seed=seed):
+                yield self.get_batch(batch, max_length)
+            return
+        order = np.random.default_rng(seed).permutation(len(self)) if shuffle else np.arange(len(self))
+        for start in range(0, len(order), batch_size):
+            yield self.get_batch(order[start:start + batch_size], max_length)
@@ -0,0 +1,171 @@
+"""
+AetherAI - Zip Central Directory Index
+File: backend/utils/zip_index.py
+Purpose: Read a zip's central directory quickly and fetch single members by offset
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Big student datasets should open in milliseconds, not seconds.
+"""
+
+from pathlib import Path
+from typing import List, NamedTuple, BinaryIO, Union
+import struct
+import zlib
+
+# Record signatures and layouts (PKWARE APPNOTE 4.3)
+EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+ZIP64_EOCD_SIGNATURE = b"PK\x06\x06"
+CENTRAL_SIGNATURE = b"PK\x01\x02"
+LOCAL_SIGNATURE = b"PK\x03\x04"
+
+EOCD_STRUCT = struct.Struct("<4s4H2LH")
+ZIP64_LOCATOR_STRUCT = struct.Struct("<4sLQL")
+ZIP64_EOCD_STRUCT = struct.Struct("<4sQ2H2L4Q")
+CENTRAL_STRUCT = struct.Struct("<4s6H3L5H2L")
+LOCAL_STRUCT = struct.Struct("<4s5H3L2H")
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+UTF8_FLAG = 0x800
+ENCRYPTED_FLAG = 0x1
+ZIP64_EXTRA_ID = 0x0001
+MAX_EOCD_SEARCH = 65535 + EOCD_STRUCT.size
+
+
+class ZipEntry(NamedTuple):
+    """One central directory record (the fields analysis and loaders need)"""
+    name: str
+    compress_type: int
+    compress_size: int
+    file_size: int
+    crc: int
+    header_offset: int
+    flags: int
+
+    @property
+    def is_dir(self) -> bool:
+        return self.name.endswith("/")
+
+
+def read_central_directory(source: Union[str, Path, BinaryIO]) -> List[ZipEntry]:
+    """
+    Parse the central directory into ZipEntry tuples.
+
+    Much cheaper than zipfile.ZipFile for archives with tens of thousands of
+    members because it builds plain tuples instead of ZipInfo objects.
+    Raises ValueError for files that are not valid zip archives.
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            return read_central_directory(f)
+
+    f = source
+    f.seek(0, 2)
+    file_size = f.tell()
+    search = min(file_size, MAX_EOCD_SEARCH)
+    f.seek(file_size - search)
+    tail = f.read(search)
+    eocd_pos = tail.rfind(EOCD_SIGNATURE)
+    if eocd_pos < 0 or eocd_pos + EOCD_STRUCT.size > len(tail):
+        raise ValueError("File is not a zip file")
+
+    _, _, _, _, count, cd_size, cd_offset, _ = EOCD_STRUCT.unpack_from(tail, eocd_pos)
+
+    # Zip64 archives keep the real counts in a separate record before the EOCD
+    locator_pos = eocd_pos - ZIP64_LOCATOR_STRUCT.size
+    if locator_pos >= 0 and tail[locator_pos:locator_pos + 4] == ZIP64_LOCATOR_SIGNATURE:
+        _, _, zip64_offset, _ = ZIP64_LOCATOR_STRUCT.unpack_from(tail, locator_pos)
+        f.seek(zip64_offset)
+        record = f.read(ZIP64_EOCD_STRUCT.size)
+        if record[:4] == ZIP64_EOCD_SIGNATURE:
+            fields = ZIP64_EOCD_STRUCT.unpack(record)
+            count, cd_size, cd_offset = fields[7], fields[8], fields[9]
+
+    # Data prepended to the archive (e.g. self-extractors) shifts every offset
+    eocd_abs = file_size - search + eocd_pos
+    concat = eocd_abs - cd_size - cd_offset
+    if locator_pos >= 0 and tail[locator_pos:locator_pos + 4] == ZIP64_LOCATOR_SIGNATURE:
+        concat -= ZIP64_EOCD_STRUCT.size + ZIP64_LOCATOR_STRUCT.size
+    concat = max(concat, 0)
+
+    f.seek(cd_offset + concat)
+    data = f.read(cd_size)
+
+    entries = []
+    unpack = CENTRAL_STRUCT.unpack_from
+    header_size = CENTRAL_STRUCT.size
+    pos = 0
+    end = len(data)
+    while pos + header_size <= end:
+        (signature, _, _, flags, method, _, _, crc, csize, usize,
+         name_len, extra_len, comment_len, _, _, _, offset) = unpack(data, pos)
+        if signature != CENTRAL_SIGNATURE:
+            raise ValueError("Bad magic number for central directory")
+        pos += header_size
+        raw_name = data[pos:pos + name_len]
+        if raw_name.isascii():
+            name = raw_name.decode("ascii")
+        else:
+            name = raw_name.decode("utf-8" if flags & UTF8_FLAG else "cp437")
+        pos += name_len
+
+        if csize == 0xFFFFFFFF or usize == 0xFFFFFFFF or offset == 0xFFFFFFFF:
+            usize, csize, offset = _zip64_sizes(data[pos:pos + extra_len], usize, csize, offset)
+        pos += extra_len + comment_len
+
+        entries.append(ZipEntry(name, method, csize, usize, crc, offset + concat, flags))
+
+    if len(entries) != count and count != 0xFFFF:
+        raise ValueError("Truncated central directory")
+    return entries
+
+
+def _zip64_sizes(extra: bytes, usize: int, csize: int, offset: int):
+    """Replace 0xFFFFFFFF placeholders with the values from the zip64 extra field"""
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack_from("<2H", extra, pos)
+        if header_id == ZIP64_EXTRA_ID:
+            values = iter(struct.unpack_from(f"<{size // 8}Q", extra, pos + 4))
+            if usize == 0xFFFFFFFF:
+                usize = next(values)
+            if csize == 0xFFFFFFFF:
+                csize = next(values)
+            if offset == 0xFFFFFFFF:
+                offset = next(values)
+            break
+        pos += 4 + size
+    return usize, csize, offset
+
+
+def read_member(f: BinaryIO, entry: ZipEntry) -> bytes:
+    """
+    Read and decompress one member using its central directory entry.
+
+    Seeks straight to the local header, so no scanning is needed. zlib
+    releases the GIL while inflating, which lets thread pools decompress
+    members in parallel (each thread must use its own file handle).
+    """
+    if entry.flags & ENCRYPTED_FLAG:
+        raise ValueError(f"Encrypted member not supported: {entry.name}")
+
+    f.seek(entry.header_offset)
+    header = f.read(LOCAL_STRUCT.size)
+    if len(header) != LOCAL_STRUCT.size or header[:4] != LOCAL_SIGNATURE:
+        raise ValueError(f"Bad local header for member: {entry.name}")
+    name_len, extra_len = LOCAL_STRUCT.unpack(header)[-2:]
+    f.seek(name_len + extra_len, 1)
+    raw = f.read(entry.compress_size)
+
+    if entry.compress_type == ZIP_STORED:
+        data = raw
+    elif entry.compress_type == ZIP_DEFLATED:
+        data = zlib.decompressobj(-15).decompress(raw)
+    else:
+        raise ValueError(f"Unsupported compression method {entry.compress_type} for {entry.name}")
+
+    if zlib.crc32(data) != entry.crc:
+        raise ValueError(f"CRC mismatch for member: {entry.name}")
+    return data
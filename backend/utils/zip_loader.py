@@ -0,0 +1,155 @@
+"""
+AetherAI - Zip-Backed Data Loader
+File: backend/utils/zip_loader.py
+Purpose: Train directly on uploaded image-folder zips with parallel member decompression
+Created by: Kareem Mostafa
+Location: Future City, Cairo, Egypt
+Year: 2025
+Vision: Upload and train — no extraction step, no waiting.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import deque
+from pathlib import Path
+from typing import List, Optional, Tuple, Iterator, Deque
+import threading
+import os
+
+import numpy as np
+
+from .zip_index import ZipEntry, read_central_directory, read_member
+from .dataset_shards import image_label, member_split, decode_image
+
+# Configuration
+DEFAULT_PREFETCH_BATCHES = 4
+
+class ZipImageDataset:
+    """
+    Image-folder zip indexed by its central directory.
+
+    Holds one (entry, label) per image, so any sample can be read by seeking
+    straight to its local header; shuffling is just a permutation of this index.
+    """
+
+    def __init__(self, zip_path: Path, image_size: Tuple[int, int] = (32, 32), channels: int = 3,
+                 split: Optional[str] = None):
+        self.zip_path = Path(zip_path)
+        self.image_size = (int(image_size[0]), int(image_size[1]))
+        self.channels = channels
+        samples = []
+        for entry in read_central_directory(self.zip_path):
+            label = image_label(entry.name)
+            if label is None or (split and member_split(entry.name) != split):
+                continue
+            samples.append((entry, label))
+        if not samples:
+            raise ValueError("No class-folder images found (expected e.g. train/cat/001.png)")
+
+        self.classes: List[str] = sorted({label for _, label in samples})
+        class_ids = {name: i for i, name in enumerate(self.classes)}
+        self.entries: List[ZipEntry] = [entry for entry, _ in samples]
+        self.labels = np.array([class_ids[label] for _, label in samples], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def num_classes(self) -> int:
+        return len(self.classes)
+
+class ZipBatchLoader:
+    """
+    Iterate (images uint8 [B, H, W, C], labels int64 [B]) batches straight from
+    the zip, the same format ShardDataset.iter_batches yields.
+
+    Members are inflated and decoded on a thread pool (zlib and PIL release
+    the GIL), each worker thread holds its own file handle, and at most
+    `prefetch` batches are in flight, which bounds memory. Images that fail to
+    decode are left black rather than stopping the epoch; failures are counted.
+    """
+
+    def __init__(self, dataset: ZipImageDataset, batch_size: int = 32, shuffle: bool = True,
+                 seed: Optional[int] = None, num_workers: Optional[int] = None,
+                 prefetch: int = DEFAULT_PREFETCH_BATCHES, drop_last: bool = False):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.num_workers = num_workers or max(2, min(8, os.cpu_count() or 2))
+        self.prefetch = max(1, prefetch)
+        self.failed = 0
+        self._rng = np.random.default_rng(seed)
+        self._local = threading.local()
+        self._handles = []
+        self._handles_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        n = len(self.dataset)
+        return n // self.batch_size if self.drop_last else -(-n // self.batch_size)
+
+    def _file(self):
+        """This worker thread's own file handle (seek positions are per handle)"""
+        handle = getattr(self._local, "handle", None)
+        if handle is None:
+            handle = open(self.dataset.zip_path, "rb")
+            self._local.handle = handle
+            with self._handles_lock:
+                self._handles.append(handle)
+        return handle
+
+    def _load(self, indices: np.ndarray, rows: np.ndarray, out: np.ndarray) -> int:
+        """Worker task: inflate and decode a slice of a batch; returns the number of failures"""
+        handle = self._file()
+        failed = 0
+        for index, row in zip(indices, rows):
+            try:
+                data = read_member(handle, self.dataset.entries[index])
+                out[row] = decode_image(data, self.dataset.image_size, self.dataset.channels)
+            except Exception:
+                out[row] = 0
+                failed += 1
+        return failed
+
+    def _submit_batch(self, pool: ThreadPoolExecutor, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[Future]]:
+        size = self.dataset.image_size
+        images = np.empty((len(indices), size[0], size[1], self.dataset.channels), dtype=np.uint8)
+        # Read in archive order so each worker's handle sees mostly forward seeks,
+        # and hand every worker one contiguous slice (one task each, not one per image)
+        rows = np.argsort([self.dataset.entries[i].header_offset for i in indices])
+        futures = [pool.submit(self._load, indices[part], part, images)
+                   for part in np.array_split(rows, min(self.num_workers, len(rows))) if len(part)]
+        return images, self.dataset.labels[indices], futures
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        n = len(self.dataset)
+        order = self._rng.permutation(n) if self.shuffle else np.arange(n)
+        batches = [order[i:i + self.batch_size] for i in range(0, n, self.batch_size)]
+        if self.drop_last and batches and len(batches[-1]) < self.batch_size:
+            batches.pop()
+
+        pending: Deque[Tuple[np.ndarray, np.ndarray, List[Future]]] = deque()
+        pool = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="zip-loader")
+        try:
+            next_batch = 0
+            while next_batch < len(batches) or pending:
+                # Keep the prefetch window full
+                while next_batch < len(batches) and len(pending) < self.prefetch:
+                    pending.append(self._submit_batch(pool, batches[next_batch]))
+                    next_batch += 1
+                images, labels, futures = pending.popleft()
+                self.failed += sum(future.result() for future in futures)
+                yield images, labels
+        finally:
+            for _, _, futures in pending:
+                for future in futures:
+                    future.cancel()
+            pool.shutdown(wait=True)
+            self._close_handles()
+
+    def _close_handles(self):
+        with self._handles_lock:
+            for handle in self._handles:
+                handle.close()
+            self._handles.clear()
+        # Worker threads are gone after shutdown; a new epoch opens fresh handles
+        self._local = threading.local()
@@ -99,6 +99,7 @@ const App = () => {
   const [backendStatus, setBackendStatus] = useState('checking...');
   const [showCustomBuilder, setShowCustomBuilder] = useState(false);
   const [analysis, setAnalysis] = useState(null);
+  const [analysisPreviewId, setAnalysisPreviewId] = useState(null);
   const [language, setLanguage] = useState(i18n.getLanguage());
 
   // Check backend health on mount
@@ -147,6 +148,7 @@ const App = () => {
 
   const handleDatasetAnalyzed = (analysisData) => {
     setAnalysis(analysisData.analysis);
+    setAnalysisPreviewId(analysisData.preview_id);
   };
 
   const handleLanguageChange = (lang) => {
@@ -185,7 +187,7 @@ const App = () => {
             onAnalysisComplete={handleDatasetAnalyzed} 
           />
           
-          {analysis && <DatasetAnalysis analysis={analysis} />}
+          {analysis && <DatasetAnalysis analysis={analysis} previewId={analysisPreviewId} />}
           
           {dataset && (
             <DatasetQuality 
@@ -6,10 +6,34 @@
  * Vision: Help students understand their data before training.
  */
 
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
+import ApiService from '../services/api';
 
-const DatasetAnalysis = ({ analysis }) => {
+const DatasetAnalysis = ({ analysis, previewId }) => {
   const [expanded, setExpanded] = useState(false);
+  const [preview, setPreview] = useState(null);
+  const [previewMode, setPreviewMode] = useState('per_class');
+  const [previewLoading, setPreviewLoading] = useState(false);
+
+  const hasImages = (analysis?.images?.image_files || 0) > 0;
+
+  const loadPreview = async (mode = previewMode) => {
+    if (!previewId) return;
+    setPreviewLoading(true);
+    try {
+      const data = await ApiService.getDatasetPreview(previewId, { mode, n: 24, per_class: 4 });
+      setPreview(data);
+    } catch (error) {
+      setPreview({ error: error.response?.data?.detail || 'Preview unavailable' });
+    } finally {
+      setPreviewLoading(false);
+    }
+  };
+
+  useEffect(() => {
+    setPreview(null);
+    if (hasImages) loadPreview();
+  }, [previewId, hasImages]);
 
   if (!analysis) {
     return (
@@ -48,6 +72,55 @@ const DatasetAnalysis = ({ analysis }) => {
         ))}
       </div>
 
+      {/* Sample Images */}
+      {hasImages && previewId && (
+        <div className="mb-6">
+          <div className="flex items-center justify-between mb-3">
+            <h4 className="font-semibold text-white">🖼️ Sample Images</h4>
+            <div className="flex gap-2 text-xs">
+              {[
+                { id: 'per_class', label: 'Per class' },
+                { id: 'random', label: 'Random' }
+              ].map((option) => (
+                <button
+                  key={option.id}
+                  onClick={() => {
+                    setPreviewMode(option.id);
+                    loadPreview(option.id);
+                  }}
+                  className={`px-2 py-1 rounded ${previewMode === option.id ? 'bg-cyan-500 text-black' : 'bg-gray-700 text-gray-200 hover:bg-gray-600'}`}
+                >
+                  {option.label}
+                </button>
+              ))}
+              <button
+                onClick={() => loadPreview()}
+                disabled={previewLoading}
+                className="px-2 py-1 rounded bg-gray-700 text-gray-200 hover:bg-gray-600 disabled:opacity-50"
+              >
+                🔄
+              </button>
+            </div>
+          </div>
+          {previewLoading && !preview && <p className="text-gray-400 text-sm">Loading samples...</p>}
+          {preview?.error && <p className="text-red-400 text-sm">{preview.error}</p>}
+          {preview?.samples && (
+            <div className="grid grid-cols-4 md:grid-cols-6 gap-2">
+              {preview.samples.map((sample) => (
+                <div key={sample.name} className="bg-black bg-opacity-40 rounded-lg p-1 text-center" title={sample.name}>
+                  <img
+                    src={sample.thumbnail}
+                    alt={sample.label || sample.name}
+                    className="w-full aspect-square object-contain rounded"
+                  />
+                  {sample.label && <div className="text-gray-300 text-xs truncate mt-1">{sample.label}</div>}
+                </div>
+              ))}
+            </div>
+          )}
+        </div>
+      )}
+
       {/* Structure */}
       <div className="mb-6">
         <h4 className="font-semibold text-white mb-3">📁 Structure</h4>
@@ -59,6 +59,39 @@ api.interceptors.response.use(
   }
 );
 
+// POST a JSON body and read the Server-Sent Events reply as it arrives
+// (EventSource only supports GET). Resolves with the data of the 'done' event.
+async function streamEvents(path, body, onEvent) {
+  const response = await fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok) {
+    throw new Error(`Error ${response.status}: ${response.statusText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let done = null;
+  for (;;) {
+    const { value, done: finished } = await reader.read();
+    if (finished) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = (frame.match(/^event: (.*)$/m) || [])[1] || 'message';
+      const data = JSON.parse((frame.match(/^data: (.*)$/m) || [])[1] || '{}');
+      if (event === 'done') done = data;
+      onEvent?.(event, data);
+    }
+  }
+  return done;
+}
+
 // API Endpoints
 const ApiService = {
   // Health check
@@ -92,17 +125,32 @@ const ApiService = {
     }
   },
 
-  // Analyze dataset
-  async analyzeDataset(file) {
+  // Analyze dataset (runs as a background job; polls until the result is ready)
+  async analyzeDataset(file, onProgress) {
     const formData = new FormData();
     formData.append('file', file);
 
     try {
-      const response = await api.post('/api/v1/datasets/analyze', formData, {
+      const submitted = await api.post('/api/v1/datasets/analyze', formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
         }
       });
+      // Cached, or small enough to finish within the latency budget: result comes back immediately
+      if (submitted.data.analysis) {
+        return submitted.data;
+      }
+      const jobId = submitted.data.job_id;
+
+      // Poll job progress
+      let job = submitted.data;
+      while (!['completed', 'failed', 'cancelled'].includes(job.status)) {
+        await new Promise((resolve) => setTimeout(resolve, 500));
+        job = (await api.get(`/api/v1/datasets/analyze/jobs/${jobId}`)).data;
+        if (onProgress) onProgress(job.progress, job.stage);
+      }
+
+      const response = await api.get(`/api/v1/datasets/analyze/jobs/${jobId}/result`);
       return response.data;
     } catch (error) {
       console.error('Dataset Analysis API Error:', error);
@@ -110,6 +158,19 @@ const ApiService = {
     }
   },
 
+  // Get sample thumbnails of an analyzed dataset by its preview_id (mode: 'random' or 'per_class')
+  async getDatasetPreview(previewId, options = {}) {
+    try {
+      const response = await api.get(`/api/v1/datasets/preview/${encodeURIComponent(previewId)}`, {
+        params: options
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Dataset Preview API Error:', error);
+      throw error;
+    }
+  },
+
   // Get hyperparameter suggestion
   async getHyperparameterSuggestion(config) {
     try {
@@ -609,12 +670,49 @@ const ApiService = {
         { experiment_id: experimentId },
         { responseType: 'blob' } // Important for file download
       );
+      if (response.status !== 202) {
+        return response.data;
+      }
+
+      // Not rendered within the latency budget: poll the queued report until the PDF is ready
+      const queued = JSON.parse(await response.data.text());
+      let download;
+      do {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        download = await api.get(queued.download_url, { responseType: 'blob' });
+      } while (download.status === 202);
+      return download.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  // Start a bulk report export (a class or a list of experiments, as zip or merged pdf)
+  async startBulkReportExport({ classId = null, experimentIds = null, format = 'zip' } = {}) {
+    try {
+      const response = await api.post('/api/v1/reports/bulk', {
+        class_id: classId,
+        experiment_ids: experimentIds,
+        format
+      });
       return response.data;
     } catch (error) {
+      console.error('Bulk Export API Error:', error);
       throw error;
     }
   },
 
+  // Poll bulk export progress while the download streams
+  async getBulkReportExport(exportId) {
+    const response = await api.get(`/api/v1/reports/bulk/${exportId}`);
+    return response.data;
+  },
+
+  // Direct link for the browser to stream the export (no blob held in memory)
+  getBulkReportDownloadUrl(exportId) {
+    return `${API_BASE_URL}/api/v1/reports/bulk/${exportId}/download`;
+  },
+
   // Get AI-generated insights
   async getAIInsights(data) {
     try {
@@ -626,6 +724,16 @@ const ApiService = {
     }
   },
 
+  // Stream AI insights (SSE over POST): onEvent(name, data) fires per insight, then 'done'
+  async streamAIInsights(data, onEvent) {
+    return streamEvents('/api/v1/ai-insights/stream', data, onEvent);
+  },
+
+  // Stream an AI mentor answer paragraph by paragraph
+  async streamMentorChat(message, onEvent) {
+    return streamEvents('/api/v1/mentor/chat/stream', { message }, onEvent);
+  },
+
   // Create custom model
   async createModel(config) {
     try {